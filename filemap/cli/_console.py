@@ -0,0 +1,5 @@
+"""CLI 共享的 Rich 控制台"""
+from rich.console import Console
+
+# 所有命令共用一个控制台实例；关闭自动高亮和 emoji 解析以降低每次输出的开销
+console = Console(highlight=False, emoji=False, log_time=False)
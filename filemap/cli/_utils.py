@@ -0,0 +1,60 @@
+"""CLI 通用辅助函数"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable
+
+import click
+
+from filemap.core.models import File, Tag
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+_SIZE_DIVISORS = tuple(1 << (10 * i) for i in range(len(_SIZE_UNITS)))
+
+
+@lru_cache(maxsize=4096)
+def format_size(size: int) -> str:
+    """格式化文件大小（按 bit_length 直接定位单位，无需逐级除法；结果按大小缓存）"""
+    size = int(size)
+    i = min(max(0, (size.bit_length() - 1) // 10), len(_SIZE_UNITS) - 1)
+    return f"{size / _SIZE_DIVISORS[i]:.1f} {_SIZE_UNITS[i]}"
+
+
+def echo_json(data: Any) -> None:
+    """流式输出 JSON（格式与 json.dumps(indent=2) 相同），不在内存中构建完整字符串"""
+    stdout = click.get_text_stream("stdout")
+    stdout.writelines(json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(data))
+    stdout.write("\n")
+
+
+def echo_json_array(items: Iterable[Any]) -> None:
+    """逐项输出 JSON 数组，每次只序列化一个元素"""
+    stdout = click.get_text_stream("stdout")
+    first = True
+    for item in items:
+        stdout.write("[\n  " if first else ",\n  ")
+        stdout.write(json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+        first = False
+    stdout.write("[]\n" if first else "\n]\n")
+
+
+def file_has_tag(file: File, tag: Tag) -> bool:
+    """文件是否带有该标签（File.tags 在 SQLite 存储中为标签名称，在 JSON 存储中为标签ID）"""
+    return tag.name in file.tags or tag.tag_id in file.tags
+
+
+def tag_lookup(datastore) -> Dict[str, Tag]:
+    """
+    一次查询构建 {标签ID: Tag} 和 {标签名称: Tag} 的合并映射
+
+    File.tags 在 SQLite 存储中是标签名称、在 JSON 存储中是标签ID，两种引用都能直接查到。
+    """
+    lookup: Dict[str, Tag] = {}
+    for tag in datastore.list_tags():
+        lookup[tag.tag_id] = tag
+        lookup[tag.name] = tag
+    return lookup
+
+
+def category_names(datastore) -> Dict[str, str]:
+    """一次查询获取 {类别ID: 类别名称}"""
+    return {cat.category_id: cat.name for cat in datastore.list_categories()}
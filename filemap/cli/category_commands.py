@@ -1,14 +1,11 @@
 """类别管理命令"""
 import click
-from rich.console import Console
 from rich.table import Table
 from typing import Optional
 
 from filemap.core.models import Category
 from filemap.cli.main import pass_context, Context
-
-
-console = Console()
+from filemap.cli._console import console
 
 
 @click.group(name="category")
@@ -68,10 +65,11 @@ def list_categories(ctx: Context):
     table.add_column("标签数", style="green", justify="right")
     table.add_column("描述", style="white")
 
+    # 一次查询统计所有类别的标签数量
+    tag_counts = ctx.datastore.count_tags_by_category()
+
     for cat in categories:
-        # 统计该类别下的标签数
-        tags = ctx.datastore.list_tags(cat.category_id)
-        tag_count = len(tags)
+        tag_count = tag_counts.get(cat.category_id, 0)
 
         table.add_row(
             cat.icon,
@@ -1,16 +1,17 @@
 """文件管理命令"""
 import click
 from pathlib import Path
-from rich.console import Console
 from rich.table import Table
-from typing import Optional
-import shutil
+from typing import BinaryIO, Optional, Tuple
+from datetime import datetime
+import itertools
+import os
+from operator import attrgetter
 
 from filemap.core.models import File
 from filemap.cli.main import pass_context, Context
-
-
-console = Console()
+from filemap.cli._utils import echo_json_array, format_size
+from filemap.cli._console import console
 
 
 @click.group(name="file")
@@ -38,32 +39,30 @@ def add_file(ctx: Context, file_path: str, mode: str, tags: Optional[str], notes
 
     managed = mode == "import"
 
-    # 创建File对象
+    # 创建File对象；导入模式下在计算哈希的同时复制到管理目录
     try:
-        file_obj = File.from_path(str(file_path), managed=managed)
+        if managed:
+            # 已有相同大小的文件时才可能重复：先计算哈希查重，避免把重复文件复制到管理目录；
+            # 否则无需查重，复制的同时计算哈希
+            if ctx.datastore.has_file_with_size(file_path.stat().st_size):
+                duplicate = ctx.datastore.get_file_by_hash(File.from_path(str(file_path)).hash)
+                if duplicate:
+                    _print_duplicate(duplicate)
+                    return
+            dest_path, dest_file = _open_managed_dest(ctx, file_path)
+            file_obj = File.from_path_streaming_copy(str(file_path), str(dest_path), dest_file)
+        else:
+            file_obj = File.from_path(str(file_path))
     except Exception as e:
         console.print(f"[red]错误: {e}[/red]")
         return
 
-    # 如果是导入模式，复制文件到管理目录
-    if managed:
-        managed_dir = ctx.config.get_managed_dir()
-        # 按年月组织文件
-        year_month = file_obj.added_at.strftime("%Y/%m")
-        dest_dir = managed_dir / year_month
-        dest_dir.mkdir(parents=True, exist_ok=True)
-        dest_path = dest_dir / file_obj.name
-
-        # 处理重名文件
-        counter = 1
-        while dest_path.exists():
-            stem = file_path.stem
-            suffix = file_path.suffix
-            dest_path = dest_dir / f"{stem}_{counter}{suffix}"
-            counter += 1
-
-        shutil.copy2(file_path, dest_path)
-        file_obj.path = str(dest_path)
+    # 索引模式下检查是否已有相同内容的文件（路径不同但内容相同）
+    if not managed:
+        duplicate = ctx.datastore.get_file_by_hash(file_obj.hash)
+        if duplicate:
+            _print_duplicate(duplicate)
+            return
 
     # 添加备注
     if notes:
@@ -71,13 +70,13 @@ def add_file(ctx: Context, file_path: str, mode: str, tags: Optional[str], notes
 
     # 添加标签
     if tags:
-        tag_names = [t.strip() for t in tags.split(",")]
+        tag_names = list(dict.fromkeys(t.strip() for t in tags.split(",") if t.strip()))
+        tags_map = ctx.datastore.get_tags_by_name(tag_names)
         for tag_name in tag_names:
-            tag = ctx.datastore.get_tag_by_name(tag_name)
+            tag = tags_map.get(tag_name)
             if tag:
+                # 使用次数由 file_tags 实时计算，add_file 写入关联即可
                 file_obj.add_tag(tag.tag_id)
-                tag.usage_count += 1
-                ctx.datastore.update_tag(tag)
             else:
                 console.print(f"[yellow]警告: 标签 '{tag_name}' 不存在，已忽略[/yellow]")
 
@@ -88,47 +87,69 @@ def add_file(ctx: Context, file_path: str, mode: str, tags: Optional[str], notes
     console.print(f"[green]✓ 文件已{mode_str}: {file_obj.name}[/green]")
     console.print(f"  ID: {file_obj.file_id}")
     console.print(f"  路径: {file_obj.path}")
-    console.print(f"  大小: {_format_size(file_obj.size)}")
+    console.print(f"  大小: {format_size(file_obj.size)}")
+
+
+def _print_duplicate(duplicate: File) -> None:
+    """提示已有相同内容的文件"""
+    console.print(f"[yellow]文件已存在（与 {duplicate.path} 内容相同）[/yellow]")
+
+
+def _open_managed_dest(ctx: Context, file_path: Path) -> Tuple[Path, BinaryIO]:
+    """在管理目录中创建导入目标文件（按年月组织，重名时追加序号）
+
+    使用 O_CREAT | O_EXCL 原子创建，重名检测由内核完成，并发导入时也不会互相覆盖。
+    """
+    dest_dir = ctx.config.get_managed_dir() / datetime.now().strftime("%Y/%m")
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    for counter in itertools.count():
+        name = file_path.name if counter == 0 else f"{file_path.stem}_{counter}{file_path.suffix}"
+        dest_path = dest_dir / name
+        try:
+            fd = os.open(dest_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0), 0o644)
+        except FileExistsError:
+            continue
+        return dest_path, os.fdopen(fd, "wb")
 
 
 @file_group.command(name="list")
 @click.option("--tags", help="过滤标签，逗号分隔")
 @click.option("--format", "output_format", type=click.Choice(["table", "simple", "json"]), default="table", help="输出格式")
 @click.option("--sort", type=click.Choice(["name", "size", "date"]), default="name", help="排序方式")
+@click.option("--plain", is_flag=True, help="以纯文本表格输出（不使用Rich渲染）")
 @pass_context
-def list_files(ctx: Context, tags: Optional[str], output_format: str, sort: str):
+def list_files(ctx: Context, tags: Optional[str], output_format: str, sort: str, plain: bool):
     """列出文件"""
     # 获取文件列表
     tag_ids = None
     if tags:
-        tag_names = [t.strip() for t in tags.split(",")]
-        tag_ids = []
-        for tag_name in tag_names:
-            tag = ctx.datastore.get_tag_by_name(tag_name)
-            if tag:
-                tag_ids.append(tag.tag_id)
-            else:
-                console.print(f"[yellow]警告: 标签 '{tag_name}' 不存在[/yellow]")
-
-    files = ctx.datastore.list_files(tag_ids)
+        tag_names = list(dict.fromkeys(t.strip() for t in tags.split(",") if t.strip()))
+        tags_map = ctx.datastore.get_tags_by_name(tag_names)
+        tag_ids = [tag.tag_id for tag in tags_map.values()]
+        for tag_name in set(tag_names) - tags_map.keys():
+            console.print(f"[yellow]警告: 标签 '{tag_name}' 不存在[/yellow]")
+
+    if tag_ids:
+        files = ctx.datastore.get_files_by_tags(tag_ids, match_all=False)
+    else:
+        files = ctx.datastore.list_files()
 
     # 排序
     if sort == "name":
-        files.sort(key=lambda f: f.name)
+        files.sort(key=attrgetter("name"))
     elif sort == "size":
-        files.sort(key=lambda f: f.size, reverse=True)
+        files.sort(key=attrgetter("size"), reverse=True)
     elif sort == "date":
-        files.sort(key=lambda f: f.added_at, reverse=True)
+        files.sort(key=attrgetter("added_at"), reverse=True)
 
     if output_format == "table":
-        _display_files_table(files, ctx)
+        _display_files_table(files, ctx, plain=plain)
     elif output_format == "simple":
         for file in files:
             click.echo(f"{file.file_id}\t{file.name}\t{file.path}")
     elif output_format == "json":
-        import json
-        data = [f.to_dict() for f in files]
-        click.echo(json.dumps(data, indent=2, ensure_ascii=False))
+        echo_json_array(f.to_dict() for f in files)
 
 
 @file_group.command(name="show")
@@ -150,7 +171,7 @@ def show_file(ctx: Context, file_id: str):
     table.add_row("文件名", file.name)
     table.add_row("路径", file.path)
     table.add_row("模式", "导入管理" if file.managed else "索引")
-    table.add_row("大小", _format_size(file.size))
+    table.add_row("大小", format_size(file.size))
     table.add_row("类型", file.mime_type)
     table.add_row("哈希", file.hash[:16] + "...")
     table.add_row("创建时间", str(file.created_at))
@@ -159,11 +180,8 @@ def show_file(ctx: Context, file_id: str):
 
     # 显示标签
     if file.tags:
-        tag_names = []
-        for tag_id in file.tags:
-            tag = ctx.datastore.get_tag(tag_id)
-            if tag:
-                tag_names.append(tag.name)
+        tag_map = ctx.datastore.get_tags(file.tags)
+        tag_names = [tag_map[tid].name for tid in file.tags if tid in tag_map]
         table.add_row("标签", ", ".join(tag_names))
     else:
         table.add_row("标签", "[dim]无[/dim]")
@@ -219,8 +237,27 @@ def update_file(ctx: Context, file_id: str):
         console.print(f"[red]错误: {e}[/red]")
 
 
-def _display_files_table(files: list, ctx: Context):
-    """以表格形式显示文件列表"""
+def _display_files_table(files: list, ctx: Context, plain: bool = False):
+    """以表格形式显示文件列表（文件数较多时使用纯文本输出）"""
+    plain = plain or len(files) > ctx.config.get("display.plain_threshold", 500)
+    # 一次性获取所有需要显示的标签（表格中每个文件只显示前3个，纯文本输出全部标签）
+    shown = None if plain else 3
+    tag_map = ctx.datastore.get_tags({tid for f in files for tid in f.tags[:shown]})
+
+    if plain:
+        rows = ["ID\t文件名\t大小\t标签\t添加时间"]
+        for file in files:
+            tags_str = ",".join(tag_map[tid].name for tid in file.tags if tid in tag_map)
+            rows.append("\t".join((
+                file.file_id[:8],
+                file.name,
+                format_size(file.size),
+                tags_str,
+                file.added_at.strftime("%Y-%m-%d %H:%M"),
+            )))
+        click.echo("\n".join(rows))
+        return
+
     table = Table(title=f"文件列表 (共 {len(files)} 个)")
 
     table.add_column("ID", style="cyan", no_wrap=True, max_width=12)
@@ -231,11 +268,7 @@ def _display_files_table(files: list, ctx: Context):
 
     for file in files:
         # 获取标签名称
-        tag_names = []
-        for tag_id in file.tags[:3]:  # 只显示前3个标签
-            tag = ctx.datastore.get_tag(tag_id)
-            if tag:
-                tag_names.append(tag.name)
+        tag_names = [tag_map[tid].name for tid in file.tags[:3] if tid in tag_map]
         tags_str = ", ".join(tag_names)
         if len(file.tags) > 3:
             tags_str += f" (+{len(file.tags) - 3})"
@@ -243,18 +276,9 @@ def _display_files_table(files: list, ctx: Context):
         table.add_row(
             file.file_id[:8],
             file.name[:40],
-            _format_size(file.size),
+            format_size(file.size),
             tags_str or "[dim]无[/dim]",
             file.added_at.strftime("%Y-%m-%d %H:%M"),
         )
 
     console.print(table)
-
-
-def _format_size(size: int) -> str:
-    """格式化文件大小"""
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} PB"
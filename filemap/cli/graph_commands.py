@@ -1,14 +1,17 @@
 """知识图谱命令"""
 import click
-from rich.console import Console
 from rich.table import Table
 from pathlib import Path
+from collections import Counter
+from typing import Optional, TYPE_CHECKING
 
-from filemap.graph.knowledge_graph import KnowledgeGraph
 from filemap.cli.main import pass_context, Context
+from filemap.cli._utils import echo_json
+from filemap.utils.fileio import atomic_write
+from filemap.cli._console import console
 
-
-console = Console()
+if TYPE_CHECKING:
+    from filemap.graph.knowledge_graph import KnowledgeGraph
 
 
 @click.group(name="graph")
@@ -17,11 +20,46 @@ def graph_group():
     pass
 
 
+def _graph_cache_path(ctx: Context, mode: str) -> Path:
+    """获取指定模式的图谱缓存路径"""
+    return ctx.config.get_data_dir() / f"graph_{mode}.json"
+
+
+def _load_fresh_graph(ctx: Context, graph_path: Path) -> Optional["KnowledgeGraph"]:
+    """加载图谱文件；文件不存在或生成后数据库已有写入（数据版本号变化）时返回 None"""
+    from filemap.graph.knowledge_graph import KnowledgeGraph
+
+    if not graph_path.exists():
+        return None
+
+    kg = KnowledgeGraph(ctx.datastore)
+    kg.load(str(graph_path))
+    if kg.data_version is None or kg.data_version != ctx.datastore.data_version():
+        return None
+    return kg
+
+
+def _get_or_build_graph(ctx: Context, mode: str) -> "KnowledgeGraph":
+    """获取知识图谱：缓存有效时直接加载，否则重新生成并写入缓存"""
+    from filemap.graph.knowledge_graph import KnowledgeGraph
+
+    cache_path = _graph_cache_path(ctx, mode)
+    kg = _load_fresh_graph(ctx, cache_path)
+    if kg is None:
+        kg = KnowledgeGraph(ctx.datastore)
+        kg.generate(mode=mode)
+        kg.save(str(cache_path))
+
+    return kg
+
+
 @graph_group.command(name="generate")
 @click.option("--mode", type=click.Choice(["tags", "files", "full"]), default="tags", help="生成模式")
 @pass_context
 def generate_graph(ctx: Context, mode: str):
     """生成知识图谱"""
+    from filemap.graph.knowledge_graph import KnowledgeGraph
+
     console.print(f"[cyan]正在生成{mode}模式的知识图谱...[/cyan]")
 
     kg = KnowledgeGraph(ctx.datastore)
@@ -38,6 +76,7 @@ def generate_graph(ctx: Context, mode: str):
     # 保存到数据目录
     graph_path = ctx.config.get_data_dir() / "graph.json"
     kg.save(str(graph_path))
+    kg.save(str(_graph_cache_path(ctx, mode)))
     console.print(f"  已保存到: {graph_path}")
 
 
@@ -53,28 +92,26 @@ def show_graph(ctx: Context, output_format: str, output: str):
         console.print("[yellow]知识图谱未生成，请先运行 'filemap graph generate'[/yellow]")
         return
 
-    kg = KnowledgeGraph(ctx.datastore)
-    kg.generate(mode="tags")  # 重新生成
+    # 数据未变化时直接使用已生成的图谱
+    kg = _load_fresh_graph(ctx, graph_path)
+    if kg is None:
+        kg = _get_or_build_graph(ctx, "tags")
 
     if output_format == "text":
         text_viz = kg.visualize_text()
         if output:
-            with open(output, "w", encoding="utf-8") as f:
-                f.write(text_viz)
+            with atomic_write(output) as f:
+                f.write(text_viz.encode("utf-8"))
             console.print(f"[green]✓ 已保存到: {output}[/green]")
         else:
             console.print(text_viz)
 
     elif output_format == "json":
-        import json
-        data = kg.export_json()
-        json_str = json.dumps(data, ensure_ascii=False, indent=2)
         if output:
-            with open(output, "w", encoding="utf-8") as f:
-                f.write(json_str)
+            kg.save(output)
             console.print(f"[green]✓ 已保存到: {output}[/green]")
         else:
-            console.print(json_str)
+            echo_json(kg.export_json())
 
 
 @graph_group.command(name="hubs")
@@ -82,8 +119,7 @@ def show_graph(ctx: Context, output_format: str, output: str):
 @pass_context
 def show_hubs(ctx: Context, top: int):
     """显示核心节点"""
-    kg = KnowledgeGraph(ctx.datastore)
-    kg.generate(mode="tags")
+    kg = _get_or_build_graph(ctx, "tags")
 
     hubs = kg.find_hubs(top_n=top)
 
@@ -110,19 +146,21 @@ def show_hubs(ctx: Context, top: int):
 @pass_context
 def show_orphans(ctx: Context, node_type: str):
     """显示孤立节点"""
-    kg = KnowledgeGraph(ctx.datastore)
-    kg.generate(mode="full")
+    kg = _get_or_build_graph(ctx, "full")
 
     filter_type = None if node_type == "all" else node_type
     orphans = kg.find_orphans(node_type=filter_type)
 
-    console.print(f"[cyan]孤立节点 (共 {len(orphans)} 个):[/cyan]")
+    # 先拼接所有行，最后一次性输出
+    lines = [f"[cyan]孤立节点 (共 {len(orphans)} 个):[/cyan]"]
 
     for node_id in orphans:
         node_data = kg.graph.nodes[node_id]
         ntype = node_data.get("type", "unknown")
         name = node_data.get("name", "未知")
-        console.print(f"  [{ntype}] {name}")
+        lines.append(f"  [{ntype}] {name}")
+
+    console.print("\n".join(lines))
 
 
 @graph_group.command(name="recommend")
@@ -136,8 +174,7 @@ def recommend_tags(ctx: Context, file_id: str, top: int):
         console.print(f"[red]错误: 文件不存在 (ID: {file_id})[/red]")
         return
 
-    kg = KnowledgeGraph(ctx.datastore)
-    kg.generate(mode="tags")
+    kg = _get_or_build_graph(ctx, "tags")
 
     recommendations = kg.recommend_tags(file_id, top_n=top)
 
@@ -153,10 +190,14 @@ def recommend_tags(ctx: Context, file_id: str, top: int):
     table.add_column("推荐分数", style="green", justify="right")
     table.add_column("类别", style="yellow")
 
+    # 批量获取标签和类别，避免逐条查询
+    tag_map = ctx.datastore.get_tags(tag_id for tag_id, _ in recommendations)
+    cat_map = ctx.datastore.get_categories(tag.category for tag in tag_map.values())
+
     for idx, (tag_id, score) in enumerate(recommendations, 1):
-        tag = ctx.datastore.get_tag(tag_id)
+        tag = tag_map.get(tag_id)
         if tag:
-            cat = ctx.datastore.get_category(tag.category)
+            cat = cat_map.get(tag.category)
             cat_name = cat.name if cat else "未知"
             table.add_row(str(idx), tag.name, f"{score:.2f}", cat_name)
 
@@ -167,30 +208,32 @@ def recommend_tags(ctx: Context, file_id: str, top: int):
 @pass_context
 def cluster_analysis(ctx: Context):
     """聚类分析"""
-    kg = KnowledgeGraph(ctx.datastore)
-    kg.generate(mode="full")
+    kg = _get_or_build_graph(ctx, "full")
 
     communities = kg.find_communities()
 
-    console.print(f"[cyan]发现 {len(communities)} 个社区/聚类:[/cyan]\n")
+    # 先拼接所有行，最后一次性输出
+    lines = [f"[cyan]发现 {len(communities)} 个社区/聚类:[/cyan]\n"]
 
+    graph_nodes = kg.graph.nodes
     for comm_id, nodes in communities.items():
         # 统计社区中的节点类型
-        tag_count = sum(1 for n in nodes if kg.graph.nodes[n].get("type") == "tag")
-        file_count = sum(1 for n in nodes if kg.graph.nodes[n].get("type") == "file")
+        types = Counter(graph_nodes[n].get("type", "unknown") for n in nodes)
 
-        console.print(f"[yellow]社区 {comm_id + 1}[/yellow] (节点: {len(nodes)}, 标签: {tag_count}, 文件: {file_count})")
+        lines.append(f"[yellow]社区 {comm_id + 1}[/yellow] (节点: {len(nodes)}, 标签: {types['tag']}, 文件: {types['file']})")
 
         # 显示一些代表性节点
         for node_id in nodes[:5]:
-            node_data = kg.graph.nodes[node_id]
+            node_data = graph_nodes[node_id]
             ntype = node_data.get("type", "unknown")
             name = node_data.get("name", "未知")
-            console.print(f"  • [{ntype}] {name}")
+            lines.append(f"  • [{ntype}] {name}")
 
         if len(nodes) > 5:
-            console.print(f"  ... 还有 {len(nodes) - 5} 个节点")
-        console.print("")
+            lines.append(f"  ... 还有 {len(nodes) - 5} 个节点")
+        lines.append("")
+
+    console.print("\n".join(lines))
 
 
 @graph_group.command(name="export")
@@ -199,8 +242,7 @@ def cluster_analysis(ctx: Context):
 @pass_context
 def export_graph(ctx: Context, output_file: str, output_format: str):
     """导出知识图谱"""
-    kg = KnowledgeGraph(ctx.datastore)
-    kg.generate(mode="full")
+    kg = _get_or_build_graph(ctx, "full")
 
     output_path = Path(output_file)
 
@@ -210,5 +252,6 @@ def export_graph(ctx: Context, output_file: str, output_format: str):
 
     elif output_format == "graphml":
         import networkx as nx
-        nx.write_graphml(kg.graph, str(output_path))
+        with atomic_write(output_path) as f:
+            nx.write_graphml(kg.graph, f)
         console.print(f"[green]✓ 已导出为GraphML: {output_path}[/green]")
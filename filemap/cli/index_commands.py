@@ -1,15 +1,21 @@
 """索引管理命令"""
 import click
-from rich.console import Console
 from rich.table import Table
 from rich.progress import Progress
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from filemap.cli.main import pass_context, Context
-from filemap.search.indexer import ContentIndexer
+from filemap.cli._utils import format_size
+from filemap.core.exceptions import AmbiguousFileIdError
+from filemap.cli._console import console
 
+if TYPE_CHECKING:
+    from filemap.search.indexer import ContentIndexer
 
-console = Console()
+
+# 文件数超过该值时使用多进程并行提取文本
+_PARALLEL_THRESHOLD = 32
 
 
 @click.group(name="index")
@@ -18,6 +24,19 @@ def index_group():
     pass
 
 
+def _open_indexer(index_dir: Path) -> "ContentIndexer":
+    """创建索引器（延迟导入 whoosh / jieba，避免拖慢其他命令的启动）"""
+    from filemap.search.indexer import ContentIndexer
+    return ContentIndexer(index_dir)
+
+
+def _index_files(indexer: "ContentIndexer", files: list, progress_callback) -> dict:
+    """批量索引文件，文件较多时并行提取文本"""
+    if len(files) > _PARALLEL_THRESHOLD:
+        return indexer.index_files_parallel(files, progress_callback=progress_callback)
+    return indexer.index_files(files, progress_callback=progress_callback)
+
+
 @index_group.command(name="content")
 @click.argument("file_id", required=False)
 @click.option("--all", "index_all", is_flag=True, help="索引所有文件")
@@ -28,7 +47,7 @@ def index_content(ctx: Context, file_id: str, index_all: bool, file_type: str, f
     """为文件创建全文索引"""
     # 初始化索引器
     index_dir = ctx.config.get_data_dir() / "index"
-    indexer = ContentIndexer(index_dir)
+    indexer = _open_indexer(index_dir)
 
     if index_all:
         # 索引所有文件
@@ -42,7 +61,7 @@ def index_content(ctx: Context, file_id: str, index_all: bool, file_type: str, f
             }
             if file_type in mime_map:
                 target_mime = mime_map[file_type]
-                files = [f for f in files if target_mime in f.mime_type]
+                files = [f for f in files if f.mime_type.startswith(target_mime)]
 
         console.print(f"[cyan]正在索引 {len(files)} 个文件...[/cyan]")
 
@@ -52,7 +71,7 @@ def index_content(ctx: Context, file_id: str, index_all: bool, file_type: str, f
             def update_progress(current, total, filename):
                 progress.update(task, completed=current, description=f"[green]索引: {filename[:30]}")
 
-            stats = indexer.index_files(files, progress_callback=update_progress)
+            stats = _index_files(indexer, files, update_progress)
 
         console.print(f"[green]✓ 索引完成[/green]")
         console.print(f"  成功: {stats['success']}")
@@ -64,10 +83,11 @@ def index_content(ctx: Context, file_id: str, index_all: bool, file_type: str, f
         file = ctx.datastore.get_file(file_id)
         if not file:
             # 尝试匹配ID前缀
-            for f in ctx.datastore.files.values():
-                if f.file_id.startswith(file_id):
-                    file = f
-                    break
+            try:
+                file = ctx.datastore.get_file_by_prefix(file_id)
+            except AmbiguousFileIdError:
+                console.print(f"[red]错误: ID前缀匹配到多个文件，请提供更长的ID ({file_id})[/red]")
+                return
 
         if not file:
             console.print(f"[red]错误: 文件不存在 (ID: {file_id})[/red]")
@@ -99,7 +119,7 @@ def index_status(ctx: Context):
         console.print("[yellow]索引尚未创建[/yellow]")
         return
 
-    indexer = ContentIndexer(index_dir)
+    indexer = _open_indexer(index_dir)
     stats = indexer.get_stats()
 
     table = Table(title="索引状态")
@@ -107,7 +127,7 @@ def index_status(ctx: Context):
     table.add_column("值", style="white")
 
     table.add_row("索引文档数", str(stats['total_docs']))
-    table.add_row("索引大小", _format_size(stats['index_size']))
+    table.add_row("索引大小", format_size(stats['index_size']))
     table.add_row("最后更新", str(stats['last_modified']) if stats['last_modified'] else '未知')
     table.add_row("索引目录", str(index_dir))
 
@@ -127,7 +147,7 @@ def search_content(ctx: Context, query: str, limit: int, highlight: bool):
         console.print("[yellow]索引尚未创建，请先运行 'filemap index content --all'[/yellow]")
         return
 
-    indexer = ContentIndexer(index_dir)
+    indexer = _open_indexer(index_dir)
 
     console.print(f"[cyan]搜索: {query}[/cyan]\n")
 
@@ -171,7 +191,7 @@ def rebuild_index(ctx: Context):
         console.print("[yellow]已删除现有索引[/yellow]")
 
     # 重新索引所有文件
-    indexer = ContentIndexer(index_dir)
+    indexer = _open_indexer(index_dir)
     files = list(ctx.datastore.files.values())
 
     console.print(f"[cyan]正在重建索引（共 {len(files)} 个文件）...[/cyan]")
@@ -182,7 +202,7 @@ def rebuild_index(ctx: Context):
         def update_progress(current, total, filename):
             progress.update(task, completed=current, description=f"[green]索引: {filename[:30]}")
 
-        stats = indexer.index_files(files, progress_callback=update_progress)
+        stats = _index_files(indexer, files, update_progress)
 
     console.print(f"[green]✓ 索引重建完成[/green]")
     console.print(f"  成功: {stats['success']}")
@@ -201,7 +221,7 @@ def optimize_index(ctx: Context):
         return
 
     console.print("[cyan]正在优化索引...[/cyan]")
-    indexer = ContentIndexer(index_dir)
+    indexer = _open_indexer(index_dir)
     indexer.optimize()
     console.print("[green]✓ 索引优化完成[/green]")
 
@@ -217,7 +237,7 @@ def update_index(ctx: Context, force: bool):
         console.print("[yellow]索引尚未创建，请先运行 'filemap index content --all'[/yellow]")
         return
 
-    indexer = ContentIndexer(index_dir)
+    indexer = _open_indexer(index_dir)
     files = list(ctx.datastore.files.values())
 
     console.print(f"[cyan]正在{'重新' if force else '增量'}索引文件...[/cyan]")
@@ -228,18 +248,10 @@ def update_index(ctx: Context, force: bool):
         def update_progress(current, total, filename):
             progress.update(task, completed=current, description=f"[green]索引: {filename[:30]}")
 
-        stats = indexer.update_index(files, force=force, progress_callback=update_progress)
+        stats = indexer.update_index(files, force=force, progress_callback=update_progress,
+                                     parallel=len(files) > _PARALLEL_THRESHOLD)
 
     console.print(f"[green]✓ 索引更新完成[/green]")
     console.print(f"  成功: {stats['success']}")
     console.print(f"  失败: {stats['failed']}")
     console.print(f"  跳过: {stats['skipped']}")
-
-
-def _format_size(size: int) -> str:
-    """格式化文件大小"""
-    for unit in ["B", "KB", "MB", "GB"]:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} TB"
@@ -1,28 +1,43 @@
 """交互式CLI Shell"""
+import bisect
 import cmd
+import heapq
+import os
 import shlex
+import sys
+from collections import defaultdict
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional
-from rich.console import Console
+from typing import TYPE_CHECKING, Dict, List, Optional
+from rich.console import Group
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
-from rich.tree import Tree
 
 from filemap.utils.config import get_config
 from filemap.storage.sqlite_datastore import SQLiteDataStore
 from filemap.core.models import File, Tag, Category
-from filemap.graph.knowledge_graph import KnowledgeGraph
-from filemap.search.indexer import ContentIndexer
+from filemap.core.exceptions import AmbiguousFileIdError
+from filemap.cli._utils import file_has_tag, format_size
+from filemap.cli._console import console
 
+try:
+    import termios
+    import tty
+except ImportError:  # Windows 下没有 termios，确认时退回 input()
+    termios = None
 
-console = Console()
+if TYPE_CHECKING:
+    from filemap.graph.knowledge_graph import KnowledgeGraph
+    from filemap.search.indexer import ContentIndexer
 
 
 class FileMapShell(cmd.Cmd):
     """FileMap交互式Shell"""
 
-    intro = """
+    # 启动横幅只构建一次，由 preloop 直接交给 console 输出
+    _INTRO_TEXT = Text("""
 ╔═══════════════════════════════════════════════════════════════╗
 ║           FileMap Interactive Shell v0.1.0                    ║
 ║           智能文件管理和知识图谱工具                            ║
@@ -30,7 +45,8 @@ class FileMapShell(cmd.Cmd):
 ║  输入 'help' 查看可用命令    输入 'quit' 或 'exit' 退出        ║
 ║  输入 'tutorial' 查看快速入门指南                              ║
 ╚═══════════════════════════════════════════════════════════════╝
-"""
+""")
+    intro = ""
     prompt = "\033[1;36mfilemap>\033[0m "
 
     def __init__(self):
@@ -39,17 +55,23 @@ class FileMapShell(cmd.Cmd):
         self.config = get_config()
         db_path = self.config.get_data_dir() / "filemap.db"
         self.datastore = SQLiteDataStore(db_path)
-        self.knowledge_graph = KnowledgeGraph(self.datastore)
 
-        # 初始化索引器
-        index_dir = self.config.get_data_dir() / "index"
-        self.indexer = ContentIndexer(index_dir)
+        # 知识图谱和全文索引器在首次使用时才创建（依赖 NetworkX / Whoosh，导入较慢）
+        self._knowledge_graph: Optional["KnowledgeGraph"] = None
+        self._indexer: Optional["ContentIndexer"] = None
 
         # 上下文状态
         self.current_files: List[File] = []  # 当前查询结果
         self.selected_file: Optional[File] = None  # 选中的文件
         self.last_search: str = ""  # 上次搜索条件
 
+        # 标签名称索引（按需构建，标签变化时失效）
+        self._tag_by_name: Optional[Dict[str, Tag]] = None
+        # 排序后的标签名称列表，用于补全时二分查找前缀（与标签索引一同失效）
+        self._sorted_tag_names: Optional[List[str]] = None
+        # 大小写折叠后的文件名缓存 {文件ID: casefold 名称}，避免每次搜索都重新转换
+        self._name_folded: Dict[str, str] = {}
+
         # 命令别名
         self.aliases = {
             "ls": "list",
@@ -63,16 +85,48 @@ class FileMapShell(cmd.Cmd):
             "i": "index",
         }
 
-    def precmd(self, line: str) -> str:
-        """预处理命令，处理别名"""
+        # 命令分派表：命令名和别名都直接指向对应的 do_* 方法
+        self._cmd_table = {
+            name[3:]: getattr(self, name) for name in self.get_names() if name.startswith("do_")
+        }
+        self._cmd_table.update({
+            alias: self._cmd_table[target]
+            for alias, target in self.aliases.items() if target in self._cmd_table
+        })
+
+    def onecmd(self, line: str) -> bool:
+        """执行一条命令（查表分派，替代 cmd.Cmd 的逐次 getattr）"""
+        line = line.strip()
         if not line:
-            return line
-
-        parts = line.split()
-        if parts and parts[0] in self.aliases:
-            parts[0] = self.aliases[parts[0]]
-            return " ".join(parts)
-        return line
+            return self.emptyline()
+        if line.startswith("?"):
+            line = "help " + line[1:]
+
+        self.lastcmd = line
+        cmd_name, _, rest = line.partition(" ")
+        func = self._cmd_table.get(cmd_name)
+        if func is None:
+            return self.default(line)
+        return func(rest.strip())
+
+    def preloop(self) -> None:
+        console.print(self._INTRO_TEXT)
+
+    @property
+    def knowledge_graph(self) -> "KnowledgeGraph":
+        """知识图谱（首次访问时导入并创建）"""
+        if self._knowledge_graph is None:
+            from filemap.graph.knowledge_graph import KnowledgeGraph
+            self._knowledge_graph = KnowledgeGraph(self.datastore)
+        return self._knowledge_graph
+
+    @property
+    def indexer(self) -> "ContentIndexer":
+        """全文索引器（首次访问时导入并创建）"""
+        if self._indexer is None:
+            from filemap.search.indexer import ContentIndexer
+            self._indexer = ContentIndexer(self.config.get_data_dir() / "index")
+        return self._indexer
 
     def emptyline(self) -> bool:
         """空行不重复上一条命令"""
@@ -93,14 +147,11 @@ class FileMapShell(cmd.Cmd):
 
         tag_ids = None
         if tags:
-            tag_names = [t.strip() for t in tags.split(",")]
-            tag_ids = []
-            for name in tag_names:
-                tag = self.datastore.get_tag_by_name(name)
-                if tag:
-                    tag_ids.append(tag.tag_id)
+            tag_names = list(dict.fromkeys(t.strip() for t in tags.split(",") if t.strip()))
+            tag_index = self._tags_by_name()
+            tag_ids = [tag_index[n].tag_id for n in tag_names if n in tag_index]
 
-        files = self.datastore.list_files(tag_ids)[:limit]
+        files = self._files_with_any_tag(tag_ids)[:limit]
         self.current_files = files
 
         if not files:
@@ -141,13 +192,13 @@ class FileMapShell(cmd.Cmd):
         # 添加标签
         tags = args.get("tags", "")
         if tags:
-            tag_names = [t.strip() for t in tags.split(",")]
+            tag_names = list(dict.fromkeys(t.strip() for t in tags.split(",") if t.strip()))
+            tag_index = self._tags_by_name()
             for tag_name in tag_names:
-                tag = self.datastore.get_tag_by_name(tag_name)
+                tag = tag_index.get(tag_name)
                 if tag:
+                    # 使用次数由 file_tags 实时计算，add_file 写入关联即可
                     file_obj.add_tag(tag.tag_id)
-                    tag.usage_count += 1
-                    self.datastore.update_tag(tag)
                 else:
                     console.print(f"[yellow]标签不存在: {tag_name}[/yellow]")
 
@@ -156,6 +207,7 @@ class FileMapShell(cmd.Cmd):
             file_obj.notes = args["notes"]
 
         self.datastore.add_file(file_obj)
+        self._invalidate_caches()
         console.print(f"[green]✓ 文件已添加: {file_obj.name}[/green]")
         console.print(f"  ID: {file_obj.file_id[:8]}")
 
@@ -179,15 +231,16 @@ class FileMapShell(cmd.Cmd):
             console.print("[yellow]请指定文件序号[/yellow]")
             return
 
-        try:
-            idx = int(arg) - 1
-            if 0 <= idx < len(self.current_files):
-                self.selected_file = self.current_files[idx]
-                console.print(f"[green]已选择: {self.selected_file.name}[/green]")
-            else:
-                console.print("[red]序号超出范围[/red]")
-        except ValueError:
+        if not arg.isdecimal():
             console.print("[red]请输入有效的数字[/red]")
+            return
+
+        idx = int(arg) - 1
+        if 0 <= idx < len(self.current_files):
+            self.selected_file = self.current_files[idx]
+            console.print(f"[green]已选择: {self.selected_file.name}[/green]")
+        else:
+            console.print("[red]序号超出范围[/red]")
 
     def do_remove(self, arg: str) -> None:
         """删除文件: remove <文件ID或序号>"""
@@ -195,9 +248,10 @@ class FileMapShell(cmd.Cmd):
         if not file:
             return
 
-        confirm = input(f"确定要删除 '{file.name}' 吗？(y/N): ")
-        if confirm.lower() == "y":
+        if self._confirm(f"确定要删除 '{file.name}' 吗？(y/N): "):
             self.datastore.remove_file(file.file_id)
+            self._invalidate_caches()
+            self._name_folded.pop(file.file_id, None)
             console.print(f"[green]✓ 已删除: {file.name}[/green]")
             if self.selected_file and self.selected_file.file_id == file.file_id:
                 self.selected_file = None
@@ -236,7 +290,7 @@ class FileMapShell(cmd.Cmd):
 
     def _tag_list(self) -> None:
         """列出所有标签"""
-        tags = sorted(self.datastore.tags.values(), key=lambda t: t.usage_count, reverse=True)
+        tags = heapq.nlargest(20, self.datastore.tags.values(), key=attrgetter("usage_count"))
 
         table = Table(title="标签列表")
         table.add_column("#", style="dim")
@@ -244,9 +298,9 @@ class FileMapShell(cmd.Cmd):
         table.add_column("类别", style="yellow")
         table.add_column("使用次数", style="green", justify="right")
 
-        for idx, tag in enumerate(tags[:20], 1):
-            cat = self.datastore.get_category(tag.category)
-            cat_name = cat.name if cat else "未知"
+        cat_names = self._category_names()
+        for idx, tag in enumerate(tags, 1):
+            cat_name = cat_names.get(tag.category, "未知")
             table.add_row(str(idx), tag.name, cat_name, str(tag.usage_count))
 
         console.print(table)
@@ -257,13 +311,13 @@ class FileMapShell(cmd.Cmd):
             console.print("[yellow]请指定标签名称[/yellow]")
             return
 
-        existing = self.datastore.get_tag_by_name(name)
-        if existing:
+        if name in self._tags_by_name():
             console.print(f"[yellow]标签已存在: {name}[/yellow]")
             return
 
         tag = Tag(name=name)
         self.datastore.add_tag(tag)
+        self._invalidate_caches()
         console.print(f"[green]✓ 标签已创建: {name}[/green]")
 
     def _tag_add(self, tag_name: str) -> None:
@@ -276,21 +330,22 @@ class FileMapShell(cmd.Cmd):
             console.print("[yellow]请指定标签名称[/yellow]")
             return
 
-        tag = self.datastore.get_tag_by_name(tag_name)
+        tag = self._tags_by_name().get(tag_name)
         if not tag:
             # 询问是否创建
-            create = input(f"标签 '{tag_name}' 不存在，是否创建？(y/N): ")
-            if create.lower() == "y":
+            if self._confirm(f"标签 '{tag_name}' 不存在，是否创建？(y/N): "):
                 tag = Tag(name=tag_name)
                 self.datastore.add_tag(tag)
             else:
                 return
 
-        if not self.selected_file.has_tag(tag.tag_id):
-            self.selected_file.add_tag(tag.tag_id)
-            tag.usage_count += 1
-            self.datastore.update_tag(tag)
-            self.datastore.update_file(self.selected_file)
+        if not file_has_tag(self.selected_file, tag):
+            if not self.datastore.add_tag_to_file(self.selected_file.file_id, tag.tag_id):
+                console.print(f"[red]添加标签失败: {tag_name}[/red]")
+                return
+            # 重新读取文件：互斥分类中的其他标签可能已被替换
+            self.selected_file = self.datastore.get_file(self.selected_file.file_id)
+            self._invalidate_caches()
             console.print(f"[green]✓ 已添加标签 '{tag_name}' 到 {self.selected_file.name}[/green]")
         else:
             console.print(f"[yellow]文件已有标签: {tag_name}[/yellow]")
@@ -301,23 +356,24 @@ class FileMapShell(cmd.Cmd):
             console.print("[yellow]请先选择文件[/yellow]")
             return
 
-        tag = self.datastore.get_tag_by_name(tag_name)
+        tag = self._tags_by_name().get(tag_name)
         if not tag:
             console.print(f"[red]标签不存在: {tag_name}[/red]")
             return
 
-        if self.selected_file.has_tag(tag.tag_id):
-            self.selected_file.remove_tag(tag.tag_id)
-            tag.usage_count = max(0, tag.usage_count - 1)
-            self.datastore.update_tag(tag)
-            self.datastore.update_file(self.selected_file)
+        if file_has_tag(self.selected_file, tag):
+            if not self.datastore.remove_tag_from_file(self.selected_file.file_id, tag.tag_id):
+                console.print(f"[red]移除标签失败: {tag_name}[/red]")
+                return
+            self.selected_file = self.datastore.get_file(self.selected_file.file_id)
+            self._invalidate_caches()
             console.print(f"[green]✓ 已移除标签 '{tag_name}'[/green]")
         else:
             console.print(f"[yellow]文件没有标签: {tag_name}[/yellow]")
 
     def _tag_show(self, name: str) -> None:
         """显示标签详情"""
-        tag = self.datastore.get_tag_by_name(name)
+        tag = self._tags_by_name().get(name)
         if not tag:
             console.print(f"[red]标签不存在: {name}[/red]")
             return
@@ -345,24 +401,20 @@ class FileMapShell(cmd.Cmd):
             return
 
         args = self._parse_args(arg)
-        files = list(self.datastore.files.values())
 
         # 按标签搜索
+        tag_ids = None
         if "tags" in args:
             tag_names = [t.strip() for t in args["tags"].split(",")]
-            tag_ids = []
-            for name in tag_names:
-                tag = self.datastore.get_tag_by_name(name)
-                if tag:
-                    tag_ids.append(tag.tag_id)
+            tag_index = self._tags_by_name()
+            tag_ids = [tag_index[n].tag_id for n in tag_names if n in tag_index]
 
-            if tag_ids:
-                files = [f for f in files if any(tid in f.tags for tid in tag_ids)]
+        files = self._files_with_any_tag(tag_ids)
 
         # 按关键词搜索
         if args.get("_positional"):
-            keyword = " ".join(args["_positional"]).lower()
-            files = [f for f in files if keyword in f.name.lower()]
+            keyword = " ".join(args["_positional"]).casefold()
+            files = self._filter_by_name(files, keyword)
 
         self.current_files = files
         self.last_search = arg
@@ -383,8 +435,7 @@ class FileMapShell(cmd.Cmd):
             console.print("[yellow]请输入过滤关键词[/yellow]")
             return
 
-        keyword = arg.lower()
-        filtered = [f for f in self.current_files if keyword in f.name.lower()]
+        filtered = self._filter_by_name(self.current_files, arg.casefold())
         self.current_files = filtered
 
         if filtered:
@@ -423,17 +474,19 @@ class FileMapShell(cmd.Cmd):
     def _graph_show(self) -> None:
         """显示图谱概览"""
         console.print("[cyan]正在生成知识图谱...[/cyan]")
-        self.knowledge_graph.generate(mode="tags")
+        self._ensure_graph()
 
         stats = self.knowledge_graph.get_stats()
         text = self.knowledge_graph.visualize_text()
 
-        console.print(text)
-        console.print(f"\n[dim]密度: {stats['density']:.4f}, 连通分量: {stats['connected_components']}[/dim]")
+        console.print(Group(
+            text,
+            f"\n[dim]密度: {stats['density']:.4f}, 连通分量: {stats['connected_components']}[/dim]",
+        ))
 
     def _graph_hubs(self) -> None:
         """显示核心节点"""
-        self.knowledge_graph.generate(mode="tags")
+        self._ensure_graph()
         hubs = self.knowledge_graph.find_hubs(top_n=10)
 
         table = Table(title="核心标签 (连接最多)")
@@ -450,30 +503,28 @@ class FileMapShell(cmd.Cmd):
 
     def _graph_tree(self) -> None:
         """树状展示标签关系"""
-        self.knowledge_graph.generate(mode="tags")
+        from rich.tree import Tree
+
+        self._ensure_graph()
 
         # 构建树
         tree = Tree("📊 知识图谱")
 
         # 按类别分组
-        categories = {}
-        for tag in self.datastore.tags.values():
-            cat = self.datastore.get_category(tag.category)
-            cat_name = cat.name if cat else "uncategorized"
-            if cat_name not in categories:
-                categories[cat_name] = []
-            categories[cat_name].append(tag)
+        cat_names = self._category_names()
+        categories = defaultdict(list)
+        for tag in self.datastore.list_tags():
+            categories[cat_names.get(tag.category, "uncategorized")].append(tag)
 
+        graph = self.knowledge_graph.graph
         for cat_name, tags in categories.items():
             cat_branch = tree.add(f"[yellow]{cat_name}[/yellow]")
-            for tag in sorted(tags, key=lambda t: t.usage_count, reverse=True)[:10]:
+            for tag in heapq.nlargest(10, tags, key=attrgetter("usage_count")):
                 # 获取相关标签
                 related = []
-                if tag.tag_id in self.knowledge_graph.graph:
-                    neighbors = list(self.knowledge_graph.graph.neighbors(tag.tag_id))[:3]
-                    for n_id in neighbors:
-                        n_data = self.knowledge_graph.graph.nodes[n_id]
-                        related.append(n_data.get("name", ""))
+                if tag.tag_id in graph:
+                    for n_id in islice(graph.neighbors(tag.tag_id), 3):
+                        related.append(graph.nodes[n_id].get("name", ""))
 
                 related_str = f" → {', '.join(related)}" if related else ""
                 cat_branch.add(f"[cyan]{tag.name}[/cyan] ({tag.usage_count}){related_str}")
@@ -486,18 +537,20 @@ class FileMapShell(cmd.Cmd):
             console.print("[yellow]请先选择文件[/yellow]")
             return
 
-        self.knowledge_graph.generate(mode="tags")
+        self._ensure_graph()
         recommendations = self.knowledge_graph.recommend_tags(self.selected_file.file_id, top_n=5)
 
         if not recommendations:
             console.print("[yellow]暂无推荐[/yellow]")
             return
 
-        console.print(f"为 [cyan]{self.selected_file.name}[/cyan] 推荐的标签:")
-        for tag_id, score in recommendations:
-            tag = self.datastore.get_tag(tag_id)
-            if tag:
-                console.print(f"  • {tag.name} (分数: {score:.2f})")
+        tags = self.datastore.get_tags(tag_id for tag_id, _ in recommendations)
+        lines = [f"为 [cyan]{self.selected_file.name}[/cyan] 推荐的标签:"]
+        lines.extend(
+            f"  • {tags[tag_id].name} (分数: {score:.2f})"
+            for tag_id, score in recommendations if tag_id in tags
+        )
+        console.print(Group(*lines))
 
     # ==================== 统计命令 ====================
 
@@ -507,7 +560,7 @@ class FileMapShell(cmd.Cmd):
 
         panel = Panel(
             f"文件总数: {stats['total_files']}\n"
-            f"总大小: {self._format_size(stats['total_size'])}\n"
+            f"总大小: {format_size(stats['total_size'])}\n"
             f"标签总数: {stats['total_tags']}\n"
             f"类别总数: {stats['total_categories']}\n"
             f"有标签文件: {stats['files_with_tags']}\n"
@@ -561,7 +614,7 @@ class FileMapShell(cmd.Cmd):
 
         panel = Panel(
             f"索引文档数: {stats['total_docs']}\n"
-            f"索引大小: {self._format_size(stats['index_size'])}\n"
+            f"索引大小: {format_size(stats['index_size'])}\n"
             f"最后更新: {stats['last_modified'] or '未知'}",
             title="📑 索引状态",
             border_style="blue",
@@ -582,7 +635,8 @@ class FileMapShell(cmd.Cmd):
             console.print("[dim]提示: 确保文件已创建索引 (使用 'index <file_id>' 命令)[/dim]")
             return
 
-        console.print(f"[green]找到 {len(results)} 个结果:[/green]\n")
+        # 所有结果拼成一组，一次输出
+        lines = [f"[green]找到 {len(results)} 个结果:[/green]\n"]
 
         # 更新当前文件列表
         self.current_files = []
@@ -591,15 +645,17 @@ class FileMapShell(cmd.Cmd):
             if file:
                 self.current_files.append(file)
                 score_pct = int(result['score'] * 100)
-                console.print(f"[bold]{idx}. [{score_pct}%] {result['filename']}[/bold]")
+                lines.append(f"[bold]{idx}. [{score_pct}%] {result['filename']}[/bold]")
 
                 # 显示高亮片段
                 if result['highlights']:
                     for field, hl_text in result['highlights']:
                         if field == 'content' and hl_text:
-                            console.print(f"   [yellow]...{hl_text}...[/yellow]")
+                            lines.append(f"   [yellow]...{hl_text}...[/yellow]")
+
+                lines.append("")
 
-                console.print()
+        console.print(Group(*lines))
 
     # ==================== 系统命令 ====================
 
@@ -672,8 +728,7 @@ class FileMapShell(cmd.Cmd):
             return [s for s in subcmds if s.startswith(text)]
         elif len(parts) >= 3:
             # 补全标签名
-            tag_names = [t.name for t in self.datastore.tags.values()]
-            return [t for t in tag_names if t.startswith(text)]
+            return self._complete_tag_names(text)
 
         return []
 
@@ -681,8 +736,7 @@ class FileMapShell(cmd.Cmd):
         """搜索命令的自动补全"""
         if "--tags" in line:
             # 补全标签名
-            tag_names = [t.name for t in self.datastore.tags.values()]
-            return [t for t in tag_names if t.startswith(text)]
+            return self._complete_tag_names(text)
         return ["--tags"]
 
     def complete_graph(self, text: str, line: str, begidx: int, endidx: int) -> List[str]:
@@ -706,16 +760,92 @@ class FileMapShell(cmd.Cmd):
 
     # ==================== 辅助方法 ====================
 
+    def _confirm(self, message: str) -> bool:
+        """询问确认 (y/N)；在终端中直接读取按键，无需回车"""
+        if termios is None or not sys.stdin.isatty():
+            try:
+                return input(message).strip().lower() == "y"
+            except EOFError:
+                return False
+
+        sys.stdout.write(message)
+        sys.stdout.flush()
+        fd = sys.stdin.fileno()
+        old_attrs = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            # 一次读出所有待读字节，粘贴的多余字符不会残留到下一条命令
+            answer = os.read(fd, 1024).decode(errors="ignore")[:1]
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_attrs)
+        sys.stdout.write(answer + "\n")
+        return answer.lower() == "y"
+
+    def _tags_by_name(self) -> Dict[str, Tag]:
+        """获取标签名称索引 {名称: Tag}（首次使用时构建）"""
+        if self._tag_by_name is None:
+            self._tag_by_name = {tag.name: tag for tag in self.datastore.list_tags()}
+        return self._tag_by_name
+
+    def _complete_tag_names(self, prefix: str) -> List[str]:
+        """返回以 prefix 开头的标签名称（在排序列表上二分定位前缀区间）"""
+        names = self._sorted_tag_names
+        if names is None:
+            names = self._sorted_tag_names = sorted(self._tags_by_name())
+
+        result = []
+        i = bisect.bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix):
+            result.append(names[i])
+            i += 1
+        return result
+
+    def _invalidate_caches(self) -> None:
+        """文件或标签变化后使标签索引失效（图谱依据数据版本号自行判断是否过期）"""
+        self._tag_by_name = None
+        self._sorted_tag_names = None
+
+    def _ensure_graph(self) -> None:
+        """确保知识图谱是最新的：数据版本号未变化时复用已生成的图谱"""
+        if self.knowledge_graph.data_version != self.datastore.data_version():
+            self.knowledge_graph.generate(mode="tags")
+
+    def _category_names(self) -> Dict[str, str]:
+        """一次查询获取 {类别ID: 类别名称}"""
+        return {cat.category_id: cat.name for cat in self.datastore.list_categories()}
+
+    def _files_with_any_tag(self, tag_ids: Optional[List[str]]) -> List[File]:
+        """获取带有任一指定标签的文件（由 file_tags 索引直接求并集）；未指定标签时返回全部文件"""
+        if tag_ids:
+            return self.datastore.get_files_by_tags(tag_ids, match_all=False)
+        return self.datastore.list_files()
+
+    def _filter_by_name(self, files: List[File], keyword: str) -> List[File]:
+        """按关键词过滤文件名（keyword 需已 casefold）"""
+        name_folded = self._name_folded
+        result = []
+        for f in files:
+            name = name_folded.get(f.file_id)
+            if name is None:
+                name = name_folded[f.file_id] = f.name.casefold()
+            if keyword in name:
+                result.append(f)
+        return result
+
     def _parse_args(self, arg_string: str) -> dict:
         """解析命令参数"""
         result = {"_positional": []}
         if not arg_string:
             return result
 
-        try:
-            parts = shlex.split(arg_string)
-        except ValueError:
+        # 没有引号和转义时 shlex 的结果与 str.split 相同，直接走快速路径
+        if '"' not in arg_string and "'" not in arg_string and "\\" not in arg_string:
             parts = arg_string.split()
+        else:
+            try:
+                parts = shlex.split(arg_string)
+            except ValueError:
+                parts = arg_string.split()
 
         i = 0
         while i < len(parts):
@@ -739,23 +869,20 @@ class FileMapShell(cmd.Cmd):
             return None
 
         # 尝试作为序号
-        try:
+        if arg.isdecimal():
             idx = int(arg) - 1
             if 0 <= idx < len(self.current_files):
                 return self.current_files[idx]
-        except ValueError:
-            pass
 
-        # 尝试作为文件ID
-        file = self.datastore.get_file(arg)
+        # 尝试作为文件ID或ID前缀（完整ID也是自身的前缀，一次查询即可）
+        try:
+            file = self.datastore.get_file_by_prefix(arg)
+        except AmbiguousFileIdError:
+            console.print(f"[red]ID前缀匹配到多个文件: {arg}[/red]")
+            return None
         if file:
             return file
 
-        # 尝试匹配ID前缀
-        for f in self.datastore.files.values():
-            if f.file_id.startswith(arg):
-                return f
-
         console.print(f"[red]找不到文件: {arg}[/red]")
         return None
 
@@ -768,22 +895,24 @@ class FileMapShell(cmd.Cmd):
         table.add_column("大小", style="yellow", justify="right")
         table.add_column("标签", style="green")
 
+        # 每个文件最多显示 3 个标签，一次查询取回所有要显示的标签
+        tags = self.datastore.get_tags(
+            ref for file in files for ref in islice(file.tags, 3)
+        )
+        get_tag = tags.get
+        add_row = table.add_row
+
         for idx, file in enumerate(files, 1):
-            # 获取标签名
-            tag_names = []
-            for tag_id in file.tags[:3]:
-                tag = self.datastore.get_tag(tag_id)
-                if tag:
-                    tag_names.append(tag.name)
+            tag_names = [tag.name for tag in map(get_tag, islice(file.tags, 3)) if tag]
             tags_str = ", ".join(tag_names)
             if len(file.tags) > 3:
                 tags_str += f" +{len(file.tags) - 3}"
 
-            table.add_row(
+            add_row(
                 str(idx),
                 file.file_id[:8],
                 file.name[:40],
-                self._format_size(file.size),
+                format_size(file.size),
                 tags_str or "[dim]无[/dim]",
             )
 
@@ -791,16 +920,13 @@ class FileMapShell(cmd.Cmd):
 
     def _show_file_detail(self, file: File) -> None:
         """显示文件详情"""
-        tag_names = []
-        for tag_id in file.tags:
-            tag = self.datastore.get_tag(tag_id)
-            if tag:
-                tag_names.append(tag.name)
+        tags = self.datastore.get_tags(file.tags)
+        tag_names = [tags[ref].name for ref in file.tags if ref in tags]
 
         content = f"""[bold]ID:[/bold] {file.file_id}
 [bold]名称:[/bold] {file.name}
 [bold]路径:[/bold] {file.path}
-[bold]大小:[/bold] {self._format_size(file.size)}
+[bold]大小:[/bold] {format_size(file.size)}
 [bold]类型:[/bold] {file.mime_type}
 [bold]添加时间:[/bold] {file.added_at.strftime('%Y-%m-%d %H:%M')}
 [bold]修改时间:[/bold] {file.modified_at.strftime('%Y-%m-%d %H:%M') if file.modified_at else '未知'}
@@ -810,14 +936,6 @@ class FileMapShell(cmd.Cmd):
         panel = Panel(content, title=f"📄 {file.name}", border_style="blue")
         console.print(panel)
 
-    def _format_size(self, size: int) -> str:
-        """格式化文件大小"""
-        for unit in ["B", "KB", "MB", "GB", "TB"]:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} PB"
-
 
 def run_interactive_shell():
     """运行交互式Shell"""
@@ -1,5 +1,6 @@
 """主CLI入口"""
 import click
+import importlib
 from pathlib import Path
 import os
 
@@ -19,7 +20,37 @@ class Context:
 pass_context = click.make_pass_decorator(Context, ensure=True)
 
 
-@click.group()
+class LazyGroup(click.Group):
+    """按需导入子命令模块的命令组
+
+    子命令以 "模块路径:属性名" 注册，只有在实际调用（或显示帮助）时才导入，
+    避免每次启动都加载 networkx、whoosh 等重量级依赖。
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands:
+            module_name, attr = self.lazy_subcommands[cmd_name].split(":")
+            return getattr(importlib.import_module(module_name), attr)
+        return super().get_command(ctx, cmd_name)
+
+
+@click.group(cls=LazyGroup, lazy_subcommands={
+    "file": "filemap.cli.file_commands:file_group",
+    "tag": "filemap.cli.tag_commands:tag_group",
+    "category": "filemap.cli.category_commands:category_group",
+    "search": "filemap.cli.search_commands:search_group",
+    "graph": "filemap.cli.graph_commands:graph_group",
+    "stats": "filemap.cli.stats_commands:stats_group",
+    "index": "filemap.cli.index_commands:index_group",
+    "migrate": "filemap.cli.migrate_commands:migrate_group",
+})
 @click.version_option(version="0.3.0")
 @pass_context
 def cli(ctx: Context):
@@ -70,22 +101,6 @@ def init(ctx: Context, path: str):
     click.echo(f"  - 配置文件: {config_path}")
 
 
-# 导入子命令组
-from filemap.cli import (
-    file_commands, tag_commands, category_commands, search_commands,
-    graph_commands, stats_commands, index_commands, migrate_commands
-)
-
-cli.add_command(file_commands.file_group)
-cli.add_command(tag_commands.tag_group)
-cli.add_command(category_commands.category_group)
-cli.add_command(search_commands.search_group)
-cli.add_command(graph_commands.graph_group)
-cli.add_command(stats_commands.stats_group)
-cli.add_command(index_commands.index_group)
-cli.add_command(migrate_commands.migrate_group)
-
-
 @cli.command()
 def shell():
     """启动交互式Shell"""
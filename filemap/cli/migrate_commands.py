@@ -1,12 +1,10 @@
 """数据迁移命令"""
 import click
-from rich.console import Console
 from rich.table import Table
 from pathlib import Path
 
 from filemap.storage.migration import DataMigration
-
-console = Console()
+from filemap.cli._console import console
 
 
 @click.group(name="migrate")
@@ -1,16 +1,36 @@
 """搜索和过滤命令"""
 import click
-from rich.console import Console
-from rich.table import Table
-from typing import Optional, List
+from typing import Callable, Optional, List, Pattern, Tuple
+import fnmatch
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 
 from filemap.core.models import File
+from filemap.search import tag_query
 from filemap.cli.main import pass_context, Context
+from filemap.cli._utils import echo_json_array, format_size, tag_lookup
+from filemap.cli._console import console
 
 
-console = Console()
+# 大小表达式中的单个数值，例如: 100, 1.5MB, 10 kb
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*([KMGT]?B)?\s*$", re.IGNORECASE)
+_SIZE_MULTIPLIERS = {None: 1, "B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
+
+
+def _parse_size(s: str) -> int:
+    """解析大小字符串为字节数，无法解析时返回 0"""
+    m = _SIZE_RE.match(s)
+    if not m:
+        return 0
+    unit = m.group(2)
+    return int(float(m.group(1)) * _SIZE_MULTIPLIERS[unit and unit.upper()])
+
+
+@lru_cache(maxsize=128)
+def _name_regex(pattern: str) -> Pattern[str]:
+    """将通配符模式编译为正则（忽略大小写），相同模式只编译一次"""
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE)
 
 
 @click.group(name="search")
@@ -22,7 +42,7 @@ def search_group():
 @search_group.command(name="find")
 @click.argument("keyword", required=False)
 @click.option("--tags", help="标签查询表达式，例如: 'tag1 AND tag2' 或 'tag1 OR tag2'")
-@click.option("--name", help="文件名模式（支持通配符）")
+@click.option("--name", help="文件名通配符，须匹配完整文件名（如 '*.pdf'、'*report*'）")
 @click.option("--type", "mime_type", help="文件类型（MIME类型）")
 @click.option("--size", help="文件大小条件，例如: '>1MB', '<100KB'")
 @click.option("--date", help="日期范围，例如: '2024-01-01..2024-12-31'")
@@ -39,164 +59,135 @@ def search_files(
     output_format: str,
 ):
     """搜索文件"""
-    files = list(ctx.datastore.files.values())
+    # 大小和日期是范围条件，交给数据存储处理（SQLite 在查询中完成，
+    # 不满足的行不会被构造为 File 对象）
+    filters = {}
+    if size:
+        filters["min_size"], filters["max_size"] = _size_range(size)
+    if date:
+        date_range = _date_range(date)
+        if date_range:
+            filters["min_added"], filters["max_added"] = date_range
+
+    # 逐个读取文件；simple/json 输出全程流式处理，不构建完整的文件列表
+    files = ctx.datastore.iter_files(filters)
+
+    # 把所有条件收集为谓词，最后只遍历一次文件列表
+    predicates: List[Callable[[File], bool]] = []
 
     # 按关键词搜索（文件名）
     if keyword:
-        files = [f for f in files if keyword.lower() in f.name.lower()]
+        keyword_lower = keyword.lower()
+        predicates.append(lambda f: keyword_lower in f.name.lower())
 
     # 按文件名模式搜索
     if name:
-        pattern = name.replace("*", ".*").replace("?", ".")
-        regex = re.compile(pattern, re.IGNORECASE)
-        files = [f for f in files if regex.search(f.name)]
+        match = _name_regex(name).match
+        predicates.append(lambda f: match(f.name) is not None)
 
     # 按标签搜索
     if tags:
-        files = _filter_by_tags(files, tags, ctx)
+        predicates.append(_tag_predicate(tags, ctx))
 
     # 按文件类型搜索
     if mime_type:
-        files = [f for f in files if mime_type.lower() in f.mime_type.lower()]
-
-    # 按文件大小搜索
-    if size:
-        files = _filter_by_size(files, size)
+        mime_lower = mime_type.lower()
+        predicates.append(lambda f: mime_lower in f.mime_type.lower())
 
-    # 按日期搜索
-    if date:
-        files = _filter_by_date(files, date)
+    if predicates:
+        files = (f for f in files if all(pred(f) for pred in predicates))
 
-    # 输出结果
+    # 输出结果（表格标题需要结果总数，只有这里才物化为列表）
     if output_format == "table":
-        _display_search_results(files, ctx)
+        _display_search_results(list(files), ctx)
     elif output_format == "simple":
         for file in files:
             click.echo(f"{file.file_id}\t{file.name}\t{file.path}")
     elif output_format == "json":
-        import json
-        data = [f.to_dict() for f in files]
-        click.echo(json.dumps(data, indent=2, ensure_ascii=False))
+        # 逐个文件序列化输出，不构建完整的字典列表和整段 JSON 字符串
+        echo_json_array(f.to_dict() for f in files)
 
 
-def _filter_by_tags(files: List[File], query: str, ctx: Context) -> List[File]:
-    """按标签查询表达式过滤文件"""
-    # 解析标签查询表达式
+def _tag_predicate(query: str, ctx: Context) -> Callable[[File], bool]:
+    """将标签查询表达式转换为过滤条件"""
     # 支持: tag1 AND tag2, tag1 OR tag2, NOT tag1, (tag1 OR tag2) AND tag3
-
-    # 简化处理：先实现基础的AND/OR/NOT
-    query = query.strip()
-
-    # 将标签名转换为ID
-    def get_tag_ids(tag_names: List[str]) -> List[str]:
-        tag_ids = []
-        for name in tag_names:
-            tag = ctx.datastore.get_tag_by_name(name.strip())
-            if tag:
-                tag_ids.append(tag.tag_id)
-        return tag_ids
-
-    # 处理AND
-    if " AND " in query:
-        parts = [p.strip() for p in query.split(" AND ")]
-        tag_ids = get_tag_ids(parts)
-        # 文件必须包含所有标签
-        return [f for f in files if all(tid in f.tags for tid in tag_ids)]
-
-    # 处理OR
-    elif " OR " in query:
-        parts = [p.strip() for p in query.split(" OR ")]
-        tag_ids = get_tag_ids(parts)
-        # 文件包含任一标签
-        return [f for f in files if any(tid in f.tags for tid in tag_ids)]
-
-    # 处理NOT
-    elif query.startswith("NOT "):
-        tag_name = query[4:].strip()
-        tag_ids = get_tag_ids([tag_name])
-        # 文件不包含该标签
-        return [f for f in files if not any(tid in f.tags for tid in tag_ids)]
-
-    # 单个标签
-    else:
-        tag_ids = get_tag_ids([query])
-        return [f for f in files if any(tid in f.tags for tid in tag_ids)]
-
-
-def _filter_by_size(files: List[File], size_expr: str) -> List[File]:
-    """按文件大小过滤"""
+    try:
+        rpn = tag_query.parse(query)
+    except ValueError as e:
+        console.print(f"[red]错误: 标签查询表达式无效 ({e})[/red]")
+        return lambda f: False
+
+    # 一次查询解析所有标签名，再一次查询取回各标签的文件ID集合
+    tags = ctx.datastore.get_tags_by_name(tag_query.tag_names(rpn))
+    file_ids = ctx.datastore.get_tag_file_ids(tag.tag_id for tag in tags.values())
+    empty = frozenset()
+
+    def lookup(name: str):
+        tag = tags.get(name)
+        return file_ids.get(tag.tag_id, empty) if tag else empty
+
+    try:
+        matches = tag_query.evaluate(rpn, lookup)
+    except ValueError as e:
+        console.print(f"[red]错误: 标签查询表达式无效 ({e})[/red]")
+        return lambda f: False
+    return lambda f: matches(f.file_id)
+
+
+def _size_range(size_expr: str) -> Tuple[Optional[int], Optional[int]]:
+    """将大小表达式转换为闭区间 (最小字节数, 最大字节数)，None 表示不限"""
     # 解析大小表达式，例如: >1MB, <100KB, 1MB..10MB
-
-    def parse_size(s: str) -> int:
-        """解析大小字符串为字节数"""
-        s = s.strip().upper()
-        units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
-
-        for unit, multiplier in units.items():
-            if s.endswith(unit):
-                num_str = s[:-len(unit)]
-                try:
-                    return int(float(num_str) * multiplier)
-                except ValueError:
-                    return 0
-        try:
-            return int(s)
-        except ValueError:
-            return 0
-
     size_expr = size_expr.strip()
 
     # 范围查询: 1MB..10MB
     if ".." in size_expr:
         parts = size_expr.split("..")
-        min_size = parse_size(parts[0])
-        max_size = parse_size(parts[1])
-        return [f for f in files if min_size <= f.size <= max_size]
+        return _parse_size(parts[0]), _parse_size(parts[1])
 
-    # 大于: >1MB
+    # 大于: >1MB（大小为整数，严格大于即 >= n + 1）
     elif size_expr.startswith(">"):
-        min_size = parse_size(size_expr[1:])
-        return [f for f in files if f.size > min_size]
+        return _parse_size(size_expr[1:]) + 1, None
 
     # 小于: <1MB
     elif size_expr.startswith("<"):
-        max_size = parse_size(size_expr[1:])
-        return [f for f in files if f.size < max_size]
+        return None, _parse_size(size_expr[1:]) - 1
 
     # 等于
     else:
-        target_size = parse_size(size_expr)
-        return [f for f in files if f.size == target_size]
+        target_size = _parse_size(size_expr)
+        return target_size, target_size
 
 
-def _filter_by_date(files: List[File], date_expr: str) -> List[File]:
-    """按日期过滤"""
+def _date_range(date_expr: str) -> Optional[Tuple[datetime, datetime]]:
+    """将日期表达式转换为闭区间 (起始时间, 结束时间)，格式错误时返回 None（不过滤）"""
     # 解析日期表达式，例如: 2024-01-01..2024-12-31
 
     if ".." in date_expr:
         parts = date_expr.split("..")
         try:
-            start_date = datetime.fromisoformat(parts[0].strip())
-            end_date = datetime.fromisoformat(parts[1].strip())
-            return [f for f in files if start_date <= f.added_at <= end_date]
+            return (
+                datetime.fromisoformat(parts[0].strip()),
+                datetime.fromisoformat(parts[1].strip()),
+            )
         except ValueError:
             console.print("[yellow]警告: 日期格式错误，应为 YYYY-MM-DD[/yellow]")
-            return files
+            return None
     else:
         try:
-            target_date = datetime.fromisoformat(date_expr.strip())
-            # 匹配同一天
-            return [
-                f for f in files
-                if f.added_at.date() == target_date.date()
-            ]
+            day_start = datetime.fromisoformat(date_expr.strip()).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
         except ValueError:
             console.print("[yellow]警告: 日期格式错误，应为 YYYY-MM-DD[/yellow]")
-            return files
+            return None
+        # 匹配同一天：当天 00:00 到当天最后一微秒
+        return day_start, day_start + timedelta(days=1, microseconds=-1)
 
 
 def _display_search_results(files: List[File], ctx: Context):
     """显示搜索结果"""
+    from rich.table import Table
+
     table = Table(title=f"搜索结果 (共 {len(files)} 个文件)")
 
     table.add_column("ID", style="cyan", no_wrap=True, max_width=12)
@@ -205,13 +196,12 @@ def _display_search_results(files: List[File], ctx: Context):
     table.add_column("类型", style="blue")
     table.add_column("标签", style="green")
 
+    # 一次取回全部标签，行内只做字典查找
+    get_tag = tag_lookup(ctx.datastore).get
+
     for file in files:
         # 获取标签名称
-        tag_names = []
-        for tag_id in file.tags[:2]:
-            tag = ctx.datastore.get_tag(tag_id)
-            if tag:
-                tag_names.append(tag.name)
+        tag_names = [tag.name for tag in map(get_tag, file.tags[:2]) if tag]
         tags_str = ", ".join(tag_names)
         if len(file.tags) > 2:
             tags_str += f" (+{len(file.tags) - 2})"
@@ -219,18 +209,9 @@ def _display_search_results(files: List[File], ctx: Context):
         table.add_row(
             file.file_id[:8],
             file.name[:35],
-            _format_size(file.size),
+            format_size(file.size),
             file.mime_type.split("/")[-1][:10],
             tags_str or "[dim]无[/dim]",
         )
 
     console.print(table)
-
-
-def _format_size(size: int) -> str:
-    """格式化文件大小"""
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} PB"
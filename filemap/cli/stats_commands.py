@@ -1,15 +1,21 @@
 """统计和报告命令"""
 import click
-from rich.console import Console
-from rich.table import Table
 from pathlib import Path
 from datetime import datetime
+from bisect import bisect_right
 from collections import Counter
+from itertools import chain
+from typing import List
 
+from filemap.core.models import Tag
 from filemap.cli.main import pass_context, Context
+from filemap.cli._utils import category_names, format_size, tag_lookup
+from filemap.cli._console import console
 
 
-console = Console()
+# 文件大小分布的区间上界（不含）及对应标签，最后一个区间无上界
+_SIZE_BOUNDARIES = (1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+_SIZE_LABELS = ("< 1KB", "1KB - 100KB", "100KB - 1MB", "1MB - 10MB", "10MB - 100MB", "> 100MB")
 
 
 @click.group(name="stats")
@@ -22,6 +28,8 @@ def stats_group():
 @pass_context
 def show_summary(ctx: Context):
     """显示总体统计信息"""
+    from rich.table import Table
+
     stats = ctx.datastore.get_stats()
 
     console.print("[cyan]═══ FileMap 统计信息 ═══[/cyan]\n")
@@ -32,7 +40,7 @@ def show_summary(ctx: Context):
     table.add_column("数值", style="white", justify="right")
 
     table.add_row("文件总数", str(stats["total_files"]))
-    table.add_row("总大小", _format_size(stats["total_size"]))
+    table.add_row("总大小", format_size(stats["total_size"]))
     table.add_row("标签总数", str(stats["total_tags"]))
     table.add_row("类别总数", str(stats["total_categories"]))
     table.add_row("有标签的文件", str(stats["files_with_tags"]))
@@ -54,12 +62,13 @@ def show_summary(ctx: Context):
 
 
 @stats_group.command(name="tags")
-@click.option("--top", default=20, help="显示前N个标签")
+@click.option("--top", type=click.IntRange(1, None), default=20, help="显示前N个标签")
 @pass_context
 def tag_stats(ctx: Context, top: int):
     """标签使用统计"""
-    tags = list(ctx.datastore.tags.values())
-    tags.sort(key=lambda t: t.usage_count, reverse=True)
+    from rich.table import Table
+
+    top_tags = ctx.datastore.top_tags_by_usage(top)
 
     table = Table(title=f"标签使用统计 (Top {top})")
     table.add_column("排名", style="cyan", justify="right")
@@ -67,8 +76,10 @@ def tag_stats(ctx: Context, top: int):
     table.add_column("使用次数", style="green", justify="right")
     table.add_column("类别", style="yellow")
 
-    for idx, tag in enumerate(tags[:top], 1):
-        cat = ctx.datastore.get_category(tag.category)
+    cat_map = ctx.datastore.get_categories(tag.category for tag in top_tags)
+
+    for idx, tag in enumerate(top_tags, 1):
+        cat = cat_map.get(tag.category)
         cat_name = cat.name if cat else "未知"
         table.add_row(str(idx), tag.name, str(tag.usage_count), cat_name)
 
@@ -80,14 +91,13 @@ def tag_stats(ctx: Context, top: int):
 @pass_context
 def distribution_stats(ctx: Context, group_by: str):
     """文件分布统计"""
+    from rich.table import Table
+
     files = list(ctx.datastore.files.values())
 
     if group_by == "type":
-        # 按MIME类型分组
-        type_counter = Counter()
-        for file in files:
-            mime_type = file.mime_type.split("/")[0] if "/" in file.mime_type else file.mime_type
-            type_counter[mime_type] += 1
+        # 按MIME类型分组（Counter 直接消费生成器，计数在 C 层完成）
+        type_counter = Counter(file.mime_type.partition("/")[0] for file in files)
 
         table = Table(title="文件类型分布")
         table.add_column("类型", style="cyan")
@@ -103,14 +113,17 @@ def distribution_stats(ctx: Context, group_by: str):
 
     elif group_by == "category":
         # 按类别分组
-        cat_counter = Counter()
-        for file in files:
-            for tag_id in file.tags:
-                tag = ctx.datastore.get_tag(tag_id)
-                if tag:
-                    cat = ctx.datastore.get_category(tag.category)
-                    if cat:
-                        cat_counter[cat.name] += 1
+        # 预先解析 {标签引用: 类别名称}，逐文件只做一次字典查找
+        cat_names = category_names(ctx.datastore)
+        tag_cat = {
+            ref: cat_names[tag.category]
+            for ref, tag in tag_lookup(ctx.datastore).items()
+            if tag.category in cat_names
+        }
+
+        # 展平所有文件的标签引用，由 Counter 一次计数
+        all_refs = chain.from_iterable(file.tags for file in files)
+        cat_counter = Counter(tag_cat[ref] for ref in all_refs if ref in tag_cat)
 
         table = Table(title="类别分布")
         table.add_column("类别", style="cyan")
@@ -123,29 +136,9 @@ def distribution_stats(ctx: Context, group_by: str):
 
     elif group_by == "size":
         # 按文件大小分组
-        size_ranges = {
-            "< 1KB": 0,
-            "1KB - 100KB": 0,
-            "100KB - 1MB": 0,
-            "1MB - 10MB": 0,
-            "10MB - 100MB": 0,
-            "> 100MB": 0,
-        }
-
+        counts = [0] * len(_SIZE_LABELS)
         for file in files:
-            size = file.size
-            if size < 1024:
-                size_ranges["< 1KB"] += 1
-            elif size < 100 * 1024:
-                size_ranges["1KB - 100KB"] += 1
-            elif size < 1024 * 1024:
-                size_ranges["100KB - 1MB"] += 1
-            elif size < 10 * 1024 * 1024:
-                size_ranges["1MB - 10MB"] += 1
-            elif size < 100 * 1024 * 1024:
-                size_ranges["10MB - 100MB"] += 1
-            else:
-                size_ranges["> 100MB"] += 1
+            counts[bisect_right(_SIZE_BOUNDARIES, file.size)] += 1
 
         table = Table(title="文件大小分布")
         table.add_column("大小范围", style="cyan")
@@ -153,7 +146,7 @@ def distribution_stats(ctx: Context, group_by: str):
         table.add_column("占比", style="yellow", justify="right")
 
         total = len(files)
-        for size_range, count in size_ranges.items():
+        for size_range, count in zip(_SIZE_LABELS, counts):
             percentage = (count / total * 100) if total > 0 else 0
             table.add_row(size_range, str(count), f"{percentage:.1f}%")
 
@@ -166,21 +159,22 @@ def distribution_stats(ctx: Context, group_by: str):
 @pass_context
 def timeline_stats(ctx: Context, period: str, limit: int):
     """时间趋势统计"""
-    files = list(ctx.datastore.files.values())
-    files.sort(key=lambda f: f.added_at)
+    from rich.table import Table
 
-    # 按周期分组
-    period_counter = Counter()
+    files = ctx.datastore.files.values()
 
-    for file in files:
-        if period == "day":
-            key = file.added_at.strftime("%Y-%m-%d")
-        elif period == "week":
-            key = file.added_at.strftime("%Y-W%W")
-        else:  # month
-            key = file.added_at.strftime("%Y-%m")
+    # 按周期分组：先按日期计数，再对每个不同的日期做一次 strftime
+    if period == "day":
+        key_format = "%Y-%m-%d"
+    elif period == "week":
+        key_format = "%Y-W%W"
+    else:  # month
+        key_format = "%Y-%m"
 
-        period_counter[key] += 1
+    day_counter = Counter(file.added_at.date() for file in files)
+    period_counter = Counter()
+    for day, count in day_counter.items():
+        period_counter[day.strftime(key_format)] += count
 
     # 显示最近N个周期
     recent_periods = sorted(period_counter.keys(), reverse=True)[:limit]
@@ -206,17 +200,19 @@ def timeline_stats(ctx: Context, period: str, limit: int):
 @stats_group.command(name="report")
 @click.option("--format", "output_format", type=click.Choice(["text", "markdown", "html"]), default="text", help="报告格式")
 @click.option("--output", type=click.Path(), help="输出文件路径")
+@click.option("--top", type=click.IntRange(1, None), default=10, help="报告中列出前N个标签")
 @pass_context
-def generate_report(ctx: Context, output_format: str, output: str):
+def generate_report(ctx: Context, output_format: str, output: str, top: int):
     """生成统计报告"""
     stats = ctx.datastore.get_stats()
+    top_tags = ctx.datastore.top_tags_by_usage(top)
 
     if output_format == "text":
-        report = _generate_text_report(ctx, stats)
+        report = _generate_text_report(stats, top_tags, top)
     elif output_format == "markdown":
-        report = _generate_markdown_report(ctx, stats)
+        report = _generate_markdown_report(stats, top_tags, top)
     elif output_format == "html":
-        report = _generate_html_report(ctx, stats)
+        report = _generate_html_report(stats, top_tags, top)
     else:
         report = "不支持的格式"
 
@@ -228,7 +224,7 @@ def generate_report(ctx: Context, output_format: str, output: str):
         console.print(report)
 
 
-def _generate_text_report(ctx: Context, stats: dict) -> str:
+def _generate_text_report(stats: dict, top_tags: List[Tag], top: int = 10) -> str:
     """生成文本格式报告"""
     lines = []
     lines.append("=" * 60)
@@ -239,23 +235,22 @@ def _generate_text_report(ctx: Context, stats: dict) -> str:
 
     lines.append("基础统计:")
     lines.append(f"  文件总数: {stats['total_files']}")
-    lines.append(f"  总大小: {_format_size(stats['total_size'])}")
+    lines.append(f"  总大小: {format_size(stats['total_size'])}")
     lines.append(f"  标签总数: {stats['total_tags']}")
     lines.append(f"  类别总数: {stats['total_categories']}")
     lines.append(f"  有标签的文件: {stats['files_with_tags']}")
     lines.append(f"  无标签的文件: {stats['files_without_tags']}")
     lines.append("")
 
-    # 标签TOP10
-    tags = sorted(ctx.datastore.tags.values(), key=lambda t: t.usage_count, reverse=True)
-    lines.append("标签使用 TOP 10:")
-    for idx, tag in enumerate(tags[:10], 1):
+    # 标签TOP N
+    lines.append(f"标签使用 TOP {top}:")
+    for idx, tag in enumerate(top_tags, 1):
         lines.append(f"  {idx}. {tag.name}: {tag.usage_count} 次")
 
     return "\n".join(lines)
 
 
-def _generate_markdown_report(ctx: Context, stats: dict) -> str:
+def _generate_markdown_report(stats: dict, top_tags: List[Tag], top: int = 10) -> str:
     """生成Markdown格式报告"""
     lines = []
     lines.append("# FileMap 统计报告")
@@ -265,27 +260,26 @@ def _generate_markdown_report(ctx: Context, stats: dict) -> str:
     lines.append("| 项目 | 数值 |")
     lines.append("|------|------|")
     lines.append(f"| 文件总数 | {stats['total_files']} |")
-    lines.append(f"| 总大小 | {_format_size(stats['total_size'])} |")
+    lines.append(f"| 总大小 | {format_size(stats['total_size'])} |")
     lines.append(f"| 标签总数 | {stats['total_tags']} |")
     lines.append(f"| 类别总数 | {stats['total_categories']} |")
     lines.append(f"| 有标签的文件 | {stats['files_with_tags']} |")
     lines.append(f"| 无标签的文件 | {stats['files_without_tags']} |")
     lines.append("")
 
-    # 标签TOP10
-    tags = sorted(ctx.datastore.tags.values(), key=lambda t: t.usage_count, reverse=True)
-    lines.append("## 标签使用 TOP 10\n")
+    # 标签TOP N
+    lines.append(f"## 标签使用 TOP {top}\n")
     lines.append("| 排名 | 标签名 | 使用次数 |")
     lines.append("|------|--------|----------|")
-    for idx, tag in enumerate(tags[:10], 1):
+    for idx, tag in enumerate(top_tags, 1):
         lines.append(f"| {idx} | {tag.name} | {tag.usage_count} |")
 
     return "\n".join(lines)
 
 
-def _generate_html_report(ctx: Context, stats: dict) -> str:
+def _generate_html_report(stats: dict, top_tags: List[Tag], top: int = 10) -> str:
     """生成HTML格式报告"""
-    html = f"""<!DOCTYPE html>
+    parts = [f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
@@ -307,35 +301,28 @@ def _generate_html_report(ctx: Context, stats: dict) -> str:
     <table>
         <tr><th>项目</th><th>数值</th></tr>
         <tr><td>文件总数</td><td>{stats['total_files']}</td></tr>
-        <tr><td>总大小</td><td>{_format_size(stats['total_size'])}</td></tr>
+        <tr><td>总大小</td><td>{format_size(stats['total_size'])}</td></tr>
         <tr><td>标签总数</td><td>{stats['total_tags']}</td></tr>
         <tr><td>类别总数</td><td>{stats['total_categories']}</td></tr>
         <tr><td>有标签的文件</td><td>{stats['files_with_tags']}</td></tr>
         <tr><td>无标签的文件</td><td>{stats['files_without_tags']}</td></tr>
     </table>
-"""
+"""]
 
-    # 标签TOP10
-    tags = sorted(ctx.datastore.tags.values(), key=lambda t: t.usage_count, reverse=True)
-    html += """
-    <h2>标签使用 TOP 10</h2>
+    # 标签TOP N
+    parts.append(f"""
+    <h2>标签使用 TOP {top}</h2>
     <table>
         <tr><th>排名</th><th>标签名</th><th>使用次数</th></tr>
-"""
-    for idx, tag in enumerate(tags[:10], 1):
-        html += f"        <tr><td>{idx}</td><td>{tag.name}</td><td>{tag.usage_count}</td></tr>\n"
+""")
+    parts.extend(
+        f"        <tr><td>{idx}</td><td>{tag.name}</td><td>{tag.usage_count}</td></tr>\n"
+        for idx, tag in enumerate(top_tags, 1)
+    )
 
-    html += """    </table>
+    parts.append("""    </table>
 </body>
-</html>"""
-
-    return html
-
+</html>""")
 
-def _format_size(size: int) -> str:
-    """格式化文件大小"""
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} PB"
+    # 各段收集到列表中，最后一次拼接
+    return "".join(parts)
@@ -1,14 +1,11 @@
 """标签管理命令"""
 import click
-from rich.console import Console
-from rich.table import Table
 from typing import Optional
 
 from filemap.core.models import Tag
 from filemap.cli.main import pass_context, Context
-
-
-console = Console()
+from filemap.cli._utils import category_names, file_has_tag
+from filemap.cli._console import console
 
 
 @click.group(name="tag")
@@ -62,6 +59,8 @@ def create_tag(
 @pass_context
 def list_tags(ctx: Context, category: Optional[str], sort: str):
     """列出所有标签"""
+    from rich.table import Table
+
     # 获取类别ID
     category_id = None
     if category:
@@ -88,12 +87,16 @@ def list_tags(ctx: Context, category: Optional[str], sort: str):
     table.add_column("使用次数", style="green", justify="right")
     table.add_column("描述", style="white")
 
-    for tag in tags:
-        cat = ctx.datastore.get_category(tag.category)
-        cat_name = cat.name if cat else "未知"
+    # 一次取回全部类别名称，逐行只做字典查找
+    cat_names = category_names(ctx.datastore)
+    add_row = table.add_row
 
-        table.add_row(
-            tag.name, cat_name, str(tag.usage_count), tag.description or "[dim]无[/dim]"
+    for tag in tags:
+        add_row(
+            tag.name,
+            cat_names.get(tag.category, "未知"),
+            str(tag.usage_count),
+            tag.description or "[dim]无[/dim]",
         )
 
     console.print(table)
@@ -104,6 +107,8 @@ def list_tags(ctx: Context, category: Optional[str], sort: str):
 @pass_context
 def show_tag(ctx: Context, tag_name: str):
     """显示标签详情"""
+    from rich.table import Table
+
     tag = ctx.datastore.get_tag_by_name(tag_name)
     if not tag:
         console.print(f"[red]错误: 标签不存在: {tag_name}[/red]")
@@ -161,18 +166,15 @@ def add_tag_to_file(ctx: Context, file_id: str, tag_names: tuple):
     for tag_name in tag_names:
         tag = ctx.datastore.get_tag_by_name(tag_name)
         if tag:
-            if not file.has_tag(tag.tag_id):
-                file.add_tag(tag.tag_id)
-                tag.usage_count += 1
-                ctx.datastore.update_tag(tag)
-                added_count += 1
+            if not file_has_tag(file, tag):
+                if ctx.datastore.add_tag_to_file(file.file_id, tag.tag_id):
+                    added_count += 1
             else:
                 console.print(f"[yellow]文件已有标签: {tag_name}[/yellow]")
         else:
             console.print(f"[yellow]警告: 标签不存在: {tag_name}[/yellow]")
 
     if added_count > 0:
-        ctx.datastore.update_file(file)
         console.print(f"[green]✓ 已添加 {added_count} 个标签到文件: {file.name}[/green]")
 
 
@@ -191,18 +193,15 @@ def remove_tag_from_file(ctx: Context, file_id: str, tag_names: tuple):
     for tag_name in tag_names:
         tag = ctx.datastore.get_tag_by_name(tag_name)
         if tag:
-            if file.has_tag(tag.tag_id):
-                file.remove_tag(tag.tag_id)
-                tag.usage_count = max(0, tag.usage_count - 1)
-                ctx.datastore.update_tag(tag)
-                removed_count += 1
+            if file_has_tag(file, tag):
+                if ctx.datastore.remove_tag_from_file(file.file_id, tag.tag_id):
+                    removed_count += 1
             else:
                 console.print(f"[yellow]文件没有标签: {tag_name}[/yellow]")
         else:
             console.print(f"[yellow]警告: 标签不存在: {tag_name}[/yellow]")
 
     if removed_count > 0:
-        ctx.datastore.update_file(file)
         console.print(f"[green]✓ 已从文件移除 {removed_count} 个标签: {file.name}[/green]")
 
 
@@ -211,14 +210,15 @@ def remove_tag_from_file(ctx: Context, file_id: str, tag_names: tuple):
 @pass_context
 def tag_stats(ctx: Context, category: Optional[str]):
     """标签使用统计"""
+    from rich.table import Table
+
     category_id = None
     if category:
         cat = ctx.datastore.get_category_by_name(category)
         if cat:
             category_id = cat.category_id
 
-    tags = ctx.datastore.list_tags(category_id)
-    tags.sort(key=lambda t: t.usage_count, reverse=True)
+    tags = ctx.datastore.top_tags_by_usage(20, category_id)  # 显示前20个
 
     table = Table(title="标签使用统计")
     table.add_column("排名", style="cyan", justify="right")
@@ -226,9 +226,8 @@ def tag_stats(ctx: Context, category: Optional[str]):
     table.add_column("使用次数", style="green", justify="right")
     table.add_column("类别", style="yellow")
 
-    for idx, tag in enumerate(tags[:20], 1):  # 显示前20个
-        cat = ctx.datastore.get_category(tag.category)
-        cat_name = cat.name if cat else "未知"
-        table.add_row(str(idx), tag.name, str(tag.usage_count), cat_name)
+    cat_names = category_names(ctx.datastore)
+    for idx, tag in enumerate(tags, 1):
+        table.add_row(str(idx), tag.name, str(tag.usage_count), cat_names.get(tag.category, "未知"))
 
     console.print(table)
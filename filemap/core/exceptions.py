@@ -11,6 +11,11 @@ class FileNotFoundError(FileMapError):
     pass
 
 
+class AmbiguousFileIdError(FileMapError):
+    """文件ID前缀匹配到多个文件"""
+    pass
+
+
 class FileAlreadyExistsError(FileMapError):
     """文件已存在异常"""
     pass
@@ -2,17 +2,43 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import BinaryIO, Dict, List, Optional
 import hashlib
 import mimetypes
+import mmap
+import os
+import shutil
+import sys
 import uuid
 
+# Python 3.10+ 使用 __slots__，实例不再携带 __dict__，减少大量文件载入内存时的占用
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+# 导入文件时流式复制的块大小
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# 无 hashlib.file_digest（Python < 3.11）时逐块计算哈希的块大小
+_HASH_CHUNK_SIZE = 1 << 18
+
+# 超过该大小的文件通过 mmap 直接计算哈希，省去从页缓存到缓冲区的一次复制
+_MMAP_HASH_THRESHOLD = 64 << 20
+
+
+def _new_id() -> str:
+    """生成新的对象ID（32位十六进制，不含连字符）"""
+    return uuid.uuid4().hex
+
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    """datetime 转 ISO 字符串，None 保持为 None"""
+    return dt.isoformat() if dt else None
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Category:
     """标签类别模型"""
 
-    category_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    category_id: str = field(default_factory=_new_id)
     name: str = ""
     description: str = ""
     mutually_exclusive: bool = False
@@ -31,7 +57,7 @@ class Category:
             "color": self.color,
             "icon": self.icon,
             "priority": self.priority,
-            "created_at": self.created_at.isoformat(),
+            "created_at": _iso(self.created_at),
         }
 
     @classmethod
@@ -43,11 +69,11 @@ class Category:
         return cls(**data_copy)
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class Tag:
     """标签模型"""
 
-    tag_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    tag_id: str = field(default_factory=_new_id)
     name: str = ""
     category: str = "uncategorized"  # category_id
     description: str = ""
@@ -56,6 +82,13 @@ class Tag:
     created_at: datetime = field(default_factory=datetime.now)
     usage_count: int = 0
     related_tags: List[Dict[str, float]] = field(default_factory=list)
+    # 标签ID -> related_tags 中对应的条目，更新关联强度时无需线性查找
+    _related_index: Dict[str, Dict] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        self._related_index = {related["tag_id"]: related for related in self.related_tags}
 
     def to_dict(self) -> Dict:
         """转换为字典"""
@@ -66,7 +99,7 @@ class Tag:
             "description": self.description,
             "color": self.color,
             "aliases": self.aliases,
-            "created_at": self.created_at.isoformat(),
+            "created_at": _iso(self.created_at),
             "usage_count": self.usage_count,
             "related_tags": self.related_tags,
         }
@@ -81,19 +114,21 @@ class Tag:
 
     def add_related_tag(self, tag_id: str, strength: float) -> None:
         """添加相关标签"""
-        # 检查是否已存在
-        for related in self.related_tags:
-            if related["tag_id"] == tag_id:
-                related["strength"] = strength
-                return
-        self.related_tags.append({"tag_id": tag_id, "strength": strength})
+        # 已存在时只更新强度
+        related = self._related_index.get(tag_id)
+        if related is not None:
+            related["strength"] = strength
+            return
+        related = {"tag_id": tag_id, "strength": strength}
+        self.related_tags.append(related)
+        self._related_index[tag_id] = related
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class File:
     """文件模型"""
 
-    file_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    file_id: str = field(default_factory=_new_id)
     name: str = ""
     path: str = ""
     managed: bool = False  # True: 导入模式, False: 索引模式
@@ -105,7 +140,7 @@ class File:
     added_at: datetime = field(default_factory=datetime.now)
     last_accessed: Optional[datetime] = None
     tags: List[str] = field(default_factory=list)  # tag_id列表
-    metadata: Dict = field(default_factory=dict)
+    metadata: Optional[Dict] = None  # 多数文件没有元数据，不为每个实例创建空字典
     notes: str = ""
 
     def to_dict(self) -> Dict:
@@ -118,12 +153,12 @@ class File:
             "size": self.size,
             "mime_type": self.mime_type,
             "hash": self.hash,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "modified_at": self.modified_at.isoformat() if self.modified_at else None,
-            "added_at": self.added_at.isoformat(),
-            "last_accessed": self.last_accessed.isoformat() if self.last_accessed else None,
+            "created_at": _iso(self.created_at),
+            "modified_at": _iso(self.modified_at),
+            "added_at": _iso(self.added_at),
+            "last_accessed": _iso(self.last_accessed),
             "tags": self.tags,
-            "metadata": self.metadata,
+            "metadata": self.metadata or {},
             "notes": self.notes,
         }
 
@@ -145,15 +180,52 @@ class File:
         if not p.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        stat = p.stat()
-        mime_type, _ = mimetypes.guess_type(str(p))
-
         # 计算文件哈希
         file_hash = cls._calculate_hash(p)
 
+        return cls._from_stat(p, p.absolute(), file_hash, managed)
+
+    @classmethod
+    def from_path_streaming_copy(cls, src: str, dst: str,
+                                 dst_file: Optional[BinaryIO] = None) -> "File":
+        """复制文件到 dst 并创建File对象（导入模式）
+
+        哈希计算与复制在同一次读取中完成，避免对源文件读取两遍。
+        dst_file 为已打开的目标文件（如以 O_EXCL 创建），提供时直接写入并关闭它。
+        复制失败时会删除已写入的部分目标文件。
+        """
+        p = Path(src)
+        if not p.exists():
+            if dst_file is not None:
+                dst_file.close()
+                Path(dst).unlink(missing_ok=True)
+            raise FileNotFoundError(f"File not found: {src}")
+
+        sha256 = hashlib.sha256()
+        # 复用同一块缓冲区读入，避免每块分配新的 bytes 对象
+        buf = bytearray(_COPY_CHUNK_SIZE)
+        mv = memoryview(buf)
+        try:
+            with open(p, "rb", buffering=0) as fsrc, (dst_file or open(dst, "wb")) as fdst:
+                while n := fsrc.readinto(buf):
+                    sha256.update(mv[:n])
+                    fdst.write(mv[:n])
+            shutil.copystat(p, dst)
+        except BaseException:
+            Path(dst).unlink(missing_ok=True)
+            raise
+
+        return cls._from_stat(p, Path(dst).absolute(), sha256.hexdigest(), managed=True)
+
+    @classmethod
+    def _from_stat(cls, source: Path, path: Path, file_hash: str, managed: bool) -> "File":
+        """根据源文件的 stat 信息创建File对象"""
+        stat = source.stat()
+        mime_type, _ = mimetypes.guess_type(str(source))
+
         return cls(
-            name=p.name,
-            path=str(p.absolute()),
+            name=source.name,
+            path=str(path),
             managed=managed,
             size=stat.st_size,
             mime_type=mime_type or "application/octet-stream",
@@ -163,12 +235,30 @@ class File:
         )
 
     @staticmethod
-    def _calculate_hash(file_path: Path, chunk_size: int = 8192) -> str:
-        """计算文件SHA256哈希值"""
-        sha256 = hashlib.sha256()
+    def _calculate_hash(file_path: Path, chunk_size: int = _HASH_CHUNK_SIZE) -> str:
+        """计算文件SHA256哈希值
+
+        大文件通过 mmap 计算；其余情况在 Python 3.11+ 使用 hashlib.file_digest，
+        读取和计算循环都在 C 中完成，此时忽略 chunk_size。
+        """
         with open(file_path, "rb") as f:
-            while chunk := f.read(chunk_size):
-                sha256.update(chunk)
+            if os.fstat(f.fileno()).st_size >= _MMAP_HASH_THRESHOLD:
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if hasattr(mmap, "MADV_SEQUENTIAL"):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        return hashlib.sha256(mm).hexdigest()
+                except (OSError, ValueError):
+                    # 无法映射（如特殊文件系统）时退回逐块读取
+                    pass
+
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            sha256 = hashlib.sha256()
+            buf = bytearray(chunk_size)
+            mv = memoryview(buf)
+            while n := f.readinto(buf):
+                sha256.update(mv[:n])
         return sha256.hexdigest()
 
     def add_tag(self, tag_id: str) -> None:
@@ -178,21 +268,30 @@ class File:
 
     def remove_tag(self, tag_id: str) -> None:
         """移除标签"""
-        if tag_id in self.tags:
+        try:
             self.tags.remove(tag_id)
+        except ValueError:
+            pass
 
     def has_tag(self, tag_id: str) -> bool:
         """检查是否有指定标签"""
         return tag_id in self.tags
 
     def update_from_filesystem(self) -> None:
-        """从文件系统更新文件信息"""
+        """从文件系统更新文件信息
+
+        大小和修改时间都与记录一致时认为内容未变化，不重新计算哈希。
+        """
         p = Path(self.path)
         if not p.exists():
             raise FileNotFoundError(f"File not found: {self.path}")
 
         stat = p.stat()
+        modified_at = datetime.fromtimestamp(stat.st_mtime)
+        unchanged = bool(self.hash) and stat.st_size == self.size and modified_at == self.modified_at
+
         self.name = p.name
         self.size = stat.st_size
-        self.modified_at = datetime.fromtimestamp(stat.st_mtime)
-        self.hash = self._calculate_hash(p)
+        self.modified_at = modified_at
+        if not unchanged:
+            self.hash = self._calculate_hash(p)
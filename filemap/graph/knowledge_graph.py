@@ -1,11 +1,15 @@
 """知识图谱生成和分析"""
+import heapq
 import networkx as nx
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from collections import Counter, defaultdict
+from itertools import combinations
+from operator import itemgetter
 import json
 
 from filemap.core.models import File, Tag
 from filemap.storage.sqlite_datastore import SQLiteDataStore
+from filemap.utils.fileio import atomic_write
 
 
 class KnowledgeGraph:
@@ -20,6 +24,10 @@ class KnowledgeGraph:
         """
         self.datastore = datastore
         self.graph = nx.Graph()
+        # 标签引用（ID或名称）-> 标签ID，在 generate() 时构建
+        self._tag_ref_ids: Dict[str, str] = {}
+        # 生成图谱时的数据版本号（随图谱保存/加载），用于判断图谱是否过期
+        self.data_version: Optional[int] = None
 
     def generate(self, mode: str = "tags") -> None:
         """
@@ -29,20 +37,35 @@ class KnowledgeGraph:
             mode: 生成模式 - 'tags'（标签关系）, 'files'（文件关系）, 'full'（完整图谱）
         """
         self.graph.clear()
+        # 先记录版本号：生成期间发生的写入会使图谱被视为过期，而不是被漏掉
+        self.data_version = self.datastore.data_version()
+
+        # File.tags 在 SQLite 存储中为标签名称，图谱节点使用标签ID，统一解析
+        tags = self.datastore.tags
+        self._tag_ref_ids = {tag.tag_id: tag.tag_id for tag in tags.values()}
+        self._tag_ref_ids.update((tag.name, tag.tag_id) for tag in tags.values())
+
+        # 文件只读取一次，供各构建步骤共用
+        files = list(self.datastore.iter_files())
 
         if mode in ["tags", "full"]:
-            self._build_tag_graph()
+            self._build_tag_graph(tags, files)
 
         if mode in ["files", "full"]:
-            self._build_file_graph()
+            self._build_file_graph(files)
 
         if mode == "full":
-            self._link_tags_and_files()
+            self._link_tags_and_files(files)
+
+    def _file_tag_ids(self, file: File) -> List[str]:
+        """文件的标签ID列表（忽略无法解析的引用）"""
+        ref_ids = self._tag_ref_ids
+        return [ref_ids[ref] for ref in file.tags if ref in ref_ids]
 
-    def _build_tag_graph(self) -> None:
+    def _build_tag_graph(self, tags: Dict[str, Tag], files: List[File]) -> None:
         """构建标签关系图谱"""
         # 添加标签节点
-        for tag in self.datastore.tags.values():
+        for tag in tags.values():
             self.graph.add_node(
                 tag.tag_id,
                 type="tag",
@@ -52,37 +75,37 @@ class KnowledgeGraph:
             )
 
         # 分析标签共现关系
-        tag_cooccurrence = defaultdict(int)
+        # 标签编码为连续整数下标；每个文件的下标排序后由 combinations 生成有序的
+        # 标签对 (i, j)（i < j），无需逐对排序，计数在 Counter.update 中完成
+        tag_list = list(tags)
+        tag_index = {tag_id: i for i, tag_id in enumerate(tag_list)}
+        tag_cooccurrence = Counter()
 
-        for file in self.datastore.files.values():
+        for file in files:
             # 文件的标签之间两两建立关系
-            for i, tag1_id in enumerate(file.tags):
-                for tag2_id in file.tags[i + 1:]:
-                    pair = tuple(sorted([tag1_id, tag2_id]))
-                    tag_cooccurrence[pair] += 1
+            indices = sorted(tag_index[tag_id] for tag_id in self._file_tag_ids(file))
+            tag_cooccurrence.update(combinations(indices, 2))
 
         # 添加边（只保留共现次数 >= 2 的关系）
-        for (tag1_id, tag2_id), count in tag_cooccurrence.items():
+        for (i, j), count in tag_cooccurrence.items():
             if count >= 2:
-                # 计算关联强度（归一化）
-                tag1 = self.datastore.get_tag(tag1_id)
-                tag2 = self.datastore.get_tag(tag2_id)
-                if tag1 and tag2:
-                    max_usage = max(tag1.usage_count, tag2.usage_count)
-                    strength = count / max_usage if max_usage > 0 else 0
-
-                    self.graph.add_edge(
-                        tag1_id,
-                        tag2_id,
-                        weight=count,
-                        strength=strength,
-                        type="cooccurrence",
-                    )
-
-    def _build_file_graph(self) -> None:
+                tag1_id, tag2_id = tag_list[i], tag_list[j]
+                # 计算关联强度（归一化），使用度数直接取自已加载的标签
+                max_usage = max(tags[tag1_id].usage_count, tags[tag2_id].usage_count)
+                strength = count / max_usage if max_usage > 0 else 0
+
+                self.graph.add_edge(
+                    tag1_id,
+                    tag2_id,
+                    weight=count,
+                    strength=strength,
+                    type="cooccurrence",
+                )
+
+    def _build_file_graph(self, files: List[File]) -> None:
         """构建文件关系图谱"""
         # 添加文件节点
-        for file in self.datastore.files.values():
+        for file in files:
             self.graph.add_node(
                 file.file_id,
                 type="file",
@@ -91,23 +114,34 @@ class KnowledgeGraph:
                 tag_count=len(file.tags),
             )
 
-        # 基于标签相似度建立文件关系
-        files = list(self.datastore.files.values())
-        for i, file1 in enumerate(files):
-            for file2 in files[i + 1:]:
-                similarity = self._calculate_tag_similarity(file1, file2)
-                if similarity > 0.3:  # 只保留相似度 > 0.3 的关系
-                    self.graph.add_edge(
-                        file1.file_id,
-                        file2.file_id,
-                        weight=similarity,
-                        type="similarity",
-                    )
-
-    def _link_tags_and_files(self) -> None:
+        # 基于标签相似度（Jaccard）建立文件关系
+        # 倒排索引: 标签 -> 文件下标列表，只有共享标签的文件对才会被计算
+        tag_sets = [set(file.tags) for file in files]
+        postings = defaultdict(list)
+        for i, file_tags in enumerate(tag_sets):
+            for tag_ref in file_tags:
+                postings[tag_ref].append(i)
+
+        # 文件对 -> 共享标签数（交集大小）
+        shared = Counter()
+        for indices in postings.values():
+            shared.update(combinations(indices, 2))
+
+        for (i, j), intersection in shared.items():
+            union = len(tag_sets[i]) + len(tag_sets[j]) - intersection
+            similarity = intersection / union
+            if similarity > 0.3:  # 只保留相似度 > 0.3 的关系
+                self.graph.add_edge(
+                    files[i].file_id,
+                    files[j].file_id,
+                    weight=similarity,
+                    type="similarity",
+                )
+
+    def _link_tags_and_files(self, files: List[File]) -> None:
         """连接标签和文件"""
-        for file in self.datastore.files.values():
-            for tag_id in file.tags:
+        for file in files:
+            for tag_id in self._file_tag_ids(file):
                 if tag_id in self.graph and file.file_id in self.graph:
                     self.graph.add_edge(
                         file.file_id,
@@ -115,28 +149,6 @@ class KnowledgeGraph:
                         type="tagged",
                     )
 
-    def _calculate_tag_similarity(self, file1: File, file2: File) -> float:
-        """
-        计算两个文件的标签相似度（Jaccard相似度）
-
-        Args:
-            file1: 文件1
-            file2: 文件2
-
-        Returns:
-            相似度 (0-1)
-        """
-        if not file1.tags or not file2.tags:
-            return 0.0
-
-        tags1 = set(file1.tags)
-        tags2 = set(file2.tags)
-
-        intersection = len(tags1 & tags2)
-        union = len(tags1 | tags2)
-
-        return intersection / union if union > 0 else 0.0
-
     def find_hubs(self, top_n: int = 10) -> List[Tuple[str, int]]:
         """
         识别核心节点（度中心性最高的节点）
@@ -147,9 +159,7 @@ class KnowledgeGraph:
         Returns:
             (节点ID, 度数) 列表
         """
-        degrees = dict(self.graph.degree())
-        sorted_nodes = sorted(degrees.items(), key=lambda x: x[1], reverse=True)
-        return sorted_nodes[:top_n]
+        return heapq.nlargest(top_n, self.graph.degree(), key=itemgetter(1))
 
     def find_orphans(self, node_type: Optional[str] = None) -> List[str]:
         """
@@ -161,16 +171,14 @@ class KnowledgeGraph:
         Returns:
             孤立节点ID列表
         """
-        orphans = []
-        for node in self.graph.nodes():
-            if self.graph.degree(node) <= 1:
-                if node_type is None:
-                    orphans.append(node)
-                else:
-                    node_data = self.graph.nodes[node]
-                    if node_data.get("type") == node_type:
-                        orphans.append(node)
-        return orphans
+        if node_type is None:
+            return [node for node, degree in self.graph.degree() if degree <= 1]
+
+        node_types = dict(self.graph.nodes(data="type"))
+        return [
+            node for node, degree in self.graph.degree()
+            if degree <= 1 and node_types[node] == node_type
+        ]
 
     def find_communities(self) -> Dict[int, List[str]]:
         """
@@ -182,18 +190,21 @@ class KnowledgeGraph:
         if len(self.graph) == 0:
             return {}
 
-        # 使用Louvain算法进行社区发现
+        # 使用Louvain算法进行社区发现（优先使用 igraph 的 C 实现）
         try:
-            import community as community_louvain
-            partition = community_louvain.best_partition(self.graph)
+            partition = self._igraph_partition()
         except ImportError:
-            # 如果没有python-louvain库，使用NetworkX的贪心模块化社区
-            from networkx.algorithms import community
-            communities = community.greedy_modularity_communities(self.graph)
-            partition = {}
-            for idx, comm in enumerate(communities):
-                for node in comm:
-                    partition[node] = idx
+            try:
+                import community as community_louvain
+                partition = community_louvain.best_partition(self.graph)
+            except ImportError:
+                # 如果没有python-louvain库，使用NetworkX的贪心模块化社区
+                from networkx.algorithms import community
+                communities = community.greedy_modularity_communities(self.graph)
+                partition = {}
+                for idx, comm in enumerate(communities):
+                    for node in comm:
+                        partition[node] = idx
 
         # 重组为 {社区ID: [节点列表]}
         result = defaultdict(list)
@@ -202,6 +213,31 @@ class KnowledgeGraph:
 
         return dict(result)
 
+    def _igraph_partition(self) -> Dict[str, int]:
+        """
+        使用 igraph 的 multilevel（Louvain）算法划分社区
+
+        Raises:
+            ImportError: 未安装 python-igraph
+        """
+        import igraph
+
+        nodes = list(self.graph)
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = []
+        weights = []
+        for u, v, weight in self.graph.edges(data="weight", default=1):
+            edges.append((index[u], index[v]))
+            weights.append(weight)
+
+        g = igraph.Graph(n=len(nodes), edges=edges, directed=False)
+        clustering = g.community_multilevel(weights=weights or None)
+        return {
+            nodes[i]: comm_id
+            for comm_id, members in enumerate(clustering)
+            for i in members
+        }
+
     def recommend_tags(self, file_id: str, top_n: int = 5) -> List[Tuple[str, float]]:
         """
         为文件推荐标签
@@ -217,15 +253,17 @@ class KnowledgeGraph:
         if not file:
             return []
 
-        # 基于文件现有标签，找出经常与之共现的其他标签
+        # 基于文件现有标签，找出经常与之共现的其他标签（图谱节点为标签ID）
         tag_scores = Counter()
+        own_tag_ids = [tag.tag_id for tag in self.datastore.get_tags(file.tags).values()]
+        own_tags = set(own_tag_ids)
 
-        for tag_id in file.tags:
+        for tag_id in own_tag_ids:
             # 找出与当前标签相关的其他标签
             if tag_id in self.graph:
                 for neighbor in self.graph.neighbors(tag_id):
                     neighbor_data = self.graph.nodes[neighbor]
-                    if neighbor_data.get("type") == "tag" and neighbor not in file.tags:
+                    if neighbor_data.get("type") == "tag" and neighbor not in own_tags:
                         edge_data = self.graph.get_edge_data(tag_id, neighbor)
                         weight = edge_data.get("weight", 1) if edge_data else 1
                         tag_scores[neighbor] += weight
@@ -248,17 +286,20 @@ class KnowledgeGraph:
                 "file_nodes": 0,
                 "avg_degree": 0,
                 "density": 0,
+                "connected_components": 0,
             }
 
-        tag_nodes = sum(1 for n in self.graph.nodes() if self.graph.nodes[n].get("type") == "tag")
-        file_nodes = sum(1 for n in self.graph.nodes() if self.graph.nodes[n].get("type") == "file")
+        type_counts = Counter(node_type for _, node_type in self.graph.nodes(data="type"))
+        total_nodes = self.graph.number_of_nodes()
+        total_edges = self.graph.number_of_edges()
 
         return {
-            "total_nodes": len(self.graph.nodes()),
-            "total_edges": len(self.graph.edges()),
-            "tag_nodes": tag_nodes,
-            "file_nodes": file_nodes,
-            "avg_degree": sum(dict(self.graph.degree()).values()) / len(self.graph.nodes()),
+            "total_nodes": total_nodes,
+            "total_edges": total_edges,
+            "tag_nodes": type_counts["tag"],
+            "file_nodes": type_counts["file"],
+            # 无向图中度数之和等于边数的两倍
+            "avg_degree": 2 * total_edges / total_nodes,
             "density": nx.density(self.graph),
             "connected_components": nx.number_connected_components(self.graph),
         }
@@ -270,35 +311,71 @@ class KnowledgeGraph:
         Returns:
             图谱数据字典
         """
-        nodes = []
-        for node_id in self.graph.nodes():
-            node_data = self.graph.nodes[node_id].copy()
-            node_data["id"] = node_id
-            nodes.append(node_data)
-
-        edges = []
-        for u, v, data in self.graph.edges(data=True):
-            edge_data = data.copy()
-            edge_data["source"] = u
-            edge_data["target"] = v
-            edges.append(edge_data)
-
         return {
-            "nodes": nodes,
-            "edges": edges,
+            "nodes": list(self._iter_node_dicts()),
+            "edges": list(self._iter_edge_dicts()),
             "stats": self.get_stats(),
         }
 
+    def _iter_node_dicts(self) -> Iterator[Dict]:
+        """逐个产出节点的导出字典"""
+        for node_id, data in self.graph.nodes(data=True):
+            yield {**data, "id": node_id}
+
+    def _iter_edge_dicts(self) -> Iterator[Dict]:
+        """逐个产出边的导出字典"""
+        for u, v, data in self.graph.edges(data=True):
+            yield {**data, "source": u, "target": v}
+
     def save(self, file_path: str) -> None:
         """
-        保存图谱到文件
+        保存图谱到文件（结构与 export_json() 相同，另记录生成时的数据版本号）
+
+        节点和边逐个序列化写入，每行一个，不构建完整的导出结构；
+        不使用缩进，序列化可由 json 模块的 C 编码器完成。
 
         Args:
             file_path: 保存路径
         """
-        data = self.export_json()
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+
+        def lines(items: Iterator[Dict]) -> Iterator[bytes]:
+            first = True
+            for item in items:
+                yield (("\n" if first else ",\n") + encode(item)).encode("utf-8")
+                first = False
+
+        with atomic_write(file_path) as f:
+            f.write(b'{')
+            if self.data_version is not None:
+                f.write(f'"data_version": {self.data_version}, '.encode("utf-8"))
+            f.write(b'"nodes": [')
+            f.writelines(lines(self._iter_node_dicts()))
+            f.write(b'\n], "edges": [')
+            f.writelines(lines(self._iter_edge_dicts()))
+            f.write(b'\n], "stats": ')
+            f.write(encode(self.get_stats()).encode("utf-8"))
+            f.write(b"}\n")
+
+    def load(self, file_path: str) -> None:
+        """
+        从 save() 保存的文件加载图谱
+
+        Args:
+            file_path: 图谱文件路径
+        """
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.graph.clear()
+        self.data_version = data.get("data_version")
+        for node_data in data.get("nodes", []):
+            attrs = {k: v for k, v in node_data.items() if k != "id"}
+            self.graph.add_node(node_data["id"], **attrs)
+
+        for edge_data in data.get("edges", []):
+            attrs = {k: v for k, v in edge_data.items() if k not in ("source", "target")}
+            self.graph.add_edge(edge_data["source"], edge_data["target"], **attrs)
 
     def visualize_text(self, max_nodes: int = 50) -> str:
         """
@@ -328,18 +405,18 @@ class KnowledgeGraph:
         lines.append("")
 
         # 显示标签共现关系（权重最高的）
+        # 节点类型和名称一次取出为普通字典，避免逐边经由 NodeView 查找
+        node_types = dict(self.graph.nodes(data="type"))
+        names = dict(self.graph.nodes(data="name"))
         tag_edges = [
-            (u, v, data) for u, v, data in self.graph.edges(data=True)
-            if self.graph.nodes[u].get("type") == "tag" and self.graph.nodes[v].get("type") == "tag"
+            (u, v, weight) for u, v, weight in self.graph.edges(data="weight", default=0)
+            if node_types[u] == "tag" and node_types[v] == "tag"
         ]
 
         if tag_edges:
-            tag_edges.sort(key=lambda x: x[2].get("weight", 0), reverse=True)
+            tag_edges.sort(key=itemgetter(2), reverse=True)
             lines.append("标签关联关系 (共现次数最多):")
-            for u, v, data in tag_edges[:10]:
-                tag1_name = self.graph.nodes[u].get("name")
-                tag2_name = self.graph.nodes[v].get("name")
-                weight = data.get("weight", 0)
-                lines.append(f"  • {tag1_name} <--({weight})-->  {tag2_name}")
+            for u, v, weight in tag_edges[:10]:
+                lines.append(f"  • {names[u]} <--({weight})-->  {names[v]}")
 
         return "\n".join(lines)
@@ -2,20 +2,40 @@
 from whoosh.analysis import Tokenizer, Token
 from whoosh.analysis.analyzers import CompositeAnalyzer
 from whoosh.analysis.filters import LowercaseFilter, StopFilter
+from functools import lru_cache
 import re
 
+# 默认中文停用词
+_DEFAULT_STOPWORDS = frozenset({
+    '的', '了', '在', '是', '我', '有', '和', '就',
+    '不', '人', '都', '一', '一个', '上', '也', '很',
+    '到', '说', '要', '去', '你', '会', '着', '没有',
+    '看', '好', '自己', '这', '那', '里', '来', '而',
+    '为', '以', '与', '及', '或', '等', '之', '于',
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on',
+    'at', 'to', 'for', 'of', 'with', 'by', 'from', 'as'
+})
+
+
+@lru_cache(maxsize=1)
+def _load_jieba():
+    """导入 jieba 并加载词典（首次需要分词时执行一次，导入本模块时不加载）"""
+    try:
+        import jieba
+    except ImportError:
+        raise ImportError("jieba not installed. Install with: pip install jieba")
+    jieba.initialize()
+    return jieba
+
 
 class ChineseTokenizer(Tokenizer):
     """中文分词器（基于jieba）"""
 
     def __init__(self):
         super().__init__()
-        # 不存储jieba模块引用，每次使用时导入
-        try:
-            import jieba
-            # 测试导入
-        except ImportError:
-            raise ImportError("jieba not installed. Install with: pip install jieba")
+        # 分词器会随索引 schema 一起被 pickle，因此不在实例上保存jieba引用；
+        # 首次创建时加载词典，避免把加载开销留给第一次查询
+        _load_jieba()
 
     def __call__(self, value, positions=False, chars=False, keeporiginal=False,
                  removestops=True, start_pos=0, start_char=0, mode='', **kwargs):
@@ -29,22 +49,24 @@ class ChineseTokenizer(Tokenizer):
         """
         assert isinstance(value, str), f"Expected str, got {type(value)}"
 
-        # 每次使用时导入jieba
-        import jieba
+        # 与 whoosh 内置分词器一致：复用同一个 Token，调用方在下一次 yield 前读取字段
+        token = Token(positions, chars, removestops=removestops, mode=mode, **kwargs)
 
-        pos = start_pos
-        for word in jieba.cut_for_search(value):
-            token = Token()
+        for pos, word in enumerate(_load_jieba().cut_for_search(value), start_pos):
             token.text = word
-            token.pos = pos
-            token.startchar = start_char
-            token.endchar = start_char + len(word)
+            token.boost = 1.0
+            token.stopped = False
+            if keeporiginal:
+                token.original = word
+            if positions:
+                token.pos = pos
+            if chars:
+                token.startchar = start_char
+                start_char += len(word)
+                token.endchar = start_char
 
             yield token
 
-            pos += 1
-            start_char += len(word)
-
 
 class ChineseAnalyzer(CompositeAnalyzer):
     """中文分析器（分词 + 小写 + 停用词）"""
@@ -58,7 +80,7 @@ class ChineseAnalyzer(CompositeAnalyzer):
         """
         # 默认中文停用词
         if stoplist is None:
-            stoplist = self._default_chinese_stopwords()
+            stoplist = _DEFAULT_STOPWORDS
 
         tokenizer = ChineseTokenizer()
         filters = [
@@ -73,15 +95,7 @@ class ChineseAnalyzer(CompositeAnalyzer):
     @staticmethod
     def _default_chinese_stopwords():
         """默认中文停用词"""
-        return {
-            '的', '了', '在', '是', '我', '有', '和', '就',
-            '不', '人', '都', '一', '一个', '上', '也', '很',
-            '到', '说', '要', '去', '你', '会', '着', '没有',
-            '看', '好', '自己', '这', '那', '里', '来', '而',
-            '为', '以', '与', '及', '或', '等', '之', '于',
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on',
-            'at', 'to', 'for', 'of', 'with', 'by', 'from', 'as'
-        }
+        return _DEFAULT_STOPWORDS
 
 
 def create_chinese_analyzer():
@@ -1,10 +1,228 @@
 """PDF文本提取器"""
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
+from functools import lru_cache
+import codecs
+import importlib
 import logging
+import multiprocessing
+import os
 
 logger = logging.getLogger(__name__)
 
+# 文本文件的字节序标记 -> 编码
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# 页数超过该值时，其余页面分块交给进程池并行提取
+_PARALLEL_MIN_PAGES = 8
+
+class ExtractionResult(dict):
+    """
+    提取结果
+
+    'text' 和 'pages' 只保存其中一项，另一项在访问时由已保存的一项生成且不缓存，
+    避免大文件的文本在内存中保留两份。生成的一项同样出现在 in / keys() / items() 中，
+    dict(result) 和 json.dumps(result) 的结果与保存两项时一致。
+    """
+
+    _PAIRED = {'text': 'pages', 'pages': 'text'}
+
+    def _derived_key(self) -> Optional[str]:
+        """由已保存的一项生成的键，两项都已保存时为 None"""
+        for key, source in self._PAIRED.items():
+            if not dict.__contains__(self, key) and dict.__contains__(self, source):
+                return key
+        return None
+
+    def __missing__(self, key):
+        if key == self._derived_key():
+            source = dict.__getitem__(self, self._PAIRED[key])
+            return '\n'.join(source) if key == 'text' else [source]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key == self._derived_key()
+
+    def __iter__(self):
+        yield from dict.__iter__(self)
+        derived = self._derived_key()
+        if derived is not None:
+            yield derived
+
+    def __len__(self):
+        return dict.__len__(self) + (self._derived_key() is not None)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def _page_text(page_num: int, extract: Callable[[], str]) -> str:
+    """提取单页文本，失败时记录警告并返回空串"""
+    try:
+        return extract()
+    except Exception as e:
+        logger.warning(f"Failed to extract text from page {page_num}: {e}")
+        return ''
+
+
+def _read_with_pdfium(file_path: str, start: int = 0,
+                      stop: Optional[int] = None) -> Tuple[List[str], Dict, int]:
+    """使用 pypdfium2 读取 [start, stop) 页的文本、元数据和总页数"""
+    import pypdfium2 as pdfium
+
+    doc = pdfium.PdfDocument(file_path)
+    try:
+        page_count = len(doc)
+        pages = [
+            _page_text(i, lambda: doc[i].get_textpage().get_text_range())
+            for i in range(*slice(start, stop).indices(page_count))
+        ]
+        info = doc.get_metadata_dict()
+    finally:
+        doc.close()
+
+    metadata = {
+        'title': info.get('Title', ''),
+        'author': info.get('Author', ''),
+        'subject': info.get('Subject', ''),
+        'creator': info.get('Creator', ''),
+        'producer': info.get('Producer', ''),
+        'creation_date': info.get('CreationDate', ''),
+    }
+    return pages, metadata, page_count
+
+
+def _read_with_fitz(file_path: str, start: int = 0,
+                    stop: Optional[int] = None) -> Tuple[List[str], Dict, int]:
+    """使用 PyMuPDF 读取 [start, stop) 页的文本、元数据和总页数"""
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        page_count = doc.page_count
+        pages = [
+            _page_text(i, doc[i].get_text)
+            for i in range(*slice(start, stop).indices(page_count))
+        ]
+        info = doc.metadata or {}
+
+    metadata = {
+        'title': info.get('title', ''),
+        'author': info.get('author', ''),
+        'subject': info.get('subject', ''),
+        'creator': info.get('creator', ''),
+        'producer': info.get('producer', ''),
+        'creation_date': info.get('creationDate', ''),
+    }
+    return pages, metadata, page_count
+
+
+def _read_with_pypdf2(file_path: str, start: int = 0,
+                      stop: Optional[int] = None) -> Tuple[List[str], Dict, int]:
+    """使用 PyPDF2 读取 [start, stop) 页的文本、元数据和总页数"""
+    import PyPDF2
+
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+
+        # 提取元数据
+        metadata = {}
+        try:
+            info = reader.metadata
+            if info:
+                metadata = {
+                    'title': info.get('/Title', ''),
+                    'author': info.get('/Author', ''),
+                    'subject': info.get('/Subject', ''),
+                    'creator': info.get('/Creator', ''),
+                    'producer': info.get('/Producer', ''),
+                    'creation_date': str(info.get('/CreationDate', '')),
+                }
+        except Exception as e:
+            logger.warning(f"Failed to extract PDF metadata: {e}")
+
+        # 提取文本
+        page_count = len(reader.pages)
+        pages = [
+            _page_text(i, reader.pages[i].extract_text)
+            for i in range(*slice(start, stop).indices(page_count))
+        ]
+
+    return pages, metadata, page_count
+
+
+# PDF 解析后端按速度优先: pypdfium2 (PDFium) > PyMuPDF (MuPDF) > PyPDF2（纯 Python）
+_PDF_BACKENDS = (
+    ("pypdfium2", _read_with_pdfium),
+    ("fitz", _read_with_fitz),
+    ("PyPDF2", _read_with_pypdf2),
+)
+
+
+@lru_cache(maxsize=1)
+def _pdf_reader() -> Optional[Callable[..., Tuple[List[str], Dict, int]]]:
+    """选择可用的 PDF 解析后端（首次提取 PDF 时导入，结果缓存），都不可用时返回 None"""
+    for module_name, reader in _PDF_BACKENDS:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            continue
+        return reader
+    return None
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """提取 [start, stop) 页的文本（供进程池调用）"""
+    return _pdf_reader()(file_path, start, stop)[0]
+
+
+def _read_pages(file_path: str) -> Tuple[List[str], Dict]:
+    """
+    读取全部页面文本和元数据
+
+    先在当前进程读取前几页并得到总页数；页数较多时，其余页面按块分给进程池，
+    每个工作进程只打开一次文件，按块顺序拼接结果以保持页序。
+    进程池只在本次读取期间存在，结束后即关闭，不会在交互式 Shell 中残留空闲进程。
+    已在工作进程中（例如 index_files_parallel）时不再嵌套创建进程池。
+    """
+    read_pdf = _pdf_reader()
+    pages, metadata, page_count = read_pdf(file_path, 0, _PARALLEL_MIN_PAGES)
+    if page_count <= _PARALLEL_MIN_PAGES:
+        return pages, metadata
+
+    if multiprocessing.parent_process() is not None:
+        return pages + read_pdf(file_path, _PARALLEL_MIN_PAGES)[0], metadata
+
+    remaining = page_count - _PARALLEL_MIN_PAGES
+    chunk = max(_PARALLEL_MIN_PAGES, -(-remaining // (os.cpu_count() or 1)))
+    starts = range(_PARALLEL_MIN_PAGES, page_count, chunk)
+    stops = [min(start + chunk, page_count) for start in starts]
+    if len(starts) == 1:
+        return pages + read_pdf(file_path, _PARALLEL_MIN_PAGES)[0], metadata
+
+    with ProcessPoolExecutor(max_workers=len(starts)) as pool:
+        for chunk_pages in pool.map(_extract_page_range, [file_path] * len(starts), starts, stops):
+            pages.extend(chunk_pages)
+    return pages, metadata
+
 
 class PDFExtractor:
     """PDF文本提取器"""
@@ -26,53 +244,22 @@ class PDFExtractor:
                 'success': bool,       # 是否成功
                 'error': str          # 错误信息
             }
+            成功时返回 ExtractionResult，'text' 由 'pages' 按需拼接
         """
         try:
-            import PyPDF2
+            if _pdf_reader() is None:
+                raise ImportError
 
-            result = {
-                'text': '',
-                'pages': [],
-                'page_count': 0,
-                'metadata': {},
-                'success': False,
-                'error': ''
-            }
+            pages, metadata = _read_pages(file_path)
 
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-
-                # 提取元数据
-                try:
-                    metadata = reader.metadata
-                    if metadata:
-                        result['metadata'] = {
-                            'title': metadata.get('/Title', ''),
-                            'author': metadata.get('/Author', ''),
-                            'subject': metadata.get('/Subject', ''),
-                            'creator': metadata.get('/Creator', ''),
-                            'producer': metadata.get('/Producer', ''),
-                            'creation_date': str(metadata.get('/CreationDate', '')),
-                        }
-                except Exception as e:
-                    logger.warning(f"Failed to extract PDF metadata: {e}")
-
-                # 提取文本
-                pages = []
-                for page_num, page in enumerate(reader.pages):
-                    try:
-                        text = page.extract_text()
-                        pages.append(text)
-                    except Exception as e:
-                        logger.warning(f"Failed to extract text from page {page_num}: {e}")
-                        pages.append('')
-
-                result['pages'] = pages
-                result['page_count'] = len(reader.pages)
-                result['text'] = '\n'.join(pages)
-                result['success'] = True
-
-            return result
+            # 'text' 在访问时由 pages 拼接
+            return ExtractionResult(
+                pages=pages,
+                page_count=len(pages),
+                metadata=metadata,
+                success=True,
+                error='',
+            )
 
         except ImportError:
             return {
@@ -117,49 +304,76 @@ class TextExtractor:
     def extract(file_path: str) -> Dict:
         """从文本文件提取内容"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-
+            # 只读取一次文件，在内存中依次尝试编码
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+        except Exception as e:
             return {
-                'text': text,
-                'pages': [text],  # 文本文件没有分页
-                'page_count': 1,
+                'text': '',
+                'pages': [],
+                'page_count': 0,
                 'metadata': {},
-                'success': True,
-                'error': ''
+                'success': False,
+                'error': str(e)
             }
-        except UnicodeDecodeError:
-            # 尝试其他编码
-            try:
-                with open(file_path, 'r', encoding='gbk') as f:
-                    text = f.read()
-                return {
-                    'text': text,
-                    'pages': [text],
-                    'page_count': 1,
-                    'metadata': {},
-                    'success': True,
-                    'error': ''
-                }
-            except Exception as e:
-                return {
-                    'text': '',
-                    'pages': [],
-                    'page_count': 0,
-                    'metadata': {},
-                    'success': False,
-                    'error': f'Encoding error: {e}'
-                }
-        except Exception as e:
+
+        try:
+            text = TextExtractor._decode(raw)
+        except (UnicodeDecodeError, LookupError) as e:
             return {
                 'text': '',
                 'pages': [],
                 'page_count': 0,
                 'metadata': {},
                 'success': False,
-                'error': str(e)
+                'error': f'Encoding error: {e}'
             }
 
+        # 与文本模式读取一致，统一换行符
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+        # 文本文件没有分页，'pages' 在访问时由 text 生成
+        return ExtractionResult(
+            text=text,
+            page_count=1,
+            metadata={},
+            success=True,
+            error='',
+        )
+
+    @staticmethod
+    def _decode(raw: bytes) -> str:
+        """
+        解码文本：字节序标记 > UTF-8 > GBK > charset-normalizer 检测（如已安装）
+
+        Raises:
+            UnicodeDecodeError: 无法解码
+        """
+        for bom, encoding in _BOMS:
+            if raw.startswith(bom):
+                return raw.decode(encoding)
+
+        try:
+            return raw.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+
+        try:
+            return raw.decode('gbk')
+        except UnicodeDecodeError as e:
+            error = e
+
+        # 可选依赖，仅在 UTF-8 和 GBK 都失败时导入
+        try:
+            from charset_normalizer import from_bytes
+        except ImportError:
+            raise error
+        best = from_bytes(raw).best()
+        if best is None:
+            raise error
+        return raw.decode(best.encoding)
+
     @staticmethod
     def can_extract(file_path: str) -> bool:
         """检查是否可以提取该文件"""
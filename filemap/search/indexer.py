@@ -1,13 +1,19 @@
 """全文索引管理器"""
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple
 from datetime import datetime
 import logging
+import os
+import time
 
 from whoosh import index
 from whoosh.fields import Schema, TEXT, ID, DATETIME, NUMERIC, BOOLEAN
-from whoosh.qparser import QueryParser, MultifieldParser
+from whoosh.qparser import MultifieldParser
 from whoosh.highlight import UppercaseFormatter, ContextFragmenter
+from whoosh.writing import CLEAR
 
 from filemap.search.analyzer import ChineseAnalyzer
 from filemap.search.extractors.pdf_extractor import ExtractorFactory
@@ -15,6 +21,32 @@ from filemap.core.models import File
 
 logger = logging.getLogger(__name__)
 
+# 批量索引时写入器的内存上限（MB），超过后 Whoosh 会把缓冲区刷到临时文件
+_WRITER_LIMIT_MB = 512
+
+# 一批文档数达到该值时使用多进程、多段写入器（进程启动的开销对小批量不划算）
+_MULTISEGMENT_MIN_DOCS = 256
+
+# 搜索结果缓存：最多条目数、有效期（秒），以及耗时低于该值（秒）的查询不缓存
+_SEARCH_CACHE_SIZE = 128
+_SEARCH_CACHE_TTL = 60
+_SEARCH_CACHE_MIN_SECONDS = 0.02
+
+
+class _IndexedState(NamedTuple):
+    """已索引文档的状态，用于判断文件是否需要重新索引"""
+    indexed_at: Optional[datetime]
+    mtime_ns: Optional[int]  # 旧版本建立的索引中没有该字段
+    size: Optional[int]
+
+
+def _extract_for_index(file_path: str) -> Optional[Dict]:
+    """提取文件文本（供进程池调用，只返回建索引需要的字段以减少进程间传输）"""
+    extracted = ExtractorFactory.extract(file_path)
+    if not extracted:
+        return None
+    return {key: extracted.get(key) for key in ('text', 'page_count', 'success', 'error')}
+
 
 class ContentIndexer:
     """全文索引管理器"""
@@ -39,14 +71,33 @@ class ContentIndexer:
             page_count=NUMERIC(stored=True),
             indexed_at=DATETIME(stored=True),
             file_size=NUMERIC(stored=True),
+            mtime_ns=NUMERIC(int, bits=64, stored=True),
         )
 
         # 创建或打开索引
         if index.exists_in(str(self.index_dir)):
             self.ix = index.open_dir(str(self.index_dir))
+            self._upgrade_schema()
         else:
             self.ix = index.create_in(str(self.index_dir), self.schema)
 
+        # file_id -> 索引状态，首次查询时从索引一次性加载
+        self._indexed_cache: Optional[Dict[str, _IndexedState]] = None
+
+        # (查询, limit, 字段, 是否高亮) -> (缓存时间, 结果)，按最近使用排序；
+        # 本实例写入索引时清空，其他进程的修改最多在 _SEARCH_CACHE_TTL 秒后可见
+        self._search_cache: "OrderedDict[tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+
+    def _upgrade_schema(self) -> None:
+        """为旧版本建立的索引补充新增的字段"""
+        missing = [name for name in self.schema.names() if name not in self.ix.schema]
+        if not missing:
+            return
+        with self.ix.writer() as writer:
+            for name in missing:
+                writer.add_field(name, self.schema[name])
+        self.ix = index.open_dir(str(self.index_dir))
+
     def index_file(self, file: File) -> bool:
         """
         为文件创建索引
@@ -58,69 +109,242 @@ class ContentIndexer:
             是否成功
         """
         try:
-            # 提取文本
-            extracted = ExtractorFactory.extract(file.path)
-            if not extracted or not extracted['success']:
-                logger.warning(f"Failed to extract text from {file.name}: {extracted.get('error', 'Unknown error') if extracted else 'No extractor found'}")
-                return False
-
-            # 添加到索引
             writer = self.ix.writer()
-            writer.update_document(
-                file_id=file.file_id,
-                filename=file.name,
-                content=extracted['text'],
-                path=file.path,
-                mime_type=file.mime_type,
-                page_count=extracted['page_count'],
-                indexed_at=datetime.now(),
-                file_size=file.size,
-            )
+        except Exception as e:
+            logger.error(f"Error indexing file {file.name}: {e}")
+            return False
+
+        try:
+            if not self._index_file_with_writer(writer, file):
+                writer.cancel()
+                return False
             writer.commit()
+        except Exception as e:
+            writer.cancel()
+            self._indexed_cache = None
+            logger.error(f"Error indexing file {file.name}: {e}")
+            return False
 
-            logger.info(f"Indexed file: {file.name}")
-            return True
+        logger.info(f"Indexed file: {file.name}")
+        return True
 
+    def _index_file_with_writer(self, writer, file: File) -> bool:
+        """提取文本并写入给定的写入器（不提交）"""
+        extracted = self._extract(file)
+        if not extracted:
+            return False
+
+        self._write_document(writer, file, extracted)
+        return True
+
+    @staticmethod
+    def _extract(file: File) -> Optional[Dict]:
+        """在当前进程中提取文本，失败时记录日志并返回 None"""
+        try:
+            extracted = ExtractorFactory.extract(file.path)
         except Exception as e:
             logger.error(f"Error indexing file {file.name}: {e}")
-            return False
+            return None
+        return ContentIndexer._check_extracted(file, extracted)
 
-    def index_files(self, files: List[File], progress_callback=None) -> Dict[str, int]:
+    @staticmethod
+    def _check_extracted(file: File, extracted: Optional[Dict]) -> Optional[Dict]:
+        """提取失败时记录日志并返回 None"""
+        if not extracted or not extracted['success']:
+            logger.warning(f"Failed to extract text from {file.name}: {extracted.get('error', 'Unknown error') if extracted else 'No extractor found'}")
+            return None
+        return extracted
+
+    @staticmethod
+    def _extract_parallel(files: Iterable[File],
+                          workers: Optional[int] = None) -> Iterator[Tuple[File, Optional[Dict]]]:
+        """
+        在进程池中并行提取文本，按完成顺序产出 (文件, 提取结果)
+
+        同时在途的任务数限制为工作进程数的两倍，避免提取结果堆积占用内存。
+        """
+        workers = workers or os.cpu_count() or 1
+        pending = iter(files)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = {executor.submit(_extract_for_index, file.path): file
+                         for file in islice(pending, workers * 2)}
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file = in_flight.pop(future)
+                    for next_file in islice(pending, 1):
+                        in_flight[executor.submit(_extract_for_index, next_file.path)] = next_file
+
+                    try:
+                        extracted = future.result()
+                    except Exception as e:
+                        logger.error(f"Error indexing file {file.name}: {e}")
+                        extracted = None
+                    yield file, ContentIndexer._check_extracted(file, extracted)
+
+    def index_files(self, files: List[File], progress_callback=None,
+                    batch_size: Optional[int] = None) -> Dict[str, int]:
         """
         批量索引文件
 
+        所有文档写入同一个写入器，最后统一提交一次，避免每个文件都生成新段并落盘。
+
         Args:
             files: 文件列表
             progress_callback: 进度回调函数 (current, total, filename)
+            batch_size: 每写入多少个文档提交一次以限制内存，默认只在结束时提交
 
         Returns:
             统计信息 {'success': int, 'failed': int, 'skipped': int}
         """
         stats = {'success': 0, 'failed': 0, 'skipped': 0}
 
-        for idx, file in enumerate(files):
-            if progress_callback:
-                progress_callback(idx + 1, len(files), file.name)
-
+        supported = []
+        for file in files:
             # 检查是否支持该文件类型
-            if not ExtractorFactory.get_extractor(file.path):
-                stats['skipped'] += 1
-                logger.debug(f"Skipped unsupported file: {file.name}")
+            if ExtractorFactory.get_extractor(file.path):
+                supported.append(file)
                 continue
 
-            # 索引文件
-            if self.index_file(file):
+            stats['skipped'] += 1
+            if progress_callback:
+                progress_callback(stats['skipped'], len(files), file.name)
+            logger.debug(f"Skipped unsupported file: {file.name}")
+
+        self._index_batch(supported, stats, len(files), progress_callback, batch_size)
+        return stats
+
+    def _index_batch(self, files: List[File], stats: Dict[str, int], total: int,
+                     progress_callback=None, batch_size: Optional[int] = None,
+                     parallel: bool = False, workers: Optional[int] = None) -> None:
+        """
+        用单个写入器索引一批文件，结果累加到 stats
+
+        parallel 为 True 时文本提取交给进程池，写入仍只在当前进程中进行
+        （Whoosh 只允许单个写入者）。单个文档写入失败只计为该文件失败，不影响同批其他文件。
+        """
+        if not files:
+            return
+
+        if parallel:
+            extracted_files = self._extract_parallel(files, workers)
+        else:
+            extracted_files = ((file, self._extract(file)) for file in files)
+
+        # 子进程数取 CPU 核数的一半；不足两个时多进程写入没有收益
+        procs = (os.cpu_count() or 1) // 2
+        multisegment = procs > 1 and len(files) >= _MULTISEGMENT_MIN_DOCS
+        writer = self._bulk_writer(procs if multisegment else 1)
+        pending = 0
+        processed = 0
+        try:
+            for file, extracted in extracted_files:
+                processed += 1
+                if progress_callback:
+                    progress_callback(stats['success'] + stats['failed'] + stats['skipped'] + 1,
+                                      total, file.name)
+
+                if not extracted:
+                    stats['failed'] += 1
+                    continue
+
+                try:
+                    self._write_document(writer, file, extracted)
+                except Exception as e:
+                    # 例如提取后文件被删除（stat 失败）或单个文档写入出错
+                    logger.error(f"Error indexing file {file.name}: {e}")
+                    stats['failed'] += 1
+                    continue
+
                 stats['success'] += 1
-            else:
-                stats['failed'] += 1
+                pending += 1
+                if batch_size and pending >= batch_size:
+                    writer.commit(merge=False)
+                    writer = self._bulk_writer(procs if multisegment else 1)
+                    pending = 0
+            writer.commit()
+        except Exception as e:
+            writer.cancel()
+            self._indexed_cache = None
+            logger.error(f"Error indexing files: {e}")
+            # 未提交的文档和尚未处理的文件都计为失败
+            stats['failed'] += pending + len(files) - processed
+            stats['success'] -= pending
+
+    def _bulk_writer(self, procs: int = 1):
+        """
+        批量写入使用的写入器
+
+        procs 大于 1 时由多个子进程各自写入独立的段，提交时不合并（multisegment），
+        段的合并留给 optimize()（`filemap index optimize`）。limitmb 对每个子写入器
+        分别生效，因此按进程数均分，总内存仍不超过 _WRITER_LIMIT_MB。
+        """
+        if procs <= 1:
+            return self.ix.writer(limitmb=_WRITER_LIMIT_MB)
+        return self.ix.writer(limitmb=max(1, _WRITER_LIMIT_MB // procs), procs=procs,
+                              multisegment=True)
+
+    def index_files_parallel(self, files: List[File], workers: Optional[int] = None,
+                             progress_callback=None,
+                             batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        并行批量索引文件
+
+        文本提取在进程池中并行执行，按完成顺序交给主进程中唯一的写入器
+        （Whoosh 只允许单个写入者），全部文档写入后统一提交一次。
 
+        Args:
+            files: 文件列表
+            workers: 工作进程数，默认为 CPU 核数
+            progress_callback: 进度回调函数 (current, total, filename)
+            batch_size: 每写入多少个文档提交一次以限制内存，默认只在结束时提交
+
+        Returns:
+            统计信息 {'success': int, 'failed': int, 'skipped': int}
+        """
+        stats = {'success': 0, 'failed': 0, 'skipped': 0}
+
+        supported = []
+        for file in files:
+            if ExtractorFactory.get_extractor(file.path):
+                supported.append(file)
+                continue
+
+            stats['skipped'] += 1
+            if progress_callback:
+                progress_callback(stats['skipped'], len(files), file.name)
+            logger.debug(f"Skipped unsupported file: {file.name}")
+
+        self._index_batch(supported, stats, len(files), progress_callback, batch_size,
+                          parallel=True, workers=workers)
         return stats
 
+    def _write_document(self, writer, file: File, extracted: Dict) -> None:
+        """将提取结果写入索引（记录文件当前的大小和修改时间，供 needs_reindex 比较）"""
+        st = os.stat(file.path)
+        state = _IndexedState(datetime.now(), st.st_mtime_ns, st.st_size)
+        writer.update_document(
+            file_id=file.file_id,
+            filename=file.name,
+            content=extracted['text'],
+            path=file.path,
+            mime_type=file.mime_type,
+            page_count=extracted['page_count'],
+            indexed_at=state.indexed_at,
+            file_size=state.size,
+            mtime_ns=state.mtime_ns,
+        )
+        if self._indexed_cache is not None:
+            self._indexed_cache[file.file_id] = state
+        self._search_cache.clear()
+
     def search(self, query_string: str, limit: int = 20,
                fields: List[str] = None, highlight: bool = False) -> List[Dict]:
         """
         全文搜索
 
+        耗时较长的查询结果会在内存中缓存一段时间（LRU），写入索引后缓存失效。
+
         Args:
             query_string: 查询字符串
             limit: 返回结果数量限制
@@ -133,6 +357,32 @@ class ContentIndexer:
         if fields is None:
             fields = ['filename', 'content']
 
+        key = (query_string.strip(), limit, tuple(sorted(fields)), highlight)
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            cached_at, results = cached
+            if time.monotonic() - cached_at < _SEARCH_CACHE_TTL:
+                self._search_cache.move_to_end(key)
+                return [dict(result) for result in results]
+            del self._search_cache[key]
+
+        started = time.monotonic()
+        results = self._search(query_string, limit, fields, highlight)
+        finished = time.monotonic()
+
+        # 出错（返回 None）和很快完成的查询不缓存
+        if results is None:
+            return []
+        if finished - started >= _SEARCH_CACHE_MIN_SECONDS:
+            self._search_cache[key] = (finished, results)
+            if len(self._search_cache) > _SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+            return [dict(result) for result in results]
+        return results
+
+    def _search(self, query_string: str, limit: int, fields: List[str],
+                highlight: bool) -> Optional[List[Dict]]:
+        """执行搜索，出错时返回 None"""
         try:
             with self.ix.searcher() as searcher:
                 # 创建多字段查询解析器
@@ -176,7 +426,7 @@ class ContentIndexer:
 
         except Exception as e:
             logger.error(f"Search error: {e}")
-            return []
+            return None
 
     def remove_file(self, file_id: str) -> bool:
         """
@@ -192,50 +442,64 @@ class ContentIndexer:
             writer = self.ix.writer()
             writer.delete_by_term('file_id', file_id)
             writer.commit()
+            if self._indexed_cache is not None:
+                self._indexed_cache.pop(file_id, None)
+            self._search_cache.clear()
             return True
         except Exception as e:
             logger.error(f"Error removing file from index: {e}")
             return False
 
+    def _get_indexed_cache(self) -> Dict[str, _IndexedState]:
+        """file_id -> 索引状态（首次调用时遍历一次已索引文档）"""
+        if self._indexed_cache is None:
+            with self.ix.searcher() as searcher:
+                self._indexed_cache = {
+                    fields['file_id']: _IndexedState(
+                        fields.get('indexed_at'), fields.get('mtime_ns'), fields.get('file_size')
+                    )
+                    for _, fields in searcher.reader().iter_docs()
+                }
+        return self._indexed_cache
+
     def is_indexed(self, file_id: str) -> bool:
         """检查文件是否已索引"""
+        if self._indexed_cache is not None:
+            return file_id in self._indexed_cache
+        # 单次查询直接查 file_id 的倒排表，不必为此加载整个缓存
         with self.ix.searcher() as searcher:
-            parser = QueryParser("file_id", schema=self.schema)
-            query = parser.parse(file_id)
-            results = searcher.search(query, limit=1)
-            return len(results) > 0
+            return searcher.document_number(file_id=file_id) is not None
 
     def get_stats(self) -> Dict:
         """获取索引统计信息"""
+        index_size, last_modified = self._scan_index_dir()
         with self.ix.searcher() as searcher:
             return {
-                'total_docs': searcher.doc_count_all(),
-                'index_size': self._get_index_size(),
-                'last_modified': self._get_last_modified(),
+                # doc_count 不含已删除（含被 update_document 替换）但尚未合并掉的文档
+                'total_docs': searcher.doc_count(),
+                'index_size': index_size,
+                'last_modified': last_modified,
             }
 
-    def _get_index_size(self) -> int:
-        """获取索引大小（字节）"""
+    def _scan_index_dir(self) -> Tuple[int, Optional[datetime]]:
+        """一次遍历索引目录，返回 (总大小（字节）, 最后修改时间)"""
         total_size = 0
-        for file in self.index_dir.glob('*'):
-            if file.is_file():
-                total_size += file.stat().st_size
-        return total_size
-
-    def _get_last_modified(self) -> Optional[datetime]:
-        """获取索引最后修改时间"""
-        files = list(self.index_dir.glob('*'))
-        if not files:
-            return None
-        latest = max(files, key=lambda f: f.stat().st_mtime)
-        return datetime.fromtimestamp(latest.stat().st_mtime)
+        latest = None
+        with os.scandir(self.index_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                total_size += st.st_size
+                if latest is None or st.st_mtime > latest:
+                    latest = st.st_mtime
+        return total_size, datetime.fromtimestamp(latest) if latest is not None else None
 
     def optimize(self) -> None:
         """优化索引"""
         try:
-            with self.ix.writer() as writer:
-                writer.mergetype = index.CLEAR
-                writer.commit(merge=True, optimize=True)
+            # 把所有段合并为一个
+            self.ix.optimize()
             logger.info("Index optimized")
         except Exception as e:
             logger.error(f"Error optimizing index: {e}")
@@ -244,23 +508,21 @@ class ContentIndexer:
         """清空索引"""
         try:
             writer = self.ix.writer()
-            writer.commit(merge=True, optimize=True, mergetype=index.CLEAR)
+            writer.commit(mergetype=CLEAR)
+            self._indexed_cache = {}
+            self._search_cache.clear()
             logger.info("Index cleared")
         except Exception as e:
             logger.error(f"Error clearing index: {e}")
 
     def get_indexed_time(self, file_id: str) -> Optional[datetime]:
         """获取文件的索引时间"""
+        if self._indexed_cache is not None:
+            state = self._indexed_cache.get(file_id)
+            return state.indexed_at if state else None
         with self.ix.searcher() as searcher:
-            parser = QueryParser("file_id", schema=self.schema)
-            query = parser.parse(file_id)
-            results = searcher.search(query, limit=1)
-
-            if len(results) > 0:
-                indexed_at = results[0].get('indexed_at')
-                if indexed_at:
-                    return indexed_at
-            return None
+            doc = searcher.document(file_id=file_id)
+            return doc.get('indexed_at') if doc else None
 
     def needs_reindex(self, file: File) -> bool:
         """
@@ -272,28 +534,27 @@ class ContentIndexer:
         Returns:
             True 表示需要重新索引，False 表示不需要
         """
-        # 检查文件是否已索引
-        if not self.is_indexed(file.file_id):
+        # update_index 会对大量文件调用，这里总是使用缓存，不查询索引
+        state = self._get_indexed_cache().get(file.file_id)
+        if state is None:
             return True
 
-        # 获取索引时间
-        indexed_time = self.get_indexed_time(file.file_id)
-        if not indexed_time:
-            return True
-
-        # 检查文件修改时间
-        file_path = Path(file.path)
-        if not file_path.exists():
+        try:
+            st = os.stat(file.path)
+        except FileNotFoundError:
             # 文件不存在，应该从索引中删除
             self.remove_file(file.file_id)
             return False
 
-        file_mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
+        if state.mtime_ns is None:
+            # 旧索引没有记录修改时间，退回比较索引时间
+            return not state.indexed_at or datetime.fromtimestamp(st.st_mtime) > state.indexed_at
 
-        # 如果文件修改时间晚于索引时间，需要重新索引
-        return file_mtime > indexed_time
+        # 大小或修改时间与索引时记录的不同，需要重新索引
+        return st.st_mtime_ns != state.mtime_ns or st.st_size != state.size
 
-    def update_index(self, files: List[File], force: bool = False, progress_callback=None) -> Dict[str, int]:
+    def update_index(self, files: List[File], force: bool = False, progress_callback=None,
+                     parallel: bool = False) -> Dict[str, int]:
         """
         智能增量更新索引
 
@@ -301,32 +562,32 @@ class ContentIndexer:
             files: 文件列表
             force: 是否强制重新索引所有文件
             progress_callback: 进度回调函数
+            parallel: 是否在进程池中并行提取文本
 
         Returns:
             统计信息 {'success': int, 'failed': int, 'skipped': int}
         """
         stats = {'success': 0, 'failed': 0, 'skipped': 0}
 
-        for idx, file in enumerate(files):
-            if progress_callback:
-                progress_callback(idx + 1, len(files), file.name)
-
+        # 先筛出需要索引的文件，再用单个写入器一次性写入
+        # （needs_reindex 可能删除失效条目，不能与批量写入器同时持有写锁）
+        pending = []
+        for file in files:
             # 检查是否支持该文件类型
             if not ExtractorFactory.get_extractor(file.path):
-                stats['skipped'] += 1
-                logger.debug(f"Skipped unsupported file: {file.name}")
-                continue
-
+                reason = "unsupported"
             # 检查是否需要重新索引
-            if not force and not self.needs_reindex(file):
-                stats['skipped'] += 1
-                logger.debug(f"Skipped unchanged file: {file.name}")
+            elif not force and not self.needs_reindex(file):
+                reason = "unchanged"
+            else:
+                pending.append(file)
                 continue
 
-            # 索引文件
-            if self.index_file(file):
-                stats['success'] += 1
-            else:
-                stats['failed'] += 1
+            stats['skipped'] += 1
+            if progress_callback:
+                progress_callback(stats['skipped'], len(files), file.name)
+            logger.debug(f"Skipped {reason} file: {file.name}")
 
+        self._index_batch(pending, stats, len(files), progress_callback,
+                          parallel=parallel and len(pending) > 1)
         return stats
@@ -0,0 +1,139 @@
+"""标签查询表达式
+
+支持 AND / OR / NOT 和括号，例如: (tag1 OR tag2) AND NOT tag3
+运算符优先级: NOT > AND > OR
+"""
+import re
+from typing import AbstractSet, Callable, List, Tuple
+
+_TOKEN_RE = re.compile(r"\(|\)|[^\s()]+")
+
+# 二元运算符优先级；NOT 为一元运算符，优先级最高
+_PRECEDENCE = {"OR": 1, "AND": 2, "NOT": 3}
+
+
+def tokenize(query: str) -> List[str]:
+    """
+    切分查询表达式
+
+    相邻的普通词合并为一个标签名，因此带空格的标签名无需加引号。
+    """
+    tokens: List[str] = []
+    prev_is_name = False
+    for token in _TOKEN_RE.findall(query):
+        is_name = token not in _PRECEDENCE and token not in ("(", ")")
+        if is_name and prev_is_name:
+            tokens[-1] = f"{tokens[-1]} {token}"
+        else:
+            tokens.append(token)
+        prev_is_name = is_name
+    return tokens
+
+
+def parse(query: str) -> List[str]:
+    """
+    将查询表达式转换为逆波兰式（调度场算法）
+
+    Raises:
+        ValueError: 括号不匹配
+    """
+    output: List[str] = []
+    stack: List[str] = []
+
+    for token in tokenize(query):
+        if token == "(" or token == "NOT":
+            stack.append(token)
+        elif token == ")":
+            while stack and stack[-1] != "(":
+                output.append(stack.pop())
+            if not stack:
+                raise ValueError("括号不匹配")
+            stack.pop()
+        elif token in _PRECEDENCE:
+            while stack and stack[-1] != "(" and _PRECEDENCE[stack[-1]] >= _PRECEDENCE[token]:
+                output.append(stack.pop())
+            stack.append(token)
+        else:
+            output.append(token)
+
+    while stack:
+        token = stack.pop()
+        if token == "(":
+            raise ValueError("括号不匹配")
+        output.append(token)
+
+    return output
+
+
+def tag_names(rpn: List[str]) -> List[str]:
+    """逆波兰式中出现的标签名（去重，保持顺序）"""
+    return list(dict.fromkeys(t for t in rpn if t not in _PRECEDENCE))
+
+
+def evaluate(
+    rpn: List[str],
+    lookup: Callable[[str], AbstractSet[str]],
+) -> Callable[[str], bool]:
+    """
+    对逆波兰式求值
+
+    中间结果表示为 (是否取补, 集合)，NOT 只需翻转标记，因此不需要全部文件ID的全集。
+
+    Args:
+        rpn: parse() 的结果
+        lookup: 标签名 -> 带有该标签的文件ID集合
+
+    Returns:
+        判断文件ID是否满足表达式的函数
+
+    Raises:
+        ValueError: 运算符缺少操作数
+    """
+    stack: List[Tuple[bool, AbstractSet[str]]] = []
+
+    for token in rpn:
+        if token == "NOT":
+            if not stack:
+                raise ValueError("NOT 缺少操作数")
+            negated, ids = stack.pop()
+            stack.append((not negated, ids))
+        elif token in _PRECEDENCE:
+            if len(stack) < 2:
+                raise ValueError(f"{token} 缺少操作数")
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(_and(left, right) if token == "AND" else _or(left, right))
+        else:
+            stack.append((False, lookup(token)))
+
+    if len(stack) != 1:
+        raise ValueError("表达式无效")
+
+    negated, ids = stack[0]
+    if negated:
+        return lambda file_id: file_id not in ids
+    return ids.__contains__
+
+
+def _and(left: Tuple[bool, AbstractSet[str]], right: Tuple[bool, AbstractSet[str]]):
+    """带补集标记的交集"""
+    (neg_a, a), (neg_b, b) = left, right
+    if not neg_a and not neg_b:
+        return False, a & b
+    if not neg_a:
+        return False, a - b
+    if not neg_b:
+        return False, b - a
+    return True, a | b  # ¬A ∧ ¬B = ¬(A ∨ B)
+
+
+def _or(left: Tuple[bool, AbstractSet[str]], right: Tuple[bool, AbstractSet[str]]):
+    """带补集标记的并集"""
+    (neg_a, a), (neg_b, b) = left, right
+    if not neg_a and not neg_b:
+        return False, a | b
+    if not neg_a:
+        return True, b - a  # A ∨ ¬B = ¬(B − A)
+    if not neg_b:
+        return True, a - b
+    return True, a & b  # ¬A ∨ ¬B = ¬(A ∧ B)
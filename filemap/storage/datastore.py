@@ -1,11 +1,25 @@
 """数据存储管理"""
 import json
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
 from datetime import datetime
 import shutil
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+from operator import attrgetter
 
 from filemap.core.models import File, Tag, Category
+from filemap.core.exceptions import AmbiguousFileIdError
+from filemap.utils.fileio import atomic_write, iter_json_items
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+# 不缩进的紧凑输出可以走标准库的 C 编码器（indent 会退回纯 Python 实现）
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
 
 
 class DataStore:
@@ -32,11 +46,27 @@ class DataStore:
         self.tags: Dict[str, Tag] = {}
         self.categories: Dict[str, Category] = {}
 
+        # 有序的文件ID列表，用于前缀查找（按需构建）
+        self._sorted_file_ids: Optional[List[str]] = None
+
+        # 二级索引：路径 -> 文件ID，标签名/别名 -> 标签ID集合（同一名称可被多个标签的别名占用）
+        # 查找时会核对对象当前的值，因此残留的旧条目不会返回错误结果
+        self._path_to_fid: Dict[str, str] = {}
+        self._name_to_tids: Dict[str, Set[str]] = {}
+
+        # 待写盘的数据（"files" / "tags" / "categories"）及 with 块嵌套深度
+        self._dirty: Set[str] = set()
+        self._batch_depth = 0
+
+        # get_stats 的结果缓存，任何修改（_mark_dirty）或重新加载时清空
+        self._stats_cache: Optional[Dict] = None
+
         # 加载数据
         self._load_all()
 
     def _load_all(self) -> None:
         """加载所有数据"""
+        self._stats_cache = None
         self._load_files()
         self._load_tags()
         self._load_categories()
@@ -44,29 +74,33 @@ class DataStore:
     def _load_files(self) -> None:
         """加载文件数据"""
         if self.files_path.exists():
-            with open(self.files_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.files = {fid: File.from_dict(fdata) for fid, fdata in data.items()}
+            self.files = {
+                fid: File.from_dict(fdata) for fid, fdata in iter_json_items(self.files_path)
+            }
         else:
             self.files = {}
+        self._sorted_file_ids = None
+        self._path_to_fid = {file.path: fid for fid, file in self.files.items()}
 
     def _load_tags(self) -> None:
         """加载标签数据"""
         if self.tags_path.exists():
-            with open(self.tags_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.tags = {tid: Tag.from_dict(tdata) for tid, tdata in data.items()}
+            self.tags = {
+                tid: Tag.from_dict(tdata) for tid, tdata in iter_json_items(self.tags_path)
+            }
         else:
             self.tags = {}
+        self._name_to_tids = {}
+        for tag in self.tags.values():
+            self._index_tag_names(tag)
 
     def _load_categories(self) -> None:
         """加载类别数据"""
         if self.categories_path.exists():
-            with open(self.categories_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.categories = {
-                    cid: Category.from_dict(cdata) for cid, cdata in data.items()
-                }
+            self.categories = {
+                cid: Category.from_dict(cdata)
+                for cid, cdata in iter_json_items(self.categories_path)
+            }
         else:
             # 创建默认的未分类类别
             self.categories = {}
@@ -125,16 +159,19 @@ class DataStore:
         """保存文件数据"""
         data = {fid: file.to_dict() for fid, file in self.files.items()}
         self._save_json(self.files_path, data)
+        self._dirty.discard("files")
 
     def save_tags(self) -> None:
         """保存标签数据"""
         data = {tid: tag.to_dict() for tid, tag in self.tags.items()}
         self._save_json(self.tags_path, data)
+        self._dirty.discard("tags")
 
     def save_categories(self) -> None:
         """保存类别数据"""
         data = {cid: cat.to_dict() for cid, cat in self.categories.items()}
         self._save_json(self.categories_path, data)
+        self._dirty.discard("categories")
 
     def save_all(self) -> None:
         """保存所有数据"""
@@ -142,41 +179,120 @@ class DataStore:
         self.save_tags()
         self.save_categories()
 
-    def _save_json(self, file_path: Path, data: Dict) -> None:
-        """保存JSON文件"""
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def flush(self) -> None:
+        """只写回有改动的数据文件"""
+        if "files" in self._dirty:
+            self.save_files()
+        if "tags" in self._dirty:
+            self.save_tags()
+        if "categories" in self._dirty:
+            self.save_categories()
+
+    def _mark_dirty(self, *names: str) -> None:
+        """记录改动；不在 with 块中时立即写盘"""
+        self._dirty.update(names)
+        self._stats_cache = None
+        if not self._batch_depth:
+            self.flush()
+
+    def __enter__(self) -> "DataStore":
+        """进入批量修改：块内的改动推迟到退出时一次写盘"""
+        self._batch_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            self.flush()
+
+    @staticmethod
+    def _save_json(file_path: Path, data: Dict) -> None:
+        """保存JSON文件（原子写入）"""
+        if orjson is not None:
+            payload = orjson.dumps(data)
+        else:
+            payload = _JSON_ENCODER.encode(data).encode("utf-8")
+        with atomic_write(file_path) as f:
+            f.write(payload)
 
     # ==================== 文件操作 ====================
 
     def add_file(self, file: File) -> None:
         """添加文件"""
+        self._index_file_id(file.file_id)
         self.files[file.file_id] = file
-        self.save_files()
+        self._path_to_fid[file.path] = file.file_id
+        self._mark_dirty("files")
 
     def get_file(self, file_id: str) -> Optional[File]:
         """获取文件"""
         return self.files.get(file_id)
 
+    def get_file_by_prefix(self, prefix: str) -> Optional[File]:
+        """通过ID前缀获取文件
+
+        Raises:
+            AmbiguousFileIdError: 前缀匹配到多个文件
+        """
+        if not prefix:
+            return None
+        if self._sorted_file_ids is None:
+            self._sorted_file_ids = sorted(self.files)
+
+        ids = self._sorted_file_ids
+        i = bisect_left(ids, prefix)
+        if i == len(ids) or not ids[i].startswith(prefix):
+            return None
+        if i + 1 < len(ids) and ids[i + 1].startswith(prefix):
+            raise AmbiguousFileIdError(f"File ID prefix is ambiguous: {prefix}")
+        return self.files[ids[i]]
+
+    def _index_file_id(self, file_id: str) -> None:
+        """将新文件ID插入有序ID列表"""
+        if self._sorted_file_ids is not None and file_id not in self.files:
+            insort(self._sorted_file_ids, file_id)
+
     def get_file_by_path(self, path: str) -> Optional[File]:
         """通过路径获取文件"""
+        file = self.files.get(self._path_to_fid.get(path))
+        if file is not None and file.path == path:
+            return file
+        return None
+
+    def has_file_with_size(self, size: int) -> bool:
+        """是否存在指定大小的文件（内容查重前的廉价预检）"""
+        return any(file.size == size for file in self.files.values())
+
+    def get_file_by_hash(self, file_hash: str) -> Optional[File]:
+        """通过内容哈希获取文件"""
+        if not file_hash:
+            return None
         for file in self.files.values():
-            if file.path == path:
+            if file.hash == file_hash:
                 return file
         return None
 
     def remove_file(self, file_id: str) -> bool:
         """移除文件"""
         if file_id in self.files:
-            del self.files[file_id]
-            self.save_files()
+            file = self.files.pop(file_id)
+            if self._path_to_fid.get(file.path) == file_id:
+                del self._path_to_fid[file.path]
+            if self._sorted_file_ids is not None:
+                del self._sorted_file_ids[bisect_left(self._sorted_file_ids, file_id)]
+            self._mark_dirty("files")
             return True
         return False
 
     def update_file(self, file: File) -> None:
         """更新文件"""
+        self._index_file_id(file.file_id)
+        old = self.files.get(file.file_id)
+        if old is not None and old.path != file.path and self._path_to_fid.get(old.path) == file.file_id:
+            del self._path_to_fid[old.path]
         self.files[file.file_id] = file
-        self.save_files()
+        self._path_to_fid[file.path] = file.file_id
+        self._mark_dirty("files")
 
     def list_files(self, tag_ids: Optional[List[str]] = None) -> List[File]:
         """列出文件"""
@@ -184,27 +300,86 @@ class DataStore:
 
         if tag_ids:
             # 过滤包含指定标签的文件
-            files = [f for f in files if any(tid in f.tags for tid in tag_ids)]
+            wanted = set(tag_ids)
+            files = [f for f in files if not wanted.isdisjoint(f.tags)]
 
         return files
 
+    def iter_files(self, filters: Optional[Dict[str, Any]] = None) -> Iterator[File]:
+        """
+        逐个产出文件
+
+        Args:
+            filters: 可选的范围条件（均为闭区间）: min_size / max_size（字节），
+                min_added / max_added（datetime）
+        """
+        files = iter(self.files.values())
+        if not filters:
+            return files
+
+        min_size = filters.get('min_size')
+        max_size = filters.get('max_size')
+        min_added = filters.get('min_added')
+        max_added = filters.get('max_added')
+        return (
+            f for f in files
+            if (min_size is None or f.size >= min_size)
+            and (max_size is None or f.size <= max_size)
+            and (min_added is None or f.added_at >= min_added)
+            and (max_added is None or f.added_at <= max_added)
+        )
+
+    def get_tag_file_ids(self, tag_ids: Iterable[str]) -> Dict[str, Set[str]]:
+        """批量获取标签对应的文件ID集合，返回 {标签ID: 文件ID集合}"""
+        result: Dict[str, Set[str]] = {tid: set() for tid in tag_ids}
+        wanted = result.keys()
+        for file in self.files.values():
+            for tid in wanted & set(file.tags):
+                result[tid].add(file.file_id)
+        return result
+
     # ==================== 标签操作 ====================
 
     def add_tag(self, tag: Tag) -> None:
         """添加标签"""
         self.tags[tag.tag_id] = tag
-        self.save_tags()
+        self._index_tag_names(tag)
+        self._mark_dirty("tags")
 
     def get_tag(self, tag_id: str) -> Optional[Tag]:
         """获取标签"""
         return self.tags.get(tag_id)
 
+    def get_tags(self, tag_ids: Iterable[str]) -> Dict[str, Tag]:
+        """批量获取标签，返回 {标签ID: Tag}"""
+        return {tid: self.tags[tid] for tid in tag_ids if tid in self.tags}
+
+    def _index_tag_names(self, tag: Tag) -> None:
+        """登记标签名和别名"""
+        for name in (tag.name, *tag.aliases):
+            self._name_to_tids.setdefault(name, set()).add(tag.tag_id)
+
     def get_tag_by_name(self, name: str) -> Optional[Tag]:
-        """通过名称获取标签"""
-        for tag in self.tags.values():
-            if tag.name == name or name in tag.aliases:
+        """通过名称获取标签（名称匹配优先于其他标签的同名别名）"""
+        alias_match = None
+        for tag_id in self._name_to_tids.get(name, ()):
+            tag = self.tags.get(tag_id)
+            if tag is None:
+                continue
+            if tag.name == name:
                 return tag
-        return None
+            if alias_match is None and name in tag.aliases:
+                alias_match = tag
+        return alias_match
+
+    def get_tags_by_name(self, names: List[str]) -> Dict[str, Tag]:
+        """批量通过名称获取标签，返回 {名称: Tag}"""
+        result = {}
+        for name in names:
+            tag = self.get_tag_by_name(name)
+            if tag is not None:
+                result[name] = tag
+        return result
 
     def remove_tag(self, tag_id: str) -> bool:
         """移除标签"""
@@ -213,17 +388,30 @@ class DataStore:
             for file in self.files.values():
                 if tag_id in file.tags:
                     file.remove_tag(tag_id)
-            self.save_files()
 
-            del self.tags[tag_id]
-            self.save_tags()
+            tag = self.tags.pop(tag_id)
+            for name in (tag.name, *tag.aliases):
+                tag_ids = self._name_to_tids.get(name)
+                if tag_ids is not None:
+                    tag_ids.discard(tag_id)
+                    if not tag_ids:
+                        del self._name_to_tids[name]
+            self._mark_dirty("files", "tags")
             return True
         return False
 
     def update_tag(self, tag: Tag) -> None:
         """更新标签"""
         self.tags[tag.tag_id] = tag
-        self.save_tags()
+        self._index_tag_names(tag)
+        self._mark_dirty("tags")
+
+    def bulk_update_tags(self, tags: List[Tag]) -> None:
+        """批量更新标签（只写一次磁盘）"""
+        for tag in tags:
+            self.tags[tag.tag_id] = tag
+            self._index_tag_names(tag)
+        self._mark_dirty("tags")
 
     def list_tags(self, category_id: Optional[str] = None) -> List[Tag]:
         """列出标签"""
@@ -234,17 +422,29 @@ class DataStore:
 
         return tags
 
+    def top_tags_by_usage(self, n: int, category_id: Optional[str] = None) -> List[Tag]:
+        """使用次数最多的 n 个标签（heapq.nlargest，无需完整排序）"""
+        return heapq.nlargest(n, self.list_tags(category_id), key=attrgetter("usage_count"))
+
+    def count_tags_by_category(self) -> Dict[str, int]:
+        """统计每个类别下的标签数，返回 {类别ID: 标签数}"""
+        return dict(Counter(tag.category for tag in self.tags.values()))
+
     # ==================== 类别操作 ====================
 
     def add_category(self, category: Category) -> None:
         """添加类别"""
         self.categories[category.category_id] = category
-        self.save_categories()
+        self._mark_dirty("categories")
 
     def get_category(self, category_id: str) -> Optional[Category]:
         """获取类别"""
         return self.categories.get(category_id)
 
+    def get_categories(self, category_ids: Iterable[str]) -> Dict[str, Category]:
+        """批量获取类别，返回 {类别ID: Category}"""
+        return {cid: self.categories[cid] for cid in category_ids if cid in self.categories}
+
     def get_category_by_name(self, name: str) -> Optional[Category]:
         """通过名称获取类别"""
         for cat in self.categories.values():
@@ -261,17 +461,17 @@ class DataStore:
                 for tag in self.tags.values():
                     if tag.category == category_id:
                         tag.category = uncategorized.category_id
-                self.save_tags()
+                self._dirty.add("tags")
 
             del self.categories[category_id]
-            self.save_categories()
+            self._mark_dirty("categories")
             return True
         return False
 
     def update_category(self, category: Category) -> None:
         """更新类别"""
         self.categories[category.category_id] = category
-        self.save_categories()
+        self._mark_dirty("categories")
 
     def list_categories(self) -> List[Category]:
         """列出所有类别"""
@@ -308,26 +508,38 @@ class DataStore:
     # ==================== 统计信息 ====================
 
     def get_stats(self) -> Dict:
-        """获取统计信息"""
+        """获取统计信息（数据未修改时直接返回上次的结果）"""
+        if self._stats_cache is None:
+            self._stats_cache = self._compute_stats()
+        return dict(self._stats_cache)
+
+    def _compute_stats(self) -> Dict:
+        """遍历所有文件计算统计信息"""
         total_size = sum(f.size for f in self.files.values())
 
+        # 先展平 标签ID -> 类别名，内层循环每个标签只需一次字典查找
+        tag_category_names = {}
+        for tid, tag in self.tags.items():
+            category = self.categories.get(tag.category)
+            if category:
+                tag_category_names[tid] = category.name
+
         # 统计各类别的文件数量
-        category_dist = {}
+        category_dist = Counter()
+        files_with_tags = 0
         for file in self.files.values():
-            for tag_id in file.tags:
-                tag = self.tags.get(tag_id)
-                if tag:
-                    cat_name = self.categories.get(tag.category, None)
-                    if cat_name:
-                        cat_name = cat_name.name
-                        category_dist[cat_name] = category_dist.get(cat_name, 0) + 1
+            if file.tags:
+                files_with_tags += 1
+                category_dist.update(
+                    tag_category_names[tid] for tid in file.tags if tid in tag_category_names
+                )
 
         return {
             "total_files": len(self.files),
             "total_size": total_size,
             "total_tags": len(self.tags),
             "total_categories": len(self.categories),
-            "category_distribution": category_dist,
-            "files_with_tags": sum(1 for f in self.files.values() if f.tags),
-            "files_without_tags": sum(1 for f in self.files.values() if not f.tags),
+            "category_distribution": dict(category_dist),
+            "files_with_tags": files_with_tags,
+            "files_without_tags": len(self.files) - files_with_tags,
         }
@@ -7,6 +7,7 @@ from typing import Dict, Any
 
 from filemap.core.models import File, Tag, Category
 from filemap.storage.sqlite_datastore import SQLiteDataStore
+from filemap.utils.fileio import iter_json_items
 
 logger = logging.getLogger(__name__)
 
@@ -43,87 +44,90 @@ class DataMigration:
         json_tags_path = json_dir / "tags.json"
         json_categories_path = json_dir / "categories.json"
 
-        # 1. 迁移分类
-        if json_categories_path.exists():
-            try:
-                with open(json_categories_path, 'r', encoding='utf-8') as f:
-                    categories_data = json.load(f)
-
-                for cat_id, cat_data in categories_data.items():
-                    category = Category(
-                        category_id=cat_id,
-                        name=cat_data['name'],
-                        description=cat_data.get('description', ''),
-                        exclusive=cat_data.get('exclusive', False),
-                        created_at=cat_data.get('created_at', datetime.now().isoformat())
-                    )
-                    if datastore.add_category(category):
-                        stats['categories'] += 1
-                    else:
-                        # 分类已存在（默认分类），跳过
-                        pass
-
-                logger.info(f"Migrated {stats['categories']} categories")
-            except Exception as e:
-                error_msg = f"Error migrating categories: {e}"
-                logger.error(error_msg)
-                stats['errors'].append(error_msg)
-
-        # 2. 迁移标签
-        if json_tags_path.exists():
-            try:
-                with open(json_tags_path, 'r', encoding='utf-8') as f:
-                    tags_data = json.load(f)
-
-                for tag_id, tag_data in tags_data.items():
-                    tag = Tag(
-                        tag_id=tag_id,
-                        name=tag_data['name'],
-                        category_id=tag_data.get('category_id'),
-                        color=tag_data.get('color'),
-                        description=tag_data.get('description', ''),
-                        created_at=tag_data.get('created_at', datetime.now().isoformat())
-                    )
-                    if datastore.add_tag(tag):
-                        stats['tags'] += 1
-
-                logger.info(f"Migrated {stats['tags']} tags")
-            except Exception as e:
-                error_msg = f"Error migrating tags: {e}"
-                logger.error(error_msg)
-                stats['errors'].append(error_msg)
-
-        # 3. 迁移文件
-        if json_files_path.exists():
-            try:
-                with open(json_files_path, 'r', encoding='utf-8') as f:
-                    files_data = json.load(f)
-
-                for file_id, file_data in files_data.items():
-                    file = File(
-                        file_id=file_id,
-                        name=file_data['name'],
-                        path=file_data['path'],
-                        managed=file_data.get('managed', False),
-                        mime_type=file_data.get('mime_type', ''),
-                        size=file_data.get('size', 0),
-                        hash=file_data.get('hash', ''),
-                        created_at=file_data.get('created_at', datetime.now().isoformat()),
-                        updated_at=file_data.get('updated_at', datetime.now().isoformat()),
-                        tags=file_data.get('tags', [])
-                    )
-                    if datastore.add_file(file):
-                        stats['files'] += 1
-                    else:
-                        error_msg = f"Failed to add file: {file.name}"
+        # 每一类数据各用一次 executemany 写入一个事务；导入期间关闭同步写盘
+        with datastore.unsynchronized():
+            # 1. 迁移分类（同名的默认分类已存在时沿用数据库中的ID）
+            category_ids: Dict[str, str] = {}
+            if json_categories_path.exists():
+                try:
+                    categories = [
+                        Category(
+                            category_id=cat_id,
+                            name=cat_data['name'],
+                            description=cat_data.get('description', ''),
+                            mutually_exclusive=cat_data.get(
+                                'mutually_exclusive', cat_data.get('exclusive', False)),
+                            created_at=cat_data.get('created_at') or datetime.now(),
+                        )
+                        for cat_id, cat_data in iter_json_items(json_categories_path)
+                    ]
+                    stats['categories'] = datastore.bulk_add_categories(categories)
+
+                    existing = {cat.name: cat.category_id for cat in datastore.list_categories()}
+                    category_ids = {
+                        cat.category_id: existing.get(cat.name, cat.category_id)
+                        for cat in categories
+                    }
+                    logger.info(f"Migrated {stats['categories']} categories")
+                except Exception as e:
+                    error_msg = f"Error migrating categories: {e}"
+                    logger.error(error_msg)
+                    stats['errors'].append(error_msg)
+
+            # 2. 迁移标签
+            if json_tags_path.exists():
+                try:
+                    existing = {cat.name: cat.category_id for cat in datastore.list_categories()}
+                    tags = []
+                    for tag_id, tag_data in iter_json_items(json_tags_path):
+                        category = tag_data.get('category', tag_data.get('category_id'))
+                        tags.append(Tag(
+                            tag_id=tag_id,
+                            name=tag_data['name'],
+                            category=category_ids.get(category, existing.get(category, category)),
+                            color=tag_data.get('color'),
+                            description=tag_data.get('description', ''),
+                            created_at=tag_data.get('created_at') or datetime.now(),
+                        ))
+                    stats['tags'] = datastore.bulk_add_tags(tags)
+                    logger.info(f"Migrated {stats['tags']} tags")
+                except Exception as e:
+                    error_msg = f"Error migrating tags: {e}"
+                    logger.error(error_msg)
+                    stats['errors'].append(error_msg)
+
+            # 3. 迁移文件
+            if json_files_path.exists():
+                try:
+                    files = [
+                        File(
+                            file_id=file_id,
+                            name=file_data['name'],
+                            path=file_data['path'],
+                            managed=file_data.get('managed', False),
+                            mime_type=file_data.get('mime_type', ''),
+                            size=file_data.get('size', 0),
+                            hash=file_data.get('hash', ''),
+                            created_at=file_data.get('created_at'),
+                            modified_at=file_data.get('modified_at', file_data.get('updated_at')),
+                            added_at=file_data.get('added_at') or datetime.now(),
+                            tags=file_data.get('tags', []),
+                        )
+                        for file_id, file_data in iter_json_items(json_files_path)
+                    ]
+                    stats['files'] = datastore.bulk_add_files(files)
+
+                    skipped = len(files) - stats['files']
+                    if skipped:
+                        error_msg = f"Skipped {skipped} files that already exist (same ID or path)"
                         logger.warning(error_msg)
                         stats['errors'].append(error_msg)
 
-                logger.info(f"Migrated {stats['files']} files")
-            except Exception as e:
-                error_msg = f"Error migrating files: {e}"
-                logger.error(error_msg)
-                stats['errors'].append(error_msg)
+                    logger.info(f"Migrated {stats['files']} files")
+                except Exception as e:
+                    error_msg = f"Error migrating files: {e}"
+                    logger.error(error_msg)
+                    stats['errors'].append(error_msg)
 
         logger.info("Migration completed!")
         logger.info(f"Summary: {stats['categories']} categories, {stats['tags']} tags, {stats['files']} files")
@@ -56,6 +56,8 @@ CREATE TABLE IF NOT EXISTS metadata (
 
 -- 索引优化
 CREATE INDEX IF NOT EXISTS idx_files_path ON files(path);
+CREATE INDEX IF NOT EXISTS idx_files_hash ON files(hash);
+CREATE INDEX IF NOT EXISTS idx_files_size ON files(size);
 CREATE INDEX IF NOT EXISTS idx_files_mime_type ON files(mime_type);
 CREATE INDEX IF NOT EXISTS idx_files_created_at ON files(created_at);
 CREATE INDEX IF NOT EXISTS idx_files_indexed ON files(indexed);
@@ -70,3 +72,5 @@ CREATE INDEX IF NOT EXISTS idx_file_tags_tag ON file_tags(tag_id);
 -- 初始化元数据
 INSERT OR IGNORE INTO metadata (key, value, updated_at) VALUES ('schema_version', '1', CURRENT_TIMESTAMP);
 INSERT OR IGNORE INTO metadata (key, value, updated_at) VALUES ('created_at', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP);
+INSERT OR IGNORE INTO metadata (key, value, updated_at) VALUES ('data_version', '0', CURRENT_TIMESTAMP);
+
@@ -1,15 +1,36 @@
 """SQLite 数据存储层"""
 import sqlite3
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterable, Iterator, Optional, Any, Set
 from datetime import datetime
 import logging
+import zlib
 from contextlib import contextmanager
 
 from filemap.core.models import File, Tag, Category
+from filemap.core.exceptions import AmbiguousFileIdError
 
 logger = logging.getLogger(__name__)
 
+_SCHEMA_FILE = Path(__file__).parent / "schema.sql"
+
+# 查询标签时一并计算使用次数，避免逐个标签再查询 file_tags
+_TAG_COLUMNS = "t.*, (SELECT COUNT(*) FROM file_tags ft WHERE ft.tag_id = t.tag_id) AS usage_count"
+
+# 批量加载文件标签时每条 IN 查询的最大参数个数（低于 SQLite 的变量数上限）
+_TAG_LOOKUP_BATCH = 500
+
+_INSERT_FILE_SQL = """
+    INSERT {conflict} INTO files (file_id, name, path, managed, mime_type, size, hash,
+                                  created_at, updated_at, indexed, indexed_at, deleted)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, NULL, 0)
+"""
+
+
+def _db_time(value) -> Any:
+    """datetime 转为 ISO 字符串，其他值原样存储"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
 
 class SQLiteDataStore:
     """基于 SQLite 的数据存储"""
@@ -24,36 +45,106 @@ class SQLiteDataStore:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # 初始化数据库
-        self._init_db()
+        # 复用同一个连接，sqlite3 会按连接缓存已编译的语句
+        self._conn: Optional[sqlite3.Connection] = None
+
+        # get_stats 的结果缓存及其对应的数据库版本
+        self._stats_cache: Optional[Dict[str, Any]] = None
+        self._stats_version: Optional[tuple] = None
 
-        # 创建默认分类
-        self._create_default_categories()
+        # 初始化数据库（schema 未变化的已有数据库直接跳过）
+        if self._init_db():
+            # 创建默认分类
+            self._create_default_categories()
 
-    def _init_db(self):
-        """初始化数据库"""
-        schema_file = Path(__file__).parent / "schema.sql"
+    def _init_db(self) -> bool:
+        """
+        初始化数据库
+
+        schema.sql 的校验值记录在 PRAGMA user_version 中，与当前 schema 一致时
+        不再重复执行建表脚本，已有数据库只需一次查询即可打开。
+
+        Returns:
+            是否执行了 schema
+        """
+        schema = _SCHEMA_FILE.read_text(encoding='utf-8')
+        schema_version = zlib.crc32(schema.encode('utf-8')) & 0x7FFFFFFF
 
         with self._get_connection() as conn:
-            # 启用外键约束
-            conn.execute("PRAGMA foreign_keys = ON")
+            if conn.execute("PRAGMA user_version").fetchone()[0] == schema_version:
+                return False
 
+            # 不启用外键约束（标签分类目前允许直接填写分类名），关联删除由代码显式处理
             # 执行 schema
-            with open(schema_file, 'r', encoding='utf-8') as f:
-                conn.executescript(f.read())
+            conn.executescript(schema)
+            conn.execute(f"PRAGMA user_version = {schema_version}")
 
             conn.commit()
             logger.info(f"Database initialized at {self.db_path}")
+            return True
+
+    @contextmanager
+    def unsynchronized(self):
+        """
+        在块内关闭同步写盘（PRAGMA synchronous = OFF），用于一次性批量导入
+
+        块结束后恢复为 NORMAL。期间若系统崩溃，最近的写入可能丢失。
+        """
+        with self._get_connection() as conn:
+            conn.execute("PRAGMA synchronous = OFF")
+            try:
+                yield
+            finally:
+                conn.execute("PRAGMA synchronous = NORMAL")
 
     @contextmanager
     def _get_connection(self):
-        """获取数据库连接（上下文管理器）"""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row  # 支持字典式访问
+        """
+        获取数据库连接（上下文管理器）
+
+        连接在首次使用时打开并一直复用；块内出错时回滚未提交的修改，
+        效果与原先关闭连接时丢弃未提交事务相同。
+        """
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.db_path))
+            conn.row_factory = sqlite3.Row  # 支持字典式访问
+            # WAL 模式下读不阻塞写，NORMAL 同步级别在 WAL 下只在检查点时 fsync
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn = conn
+
         try:
-            yield conn
-        finally:
-            conn.close()
+            yield self._conn
+        except Exception:
+            if self._conn.in_transaction:
+                self._conn.rollback()
+            raise
+
+    def data_version(self) -> int:
+        """
+        持久化的数据版本号
+
+        文件、标签、分类及其关联的每个写操作都在同一事务中使其递增一次
+        （只更新索引状态的 mark_indexed 不计入），跨进程有效，
+        可用于判断派生缓存（如知识图谱）是否过期。
+        """
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT value FROM metadata WHERE key = 'data_version'").fetchone()
+            return int(row['value']) if row else 0
+
+    @staticmethod
+    def _bump_data_version(conn: sqlite3.Connection) -> None:
+        """在当前事务中递增数据版本号（每个写操作调用一次，随事务一起提交）"""
+        conn.execute("""
+            UPDATE metadata SET value = CAST(value AS INTEGER) + 1, updated_at = ?
+            WHERE key = 'data_version'
+        """, (datetime.now().isoformat(),))
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
 
     def _create_default_categories(self):
         """创建默认分类"""
@@ -74,32 +165,22 @@ class SQLiteDataStore:
         """添加文件"""
         try:
             with self._get_connection() as conn:
-                # 使用 file.modified_at 作为 updated_at
-                updated_at = file.modified_at or file.created_at or datetime.now()
-                created_at = file.created_at or file.added_at or datetime.now()
+                conn.execute(_INSERT_FILE_SQL.format(conflict=""), self._file_params(file))
 
-                conn.execute("""
-                    INSERT INTO files (file_id, name, path, managed, mime_type, size, hash,
-                                      created_at, updated_at, indexed, indexed_at, deleted)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    file.file_id, file.name, file.path, file.managed, file.mime_type,
-                    file.size, file.hash,
-                    created_at.isoformat() if isinstance(created_at, datetime) else created_at,
-                    updated_at.isoformat() if isinstance(updated_at, datetime) else updated_at,
-                    False, None, False
-                ))
-
-                # 添加标签关联
+                # 添加标签关联（file.tags 可能是标签ID或名称，一次查询解析）
                 if file.tags:
-                    for tag_name in file.tags:
-                        tag = self.get_tag_by_name(tag_name)
-                        if tag:
-                            conn.execute("""
-                                INSERT OR IGNORE INTO file_tags (file_id, tag_id, added_at)
-                                VALUES (?, ?, ?)
-                            """, (file.file_id, tag.tag_id, datetime.now()))
-
+                    placeholders = ','.join('?' * len(file.tags))
+                    cursor = conn.execute(f"""
+                        SELECT tag_id FROM tags
+                        WHERE tag_id IN ({placeholders}) OR name IN ({placeholders})
+                    """, (*file.tags, *file.tags))
+                    now = datetime.now()
+                    conn.executemany("""
+                        INSERT OR IGNORE INTO file_tags (file_id, tag_id, added_at)
+                        VALUES (?, ?, ?)
+                    """, [(file.file_id, r['tag_id'], now) for r in cursor.fetchall()])
+
+                self._bump_data_version(conn)
                 conn.commit()
                 logger.info(f"Added file: {file.name}")
                 return True
@@ -110,6 +191,54 @@ class SQLiteDataStore:
             logger.error(f"Error adding file: {e}")
             return False
 
+    def bulk_add_files(self, files: Iterable[File]) -> int:
+        """
+        批量添加文件及其标签关联（单个事务）
+
+        已存在的文件（ID 或路径重复）被跳过，其标签关联也不会写入。
+
+        Returns:
+            实际新增的文件数
+        """
+        files = list(files)
+        if not files:
+            return 0
+
+        with self._get_connection() as conn:
+            # 逐行插入，按 rowcount 记下实际插入的文件
+            insert_sql = _INSERT_FILE_SQL.format(conflict="OR IGNORE")
+            inserted = [file for file in files
+                        if conn.execute(insert_sql, self._file_params(file)).rowcount]
+
+            # file.tags 可能是标签ID或名称，一次读出全部标签用于解析
+            tag_ids = {}
+            for tag_id, name in conn.execute("SELECT tag_id, name FROM tags"):
+                tag_ids[tag_id] = tag_id
+                tag_ids.setdefault(name, tag_id)
+
+            now = datetime.now().isoformat()
+            conn.executemany("""
+                INSERT OR IGNORE INTO file_tags (file_id, tag_id, added_at)
+                VALUES (?, ?, ?)
+            """, [
+                (file.file_id, tag_ids[ref], now)
+                for file in inserted for ref in file.tags if ref in tag_ids
+            ])
+            self._bump_data_version(conn)
+            conn.commit()
+            return len(inserted)
+
+    @staticmethod
+    def _file_params(file: File) -> tuple:
+        """files 表的插入参数"""
+        # 使用 file.modified_at 作为 updated_at
+        updated_at = file.modified_at or file.created_at or datetime.now()
+        created_at = file.created_at or file.added_at or datetime.now()
+        return (
+            file.file_id, file.name, file.path, file.managed, file.mime_type,
+            file.size, file.hash, _db_time(created_at), _db_time(updated_at),
+        )
+
     def get_file(self, file_id: str) -> Optional[File]:
         """获取文件"""
         with self._get_connection() as conn:
@@ -121,7 +250,32 @@ class SQLiteDataStore:
             if not row:
                 return None
 
-            return self._row_to_file(row, conn)
+            return self._rows_to_files([row], conn)[0]
+
+    def get_file_by_prefix(self, prefix: str) -> Optional[File]:
+        """通过ID前缀获取文件（利用主键索引做范围查询）
+
+        Raises:
+            AmbiguousFileIdError: 前缀匹配到多个文件
+        """
+        if not prefix:
+            return None
+
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM files
+                WHERE file_id >= ? AND file_id < ? AND deleted = 0
+                LIMIT 2
+            """, (prefix, upper))
+            rows = cursor.fetchall()
+
+            if not rows:
+                return None
+            if len(rows) > 1:
+                raise AmbiguousFileIdError(f"File ID prefix is ambiguous: {prefix}")
+
+            return self._rows_to_files(rows, conn)[0]
 
     def get_file_by_path(self, path: str) -> Optional[File]:
         """通过路径获取文件"""
@@ -134,7 +288,31 @@ class SQLiteDataStore:
             if not row:
                 return None
 
-            return self._row_to_file(row, conn)
+            return self._rows_to_files([row], conn)[0]
+
+    def has_file_with_size(self, size: int) -> bool:
+        """是否存在指定大小的文件（内容查重前的廉价预检，走 size 索引）"""
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT 1 FROM files WHERE size = ? AND deleted = 0 LIMIT 1
+            """, (size,))
+            return cursor.fetchone() is not None
+
+    def get_file_by_hash(self, file_hash: str) -> Optional[File]:
+        """通过内容哈希获取文件"""
+        if not file_hash:
+            return None
+
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT * FROM files WHERE hash = ? AND deleted = 0 LIMIT 1
+            """, (file_hash,))
+            row = cursor.fetchone()
+
+            if not row:
+                return None
+
+            return self._rows_to_files([row], conn)[0]
 
     def list_files(self, filters: Optional[Dict[str, Any]] = None) -> List[File]:
         """列出文件"""
@@ -154,9 +332,47 @@ class SQLiteDataStore:
 
         with self._get_connection() as conn:
             cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
+            return self._rows_to_files(cursor.fetchall(), conn)
+
+    def iter_files(self, filters: Optional[Dict[str, Any]] = None) -> Iterator[File]:
+        """
+        逐个产出文件（按添加时间倒序），不一次性构建完整列表
+
+        Args:
+            filters: 可选的范围条件（均为闭区间）: min_size / max_size（字节），
+                min_added / max_added（datetime）。条件在 SQL 中完成，
+                不满足的行不会被构造为 File 对象。
+        """
+        query = "SELECT * FROM files WHERE deleted = 0"
+        params = []
+
+        if filters:
+            if filters.get('min_size') is not None:
+                query += " AND size >= ?"
+                params.append(filters['min_size'])
+
+            if filters.get('max_size') is not None:
+                query += " AND size <= ?"
+                params.append(filters['max_size'])
 
-            return [self._row_to_file(row, conn) for row in rows]
+            # created_at 以 ISO 格式存储，字符串比较即时间先后比较
+            if filters.get('min_added') is not None:
+                query += " AND created_at >= ?"
+                params.append(filters['min_added'].isoformat())
+
+            if filters.get('max_added') is not None:
+                query += " AND created_at <= ?"
+                params.append(filters['max_added'].isoformat())
+
+        query += " ORDER BY created_at DESC"
+
+        with self._get_connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(_TAG_LOOKUP_BATCH)
+                if not rows:
+                    break
+                yield from self._rows_to_files(rows, conn)
 
     def update_file(self, file: File) -> bool:
         """更新文件"""
@@ -167,9 +383,11 @@ class SQLiteDataStore:
                     SET name = ?, path = ?, mime_type = ?, size = ?, hash = ?, updated_at = ?
                     WHERE file_id = ?
                 """, (
+                    # updated_at 对应模型的 modified_at（与 add_file 一致）
                     file.name, file.path, file.mime_type, file.size, file.hash,
-                    datetime.now(), file.file_id
+                    (file.modified_at or datetime.now()).isoformat(), file.file_id
                 ))
+                self._bump_data_version(conn)
                 conn.commit()
                 return True
         except Exception as e:
@@ -183,22 +401,35 @@ class SQLiteDataStore:
                 conn.execute("""
                     UPDATE files SET deleted = 1 WHERE file_id = ?
                 """, (file_id,))
+                self._bump_data_version(conn)
                 conn.commit()
                 return True
         except Exception as e:
             logger.error(f"Error removing file: {e}")
             return False
 
-    def _row_to_file(self, row: sqlite3.Row, conn: sqlite3.Connection) -> File:
-        """将数据库行转换为 File 对象"""
-        # 获取文件的标签
-        cursor = conn.execute("""
-            SELECT t.name FROM tags t
-            JOIN file_tags ft ON t.tag_id = ft.tag_id
-            WHERE ft.file_id = ?
-        """, (row['file_id'],))
-        tags = [r['name'] for r in cursor.fetchall()]
+    def _rows_to_files(self, rows: List[sqlite3.Row], conn: sqlite3.Connection) -> List[File]:
+        """将一批数据库行转换为 File 对象（标签按批次一次查询，避免逐个文件查询）"""
+        if not rows:
+            return []
 
+        tags: Dict[str, List[str]] = {row['file_id']: [] for row in rows}
+        file_ids = list(tags)
+        for start in range(0, len(file_ids), _TAG_LOOKUP_BATCH):
+            batch = file_ids[start:start + _TAG_LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            cursor = conn.execute(f"""
+                SELECT ft.file_id, t.name FROM file_tags ft
+                JOIN tags t ON t.tag_id = ft.tag_id
+                WHERE ft.file_id IN ({placeholders})
+            """, batch)
+            for file_id, name in cursor:
+                tags[file_id].append(name)
+
+        return [self._row_to_file(row, tags[row['file_id']]) for row in rows]
+
+    def _row_to_file(self, row: sqlite3.Row, tags: List[str]) -> File:
+        """将数据库行转换为 File 对象"""
         # 时间字段转换
         created_at = datetime.fromisoformat(row['created_at']) if row['created_at'] else None
         updated_at = datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None
@@ -232,6 +463,7 @@ class SQLiteDataStore:
                     tag.tag_id, tag.name, category_id, tag.color,
                     tag.description, tag.created_at.isoformat() if isinstance(tag.created_at, datetime) else tag.created_at
                 ))
+                self._bump_data_version(conn)
                 conn.commit()
                 logger.info(f"Added tag: {tag.name}")
                 return True
@@ -242,6 +474,26 @@ class SQLiteDataStore:
             logger.error(f"Error adding tag: {e}")
             return False
 
+    def bulk_add_tags(self, tags: Iterable[Tag]) -> int:
+        """
+        批量添加标签（单个事务，executemany），ID 或名称已存在的标签被跳过
+
+        Returns:
+            实际新增的标签数
+        """
+        with self._get_connection() as conn:
+            cursor = conn.executemany("""
+                INSERT OR IGNORE INTO tags (tag_id, name, category_id, color, description, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (tag.tag_id, tag.name, tag.category, tag.color, tag.description,
+                 _db_time(tag.created_at))
+                for tag in tags
+            ])
+            self._bump_data_version(conn)
+            conn.commit()
+            return cursor.rowcount
+
     def get_tag(self, tag_id: str) -> Optional[Tag]:
         """获取标签"""
         with self._get_connection() as conn:
@@ -264,28 +516,126 @@ class SQLiteDataStore:
 
             return self._row_to_tag(row, conn)
 
+    def get_tags_by_name(self, names: List[str]) -> Dict[str, Tag]:
+        """
+        批量通过名称获取标签
+
+        Args:
+            names: 标签名称列表
+
+        Returns:
+            {名称: Tag}，不存在的名称不会出现在结果中
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+
+        placeholders = ','.join('?' * len(names))
+        with self._get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT {_TAG_COLUMNS} FROM tags t WHERE t.name IN ({placeholders})
+            """, names)
+            return {row['name']: self._row_to_tag(row) for row in cursor.fetchall()}
+
+    def get_tags(self, refs: Iterable[str]) -> Dict[str, Tag]:
+        """
+        批量获取标签
+
+        Args:
+            refs: 标签ID或名称（File.tags 中存储的是标签名称）
+
+        Returns:
+            {引用: Tag}，无法解析的引用不会出现在结果中
+        """
+        refs = list(dict.fromkeys(refs))
+        if not refs:
+            return {}
+
+        placeholders = ','.join('?' * len(refs))
+        with self._get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT {_TAG_COLUMNS} FROM tags t
+                WHERE t.tag_id IN ({placeholders}) OR t.name IN ({placeholders})
+            """, (*refs, *refs))
+
+            result = {}
+            for row in cursor.fetchall():
+                tag = self._row_to_tag(row)
+                result[tag.tag_id] = tag
+                result[tag.name] = tag
+            return {ref: result[ref] for ref in refs if ref in result}
+
+    def update_tag(self, tag: Tag) -> bool:
+        """更新标签"""
+        return self.bulk_update_tags([tag])
+
+    def bulk_update_tags(self, tags: List[Tag]) -> bool:
+        """批量更新标签（单个事务）"""
+        if not tags:
+            return True
+
+        try:
+            with self._get_connection() as conn:
+                conn.executemany("""
+                    UPDATE tags SET name = ?, category_id = ?, color = ?, description = ?
+                    WHERE tag_id = ?
+                """, [
+                    (tag.name, tag.category, tag.color, tag.description, tag.tag_id)
+                    for tag in tags
+                ])
+                self._bump_data_version(conn)
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error updating tags: {e}")
+            return False
+
     def list_tags(self, category_id: Optional[str] = None) -> List[Tag]:
-        """列出标签"""
-        query = "SELECT * FROM tags"
+        """列出标签（使用次数在同一查询中计算）"""
+        query = f"SELECT {_TAG_COLUMNS} FROM tags t"
         params = []
 
         if category_id:
-            query += " WHERE category_id = ?"
+            query += " WHERE t.category_id = ?"
             params.append(category_id)
 
-        query += " ORDER BY name"
+        query += " ORDER BY t.name"
 
         with self._get_connection() as conn:
             cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
+            return [self._row_to_tag(row) for row in cursor.fetchall()]
+
+    def top_tags_by_usage(self, n: int, category_id: Optional[str] = None) -> List[Tag]:
+        """使用次数最多的 n 个标签（在数据库中排序并截取，次数相同按名称）"""
+        query = f"SELECT {_TAG_COLUMNS} FROM tags t"
+        params: List[Any] = []
+
+        if category_id:
+            query += " WHERE t.category_id = ?"
+            params.append(category_id)
+
+        query += " ORDER BY usage_count DESC, t.name LIMIT ?"
+        params.append(n)
 
-            return [self._row_to_tag(row, conn) for row in rows]
+        with self._get_connection() as conn:
+            return [self._row_to_tag(row) for row in conn.execute(query, params)]
+
+    def count_tags_by_category(self) -> Dict[str, int]:
+        """统计每个分类下的标签数，返回 {分类ID: 标签数}"""
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT category_id, COUNT(*) AS count FROM tags GROUP BY category_id
+            """)
+            return {row['category_id']: row['count'] for row in cursor.fetchall()}
 
     def remove_tag(self, tag_id: str) -> bool:
         """删除标签"""
         try:
             with self._get_connection() as conn:
+                # 连接未启用外键约束，关联需显式删除（与删除标签在同一事务中）
+                conn.execute("DELETE FROM file_tags WHERE tag_id = ?", (tag_id,))
                 conn.execute("DELETE FROM tags WHERE tag_id = ?", (tag_id,))
+                self._bump_data_version(conn)
                 conn.commit()
                 return True
         except Exception as e:
@@ -295,7 +645,7 @@ class SQLiteDataStore:
     def _row_to_tag(self, row: sqlite3.Row, conn: Optional[sqlite3.Connection] = None) -> Tag:
         """将数据库行转换为 Tag 对象"""
         # 计算使用次数
-        usage_count = 0
+        usage_count = row['usage_count'] if 'usage_count' in row.keys() else 0
         if conn:
             cursor = conn.execute("""
                 SELECT COUNT(*) as count FROM file_tags WHERE tag_id = ?
@@ -325,12 +675,33 @@ class SQLiteDataStore:
                     category.category_id, category.name, category.description,
                     category.mutually_exclusive, category.created_at
                 ))
+                self._bump_data_version(conn)
                 conn.commit()
                 return True
         except Exception as e:
             logger.error(f"Error adding category: {e}")
             return False
 
+    def bulk_add_categories(self, categories: Iterable[Category]) -> int:
+        """
+        批量添加分类（单个事务，executemany），ID 或名称已存在的分类被跳过
+
+        Returns:
+            实际新增的分类数
+        """
+        with self._get_connection() as conn:
+            cursor = conn.executemany("""
+                INSERT OR IGNORE INTO categories (category_id, name, description, exclusive, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, [
+                (cat.category_id, cat.name, cat.description, cat.mutually_exclusive,
+                 _db_time(cat.created_at))
+                for cat in categories
+            ])
+            self._bump_data_version(conn)
+            conn.commit()
+            return cursor.rowcount
+
     def get_category(self, category_id: str) -> Optional[Category]:
         """获取分类"""
         with self._get_connection() as conn:
@@ -342,6 +713,19 @@ class SQLiteDataStore:
 
             return self._row_to_category(row)
 
+    def get_categories(self, category_ids: Iterable[str]) -> Dict[str, Category]:
+        """批量获取分类，返回 {分类ID: Category}"""
+        category_ids = list(set(category_ids))
+        if not category_ids:
+            return {}
+
+        placeholders = ','.join('?' * len(category_ids))
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                f"SELECT * FROM categories WHERE category_id IN ({placeholders})", category_ids
+            )
+            return {row['category_id']: self._row_to_category(row) for row in cursor.fetchall()}
+
     def get_category_by_name(self, name: str) -> Optional[Category]:
         """通过名称获取分类"""
         with self._get_connection() as conn:
@@ -366,6 +750,7 @@ class SQLiteDataStore:
         try:
             with self._get_connection() as conn:
                 conn.execute("DELETE FROM categories WHERE category_id = ?", (category_id,))
+                self._bump_data_version(conn)
                 conn.commit()
                 return True
         except Exception as e:
@@ -407,6 +792,7 @@ class SQLiteDataStore:
                     VALUES (?, ?, ?)
                 """, (file_id, tag_id, datetime.now()))
 
+                self._bump_data_version(conn)
                 conn.commit()
                 return True
         except Exception as e:
@@ -420,6 +806,7 @@ class SQLiteDataStore:
                 conn.execute("""
                     DELETE FROM file_tags WHERE file_id = ? AND tag_id = ?
                 """, (file_id, tag_id))
+                self._bump_data_version(conn)
                 conn.commit()
                 return True
         except Exception as e:
@@ -435,9 +822,7 @@ class SQLiteDataStore:
                 WHERE ft.tag_id = ? AND f.deleted = 0
                 ORDER BY f.created_at DESC
             """, (tag_id,))
-            rows = cursor.fetchall()
-
-            return [self._row_to_file(row, conn) for row in rows]
+            return self._rows_to_files(cursor.fetchall(), conn)
 
     def get_files_by_tags(self, tag_ids: List[str], match_all: bool = True) -> List[File]:
         """
@@ -474,38 +859,89 @@ class SQLiteDataStore:
                     ORDER BY f.created_at DESC
                 """, tag_ids)
 
-            rows = cursor.fetchall()
-            return [self._row_to_file(row, conn) for row in rows]
+            return self._rows_to_files(cursor.fetchall(), conn)
+
+    def get_tag_file_ids(self, tag_ids: Iterable[str]) -> Dict[str, Set[str]]:
+        """
+        批量获取标签对应的文件ID集合（标签到文件的倒排索引）
+
+        Returns:
+            {标签ID: 文件ID集合}，没有文件的标签对应空集合
+        """
+        tag_ids = list(dict.fromkeys(tag_ids))
+        result: Dict[str, Set[str]] = {tid: set() for tid in tag_ids}
+        if not tag_ids:
+            return result
+
+        placeholders = ','.join('?' * len(tag_ids))
+        with self._get_connection() as conn:
+            cursor = conn.execute(f"""
+                SELECT tag_id, file_id FROM file_tags WHERE tag_id IN ({placeholders})
+            """, tag_ids)
+            for tag_id, file_id in cursor:
+                result[tag_id].add(file_id)
+        return result
 
     # ==================== 统计信息 ====================
 
     def get_stats(self) -> Dict[str, Any]:
-        """获取统计信息"""
+        """
+        获取统计信息
+
+        数据库未发生变化时直接返回缓存：PRAGMA data_version 反映其他连接的提交，
+        total_changes 反映本连接的修改，两者都不变说明数据未变。
+        """
         with self._get_connection() as conn:
-            stats = {}
+            version = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+            if self._stats_cache is None or version != self._stats_version:
+                self._stats_cache = self._compute_stats(conn)
+                self._stats_version = version
+            return dict(self._stats_cache)
 
-            # 文件统计
-            cursor = conn.execute("SELECT COUNT(*) as count FROM files WHERE deleted = 0")
-            stats['total_files'] = cursor.fetchone()['count']
+    def _compute_stats(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        """查询统计信息"""
+        stats = {}
 
-            cursor = conn.execute("SELECT COUNT(*) as count FROM files WHERE managed = 1 AND deleted = 0")
-            stats['managed_files'] = cursor.fetchone()['count']
+        # 文件统计
+        cursor = conn.execute("SELECT COUNT(*) as count FROM files WHERE deleted = 0")
+        stats['total_files'] = cursor.fetchone()['count']
 
-            cursor = conn.execute("SELECT COUNT(*) as count FROM files WHERE indexed = 1 AND deleted = 0")
-            stats['indexed_files'] = cursor.fetchone()['count']
+        cursor = conn.execute("SELECT COUNT(*) as count FROM files WHERE managed = 1 AND deleted = 0")
+        stats['managed_files'] = cursor.fetchone()['count']
 
-            cursor = conn.execute("SELECT SUM(size) as total FROM files WHERE deleted = 0")
-            stats['total_size'] = cursor.fetchone()['total'] or 0
+        cursor = conn.execute("SELECT COUNT(*) as count FROM files WHERE indexed = 1 AND deleted = 0")
+        stats['indexed_files'] = cursor.fetchone()['count']
 
-            # 标签统计
-            cursor = conn.execute("SELECT COUNT(*) as count FROM tags")
-            stats['total_tags'] = cursor.fetchone()['count']
+        cursor = conn.execute("SELECT SUM(size) as total FROM files WHERE deleted = 0")
+        stats['total_size'] = cursor.fetchone()['total'] or 0
 
-            # 分类统计
-            cursor = conn.execute("SELECT COUNT(*) as count FROM categories")
-            stats['total_categories'] = cursor.fetchone()['count']
+        cursor = conn.execute("""
+            SELECT COUNT(*) as count FROM files f
+            WHERE f.deleted = 0 AND EXISTS (SELECT 1 FROM file_tags ft WHERE ft.file_id = f.file_id)
+        """)
+        stats['files_with_tags'] = cursor.fetchone()['count']
+        stats['files_without_tags'] = stats['total_files'] - stats['files_with_tags']
+
+        # 标签统计
+        cursor = conn.execute("SELECT COUNT(*) as count FROM tags")
+        stats['total_tags'] = cursor.fetchone()['count']
 
-            return stats
+        # 分类统计
+        cursor = conn.execute("SELECT COUNT(*) as count FROM categories")
+        stats['total_categories'] = cursor.fetchone()['count']
+
+        # 各类别下的文件-标签关联数（一次连接查询完成分组，不在 Python 中逐条查找）
+        cursor = conn.execute("""
+            SELECT c.name, COUNT(*) as count FROM file_tags ft
+            JOIN files f ON f.file_id = ft.file_id AND f.deleted = 0
+            JOIN tags t ON t.tag_id = ft.tag_id
+            JOIN categories c ON c.category_id = t.category_id
+            GROUP BY c.name
+            ORDER BY count DESC
+        """)
+        stats['category_distribution'] = {row['name']: row['count'] for row in cursor}
+
+        return stats
 
     # ==================== 索引状态管理 ====================
 
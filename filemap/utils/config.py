@@ -25,6 +25,9 @@ class Config:
             "graph_engine": "text",
             "max_nodes": 100,
         },
+        "display": {
+            "plain_threshold": 500,  # 超过该文件数时改用纯文本输出
+        },
     }
 
     def __init__(self, config_path: Optional[Path] = None):
@@ -0,0 +1,78 @@
+"""文件读写辅助函数"""
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Tuple, Union
+
+try:
+    import ijson
+except ImportError:  # 可选依赖，未安装时整体读入
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+# 写文件时使用的缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _target_mode(path: Path) -> int:
+    """目标文件已存在时返回其权限，否则返回新建文件的默认权限（0666 & ~umask）"""
+    try:
+        return stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_write(file_path: Union[str, Path]) -> Iterator[BinaryIO]:
+    """
+    原子写入文件
+
+    先以二进制、大缓冲区写入同目录下的临时文件，成功后用 os.replace 替换目标文件，
+    写入中途出错时目标文件保持不变。
+
+    mkstemp 创建的临时文件权限为 0600，替换前改为目标文件原有的权限
+    （目标不存在时按 umask 取默认权限），与直接 open 写入的结果一致。
+
+    Args:
+        file_path: 目标文件路径
+    """
+    path = Path(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            yield f
+        os.chmod(tmp_path, _target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def iter_json_items(file_path: Union[str, Path]) -> Iterator[Tuple[str, Any]]:
+    """
+    逐个产出顶层为对象的 JSON 文件中的 (键, 值)
+
+    安装了 ijson 时流式解析，不需要把整个文件解析成一个大字典；
+    否则整体读入后再逐个产出。
+
+    Args:
+        file_path: JSON 文件路径
+    """
+    path = Path(file_path)
+    if ijson is not None:
+        with open(path, "rb") as f:
+            yield from ijson.kvitems(f, "", use_float=True)
+        return
+
+    raw = path.read_bytes()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    yield from data.items()
@@ -4,6 +4,9 @@ import tempfile
 from pathlib import Path
 from filemap.storage.sqlite_datastore import SQLiteDataStore
 from filemap.core.models import File, Tag, Category
+from filemap.utils.config import Config
+import filemap.cli.main as cli_main
+import filemap.cli.interactive as cli_interactive
 
 
 @pytest.fixture
@@ -39,3 +42,14 @@ def sample_tag():
 def sample_category():
     """示例分类"""
     return Category(name="test_category", description="测试分类", mutually_exclusive=False)
+
+
+@pytest.fixture
+def workspace(temp_dir, monkeypatch):
+    """CLI 和交互式 Shell 使用临时工作空间，返回数据目录"""
+    config = Config(temp_dir / "config.yaml")
+    config.set("storage.data_dir", str(temp_dir / "data"))
+    config.set("workspace.managed_dir", str(temp_dir / "managed"))
+    monkeypatch.setattr(cli_main, "get_config", lambda: config)
+    monkeypatch.setattr(cli_interactive, "get_config", lambda: config)
+    return temp_dir / "data"
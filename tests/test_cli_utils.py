@@ -0,0 +1,15 @@
+"""CLI 辅助函数测试"""
+from filemap.cli._utils import format_size
+
+
+class TestFormatSize:
+    """format_size 测试"""
+
+    def test_format_size(self):
+        """测试文件大小格式化"""
+        assert format_size(0) == "0.0 B"
+        assert format_size(1023) == "1023.0 B"
+        assert format_size(1024) == "1.0 KB"
+        assert format_size(1536) == "1.5 KB"
+        assert format_size(5 * 1024 ** 3) == "5.0 GB"
+        assert format_size(2 * 1024 ** 6) == "2048.0 PB"
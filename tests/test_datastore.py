@@ -0,0 +1,73 @@
+"""DataStore（JSON 存储）测试"""
+import pytest
+from filemap.storage.datastore import DataStore
+from filemap.core.models import Tag
+
+
+@pytest.fixture
+def json_store(temp_dir):
+    """临时 JSON 数据存储"""
+    return DataStore(temp_dir / "data")
+
+
+class TestDataStore:
+    """DataStore 测试类"""
+
+    def test_batched_writes(self, json_store, temp_dir, sample_file):
+        """测试 with 块内的修改在块结束时一次写盘"""
+        with json_store:
+            json_store.add_file(sample_file)
+            json_store.add_tag(Tag(name="批量", category="topic"))
+            assert not json_store.files_path.exists()
+
+        reloaded = DataStore(temp_dir / "data")
+        assert sample_file.file_id in reloaded.files
+        assert reloaded.get_tag_by_name("批量") is not None
+
+    def test_lookup_by_path_and_name(self, json_store, temp_dir, sample_file):
+        """测试按路径和标签名/别名查找，并在修改后保持正确"""
+        json_store.add_file(sample_file)
+        tag = Tag(name="机器学习", category="topic", aliases=["ML"])
+        json_store.add_tag(tag)
+
+        assert json_store.get_file_by_path(sample_file.path) is sample_file
+        assert json_store.get_tag_by_name("ML") is tag
+
+        old_path = sample_file.path
+        sample_file.path = str(temp_dir / "moved.txt")
+        json_store.update_file(sample_file)
+        assert json_store.get_file_by_path(old_path) is None
+        assert json_store.get_file_by_path(sample_file.path) is sample_file
+
+        tag.name = "深度学习"
+        json_store.update_tag(tag)
+        assert json_store.get_tag_by_name("机器学习") is None
+        assert json_store.get_tags_by_name(["深度学习", "ML", "无"]) == {"深度学习": tag, "ML": tag}
+
+        json_store.remove_tag(tag.tag_id)
+        assert json_store.get_tag_by_name("ML") is None
+
+    def test_remove_tag_keeps_other_alias(self, json_store):
+        """测试删除与别名同名的标签后，别名仍能找到原标签"""
+        ml = Tag(name="ml", category="topic", aliases=["ai"])
+        json_store.add_tag(ml)
+        ai = Tag(name="ai", category="topic")
+        json_store.add_tag(ai)
+        assert json_store.get_tag_by_name("ai") is ai
+
+        json_store.remove_tag(ai.tag_id)
+        assert json_store.get_tag_by_name("ai") is ml
+
+        ml.name = "机器学习"
+        json_store.update_tag(ml)
+        other = Tag(name="other", category="topic", aliases=["ml"])
+        json_store.add_tag(other)
+        assert json_store.get_tag_by_name("ml") is other
+
+    def test_stats_cache_invalidated(self, json_store, sample_file):
+        """测试修改数据后统计信息重新计算"""
+        assert json_store.get_stats()["total_files"] == 0
+
+        json_store.add_file(sample_file)
+        assert json_store.get_stats()["total_files"] == 1
+        assert json_store.get_stats()["files_without_tags"] == 1
@@ -0,0 +1,72 @@
+"""文本提取器测试"""
+import multiprocessing
+
+from filemap.search.extractors import pdf_extractor
+from filemap.search.extractors.pdf_extractor import ExtractionResult, PDFExtractor, TextExtractor
+
+
+class TestExtractionResult:
+    """ExtractionResult 测试"""
+
+    def test_derives_text_from_pages(self):
+        """测试只保存分页内容时按需拼接 text"""
+        result = ExtractionResult(pages=["第一页", "第二页"], success=True)
+        assert result["text"] == "第一页\n第二页"
+        assert result.get("text") == "第一页\n第二页"
+        assert result.get("missing", 0) == 0
+
+    def test_derived_key_visible_as_mapping(self):
+        """测试生成的一项出现在 in、dict() 和 json.dumps() 中，但不额外保存"""
+        import json
+
+        result = ExtractionResult(pages=["a", "b"], success=True)
+        expected = {"pages": ["a", "b"], "success": True, "text": "a\nb"}
+        assert "text" in result and "missing" not in result
+        assert len(result) == 3
+        assert dict(result) == expected
+        assert json.loads(json.dumps(result)) == expected
+        assert "text" not in dict.keys(result)
+
+        assert dict(ExtractionResult(text="x")) == {"text": "x", "pages": ["x"]}
+
+
+class TestTextExtractor:
+    """TextExtractor 测试"""
+
+    def test_extract_detects_encoding(self, temp_dir):
+        """测试自动识别非 UTF-8 编码的文本文件"""
+        path = temp_dir / "note.md"
+        path.write_text("你好", encoding="gbk")
+        result = TextExtractor.extract(str(path))
+        assert result["success"]
+        assert result["text"] == "你好"
+        assert result["pages"] == ["你好"]
+
+    def test_extract_bom_and_newlines(self, temp_dir):
+        """测试去除 BOM 并统一换行符"""
+        path = temp_dir / "bom.txt"
+        path.write_bytes(b"\xef\xbb\xbfline1\r\nline2")
+        assert TextExtractor.extract(str(path))["text"] == "line1\nline2"
+
+
+class TestPDFExtractor:
+    """PDFExtractor 测试"""
+
+    def test_parallel_pages_leave_no_workers(self, temp_dir, monkeypatch):
+        """测试多页 PDF 分块并行读取后页序完整，且不残留工作进程"""
+        from PyPDF2 import PdfWriter
+
+        monkeypatch.setattr(pdf_extractor.os, "cpu_count", lambda: 4)
+
+        writer = PdfWriter()
+        for _ in range(30):
+            writer.add_blank_page(100, 100)
+        path = temp_dir / "blank.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+
+        result = PDFExtractor.extract(str(path))
+        assert result["success"]
+        assert result["page_count"] == 30
+        assert len(result["pages"]) == 30
+        assert multiprocessing.active_children() == []
@@ -0,0 +1,88 @@
+"""文件管理命令测试"""
+from click.testing import CliRunner
+
+from filemap.cli.main import cli
+
+
+class TestAddFile:
+    """file add 命令测试"""
+
+    def test_import_duplicate_not_copied(self, workspace, temp_dir):
+        """测试导入内容重复的文件时不会复制到管理目录"""
+        original = temp_dir / "a.txt"
+        original.write_text("same content")
+        copy = temp_dir / "b.txt"
+        copy.write_text("same content")
+
+        runner = CliRunner()
+        assert runner.invoke(cli, ["file", "add", str(original), "--import"]).exit_code == 0
+        result = runner.invoke(cli, ["file", "add", str(copy), "--import"])
+        assert result.exit_code == 0
+        assert "内容相同" in result.output
+
+        managed = [p.name for p in (temp_dir / "managed").rglob("*") if p.is_file()]
+        assert managed == ["a.txt"]
+
+    def test_import_same_size_different_content(self, workspace, temp_dir):
+        """测试大小相同但内容不同的文件可以正常导入"""
+        first = temp_dir / "a.txt"
+        first.write_text("aaaa")
+        second = temp_dir / "b.txt"
+        second.write_text("bbbb")
+
+        runner = CliRunner()
+        assert runner.invoke(cli, ["file", "add", str(first), "--import"]).exit_code == 0
+        result = runner.invoke(cli, ["file", "add", str(second), "--import"])
+        assert "已导入" in result.output
+
+        managed = sorted(p.name for p in (temp_dir / "managed").rglob("*") if p.is_file())
+        assert managed == ["a.txt", "b.txt"]
+
+    def test_index_duplicate_rejected(self, workspace, temp_dir):
+        """测试索引内容重复的文件时提示已存在"""
+        original = temp_dir / "a.txt"
+        original.write_text("same content")
+        copy = temp_dir / "b.txt"
+        copy.write_text("same content")
+
+        runner = CliRunner()
+        assert runner.invoke(cli, ["file", "add", str(original)]).exit_code == 0
+        assert "内容相同" in runner.invoke(cli, ["file", "add", str(copy)]).output
+
+
+class TestListFiles:
+    """file list 命令测试"""
+
+    def _add_tagged_file(self, runner, temp_dir):
+        """添加一个带 4 个标签的文件"""
+        path = temp_dir / "a.txt"
+        path.write_text("content")
+        for name in ("t1", "t2", "t3", "t4"):
+            assert runner.invoke(cli, ["tag", "create", name]).exit_code == 0
+        assert runner.invoke(cli, ["file", "add", str(path), "--tags", "t1,t2,t3,t4"]).exit_code == 0
+
+    def test_plain_lists_all_tags(self, workspace, temp_dir):
+        """测试 --plain 输出全部标签"""
+        runner = CliRunner()
+        self._add_tagged_file(runner, temp_dir)
+
+        result = runner.invoke(cli, ["file", "list", "--plain"])
+        assert result.exit_code == 0
+        header, row = result.output.splitlines()
+        assert header.startswith("ID\t")
+        assert sorted(row.split("\t")[3].split(",")) == ["t1", "t2", "t3", "t4"]
+
+    def test_plain_above_threshold(self, workspace, temp_dir):
+        """测试文件数超过阈值时自动使用纯文本输出，否则使用表格并标记未显示的标签数"""
+        from filemap.cli import main as cli_main
+
+        runner = CliRunner()
+        self._add_tagged_file(runner, temp_dir)
+
+        result = runner.invoke(cli, ["file", "list"])
+        assert "(+1)" in result.output and not result.output.startswith("ID\t")
+
+        cli_main.get_config().set("display.plain_threshold", 0)
+        result = runner.invoke(cli, ["file", "list"])
+        row = result.output.splitlines()[1]
+        assert sorted(row.split("\t")[3].split(",")) == ["t1", "t2", "t3", "t4"]
@@ -0,0 +1,54 @@
+"""文件读写辅助函数测试"""
+import os
+import stat
+import pytest
+from filemap.utils.fileio import atomic_write, iter_json_items
+
+
+class TestAtomicWrite:
+    """atomic_write 测试"""
+
+    def test_atomic_write(self, temp_dir):
+        """测试原子写入"""
+        target = temp_dir / "out.txt"
+        with atomic_write(target) as f:
+            f.write("你好".encode("utf-8"))
+        assert target.read_text(encoding="utf-8") == "你好"
+        assert list(temp_dir.iterdir()) == [target]
+
+    def test_atomic_write_failure_keeps_original(self, temp_dir):
+        """测试写入失败时保留原文件"""
+        target = temp_dir / "out.txt"
+        target.write_text("old")
+        with pytest.raises(RuntimeError):
+            with atomic_write(target) as f:
+                f.write(b"new")
+                raise RuntimeError("boom")
+        assert target.read_text() == "old"
+        assert list(temp_dir.iterdir()) == [target]
+
+    def test_atomic_write_file_mode(self, temp_dir):
+        """测试新建文件使用 umask 默认权限，覆盖时保留原文件权限"""
+        umask = os.umask(0o022)
+        try:
+            target = temp_dir / "out.txt"
+            with atomic_write(target) as f:
+                f.write(b"new")
+            assert stat.S_IMODE(target.stat().st_mode) == 0o644
+
+            target.chmod(0o640)
+            with atomic_write(target) as f:
+                f.write(b"again")
+            assert stat.S_IMODE(target.stat().st_mode) == 0o640
+        finally:
+            os.umask(umask)
+
+
+class TestIterJsonItems:
+    """iter_json_items 测试"""
+
+    def test_iter_json_items(self, temp_dir):
+        """测试逐项读取 JSON 对象"""
+        target = temp_dir / "data.json"
+        target.write_text('{"a": {"n": 1.5}, "b": [1, 2]}', encoding="utf-8")
+        assert list(iter_json_items(target)) == [("a", {"n": 1.5}), ("b", [1, 2])]
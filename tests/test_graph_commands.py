@@ -0,0 +1,53 @@
+"""知识图谱命令测试"""
+import pytest
+from click.testing import CliRunner
+
+from filemap.cli.main import cli
+from filemap.core.models import Tag
+from filemap.graph.knowledge_graph import KnowledgeGraph
+from filemap.storage.sqlite_datastore import SQLiteDataStore
+
+
+@pytest.fixture
+def generate_calls(monkeypatch):
+    """记录 KnowledgeGraph.generate 的调用模式"""
+    calls = []
+    original = KnowledgeGraph.generate
+
+    def generate(self, mode="tags"):
+        calls.append(mode)
+        original(self, mode)
+
+    monkeypatch.setattr(KnowledgeGraph, "generate", generate)
+    return calls
+
+
+class TestGraphCache:
+    """图谱缓存测试"""
+
+    def test_second_command_loads_cache(self, workspace, generate_calls):
+        """测试数据未变化时后续命令直接加载已生成的图谱"""
+        runner = CliRunner()
+        assert runner.invoke(cli, ["graph", "hubs"]).exit_code == 0
+        assert runner.invoke(cli, ["graph", "hubs"]).exit_code == 0
+        assert generate_calls == ["tags"]
+
+    def test_show_uses_generated_graph(self, workspace, generate_calls):
+        """测试 show 使用 generate 生成的图谱，而不是另行生成"""
+        runner = CliRunner()
+        assert runner.invoke(cli, ["graph", "generate", "--mode", "full"]).exit_code == 0
+        assert runner.invoke(cli, ["graph", "show"]).exit_code == 0
+        assert generate_calls == ["full"]
+        assert not (workspace / "graph_tags.json").exists()
+
+    def test_write_invalidates_cache(self, workspace, generate_calls):
+        """测试数据库写入后重新生成图谱"""
+        runner = CliRunner()
+        assert runner.invoke(cli, ["graph", "hubs"]).exit_code == 0
+
+        SQLiteDataStore(workspace / "filemap.db").add_tag(Tag(name="Python"))
+
+        result = runner.invoke(cli, ["graph", "hubs"])
+        assert result.exit_code == 0
+        assert generate_calls == ["tags", "tags"]
+        assert "Python" in result.output
@@ -0,0 +1,203 @@
+"""ContentIndexer 测试"""
+import os
+import pytest
+from pathlib import Path
+
+from whoosh import index
+from whoosh.fields import ID, TEXT, Schema
+
+from filemap.core.models import File
+from filemap.search import indexer as indexer_module
+from filemap.search.indexer import ContentIndexer
+
+
+@pytest.fixture
+def indexer(temp_dir):
+    """临时索引"""
+    return ContentIndexer(temp_dir / "index")
+
+
+def _make_files(temp_dir, count):
+    """创建 count 个可索引的文本文件和 1 个不支持的二进制文件"""
+    docs = temp_dir / "docs"
+    docs.mkdir()
+    files = []
+    for i in range(count):
+        path = docs / f"doc{i}.txt"
+        path.write_text(f"document number{i}")
+        files.append(File.from_path(str(path)))
+    (docs / "data.bin").write_bytes(b"\x00")
+    files.append(File.from_path(str(docs / "data.bin")))
+    return files
+
+
+class TestIndexFiles:
+    """批量索引测试"""
+
+    def test_index_files_batches(self, indexer, temp_dir):
+        """测试分批提交的批量索引"""
+        files = _make_files(temp_dir, 5)
+
+        progress = []
+        stats = indexer.index_files(files, progress_callback=lambda c, t, n: progress.append(c),
+                                    batch_size=2)
+
+        assert stats == {'success': 5, 'failed': 0, 'skipped': 1}
+        assert progress == sorted(progress) and progress[-1] == len(files)
+        assert indexer.get_stats()['total_docs'] == 5
+        assert indexer.search("number3")[0]['file_id'] == files[3].file_id
+
+        assert indexer.update_index(files)['skipped'] == len(files)
+
+    def test_index_files_isolates_failures(self, indexer, temp_dir, monkeypatch):
+        """测试单个文件写入失败（提取后被删除）不影响同批其他文件"""
+        files = _make_files(temp_dir, 4)
+
+        extract = indexer_module.ExtractorFactory.extract
+
+        def extract_then_delete(path):
+            result = extract(path)
+            if path == files[1].path:
+                os.remove(path)
+            return result
+
+        monkeypatch.setattr(indexer_module.ExtractorFactory, "extract", staticmethod(extract_then_delete))
+        stats = indexer.index_files(files)
+
+        assert stats == {'success': 3, 'failed': 1, 'skipped': 1}
+        assert indexer.get_stats()['total_docs'] == 3
+        assert not indexer.is_indexed(files[1].file_id)
+
+    def test_index_files_multisegment(self, indexer, temp_dir, monkeypatch):
+        """测试多进程多段写入：首次索引、分批重新索引后有效文档数正确，optimize 后合并"""
+        monkeypatch.setattr(indexer_module.os, "cpu_count", lambda: 4)
+        monkeypatch.setattr(indexer_module, "_MULTISEGMENT_MIN_DOCS", 4)
+        files = _make_files(temp_dir, 6)
+
+        assert indexer.index_files(files) == {'success': 6, 'failed': 0, 'skipped': 1}
+        assert indexer.get_stats()['total_docs'] == 6
+
+        assert indexer.index_files(files, batch_size=4)['success'] == 6
+        assert indexer.get_stats()['total_docs'] == 6
+        assert indexer.search("number5")[0]['file_id'] == files[5].file_id
+
+        indexer.optimize()
+        assert indexer.ix.doc_count_all() == 6
+
+    def test_index_files_parallel(self, indexer, temp_dir):
+        """测试并行提取文本的批量索引"""
+        files = _make_files(temp_dir, 6)
+
+        stats = indexer.index_files_parallel(files, workers=2)
+
+        assert stats == {'success': 6, 'failed': 0, 'skipped': 1}
+        assert indexer.get_stats()['total_docs'] == 6
+
+
+class TestIndexedState:
+    """索引状态查询测试"""
+
+    def test_is_indexed_after_reopen(self, indexer, temp_dir):
+        """测试重新打开索引后查询、删除和重新索引文件"""
+        files = _make_files(temp_dir, 2)
+        indexer.index_files(files)
+
+        reopened = ContentIndexer(temp_dir / "index")
+        assert not reopened.needs_reindex(files[0])
+        assert reopened.is_indexed(files[0].file_id)
+        assert reopened.get_indexed_time(files[0].file_id) is not None
+        assert not reopened.is_indexed(files[-1].file_id)
+
+        reopened.remove_file(files[0].file_id)
+        assert not reopened.is_indexed(files[0].file_id)
+        assert reopened.index_file(files[0])
+        assert reopened.is_indexed(files[0].file_id)
+
+    def test_lookup_by_id(self, indexer, temp_dir):
+        """测试未做整体判断时按文件ID直接查询"""
+        files = _make_files(temp_dir, 2)
+        indexer.index_files(files)
+
+        reopened = ContentIndexer(temp_dir / "index")
+        assert reopened.is_indexed(files[1].file_id)
+        assert reopened.get_indexed_time(files[1].file_id) is not None
+        assert reopened.get_indexed_time("missing") is None
+
+    def test_needs_reindex_compares_stat(self, indexer, temp_dir):
+        """测试按文件大小和修改时间判断是否需要重新索引"""
+        files = _make_files(temp_dir, 2)
+        indexer.index_files(files)
+        assert not indexer.needs_reindex(files[0])
+
+        path = Path(files[0].path)
+        path.write_text("changed content")
+        assert indexer.needs_reindex(files[0])
+
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        indexer.index_file(files[0])
+        assert not indexer.needs_reindex(files[0])
+
+    def test_upgrade_old_index(self, temp_dir):
+        """测试打开旧版本索引时补充新增字段"""
+        old_schema = Schema(file_id=ID(stored=True, unique=True), content=TEXT(stored=True))
+        (temp_dir / "index").mkdir()
+        index.create_in(str(temp_dir / "index"), old_schema)
+
+        indexer = ContentIndexer(temp_dir / "index")
+        files = _make_files(temp_dir, 1)
+        assert indexer.index_files(files)['success'] == 1
+        assert not indexer.needs_reindex(files[0])
+
+
+class TestIndexMaintenance:
+    """索引维护测试"""
+
+    def test_optimize_and_clear(self, indexer, temp_dir):
+        """测试优化后清除已删除文档，以及清空索引"""
+        files = _make_files(temp_dir, 3)
+        for file in files[:3]:
+            indexer.index_file(file)
+        indexer.index_file(files[0])
+
+        indexer.optimize()
+        assert indexer.ix.doc_count_all() == 3
+        assert indexer.get_stats()['total_docs'] == 3
+
+        indexer.clear()
+        assert indexer.get_stats()['total_docs'] == 0
+        assert not indexer.is_indexed(files[0].file_id)
+
+    def test_get_stats_counts_live_docs(self, indexer, temp_dir):
+        """测试统计信息只计算有效文档"""
+        files = _make_files(temp_dir, 2)
+        indexer.index_files(files)
+        indexer.index_files(files)
+
+        stats = indexer.get_stats()
+        assert stats['total_docs'] == 2
+        assert stats['index_size'] > 0
+        assert stats['last_modified'] is not None
+
+
+class TestSearchCache:
+    """搜索结果缓存测试"""
+
+    def test_cached_until_write(self, indexer, temp_dir, monkeypatch):
+        """测试重复查询使用缓存，写入索引后重新搜索"""
+        monkeypatch.setattr(indexer_module, "_SEARCH_CACHE_MIN_SECONDS", 0)
+        files = _make_files(temp_dir, 2)
+        indexer.index_file(files[0])
+
+        searches = []
+        searcher = indexer.ix.searcher
+        monkeypatch.setattr(indexer.ix, "searcher", lambda: searches.append(1) or searcher())
+
+        assert len(indexer.search("document")) == 1
+        indexer.search("document")[0]['score'] = -1
+        assert indexer.search("document")[0]['score'] > 0
+        assert len(searches) == 1
+
+        indexer.index_file(files[1])
+        assert len(indexer.search("document")) == 2
+        assert len(searches) == 2
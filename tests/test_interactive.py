@@ -0,0 +1,153 @@
+"""交互式 Shell 测试"""
+import pytest
+
+from filemap.cli.interactive import FileMapShell
+from filemap.core.models import Tag
+from filemap.storage.sqlite_datastore import SQLiteDataStore
+
+
+@pytest.fixture
+def shell(workspace):
+    """使用临时工作空间的 Shell"""
+    return FileMapShell()
+
+
+@pytest.fixture
+def note(temp_dir):
+    """示例文本文件路径"""
+    path = temp_dir / "note.txt"
+    path.write_text("hello")
+    return path
+
+
+@pytest.fixture
+def tagged_shell(shell, temp_dir):
+    """已添加两个文件和两个标签的 Shell：Report.txt 带 work，memo.txt 带 home"""
+    shell.datastore.add_tag(Tag(name="work"))
+    shell.datastore.add_tag(Tag(name="home"))
+    for name, tag in (("Report.txt", "work"), ("memo.txt", "home")):
+        path = temp_dir / name
+        path.write_text(name)
+        shell.onecmd(f"add {path} --tags {tag}")
+    return shell
+
+
+class TestShellDispatch:
+    """命令分派测试"""
+
+    def test_aliases_and_unknown(self, shell, capsys):
+        """测试别名、未知命令、空行和退出"""
+        assert not shell.onecmd("")
+        shell.onecmd("ls")
+        assert "没有找到文件" in capsys.readouterr().out
+        shell.onecmd("nosuch")
+        assert "未知命令: nosuch" in capsys.readouterr().out
+        assert shell.onecmd("q")
+
+    def test_select_rejects_non_decimal(self, shell, capsys):
+        """测试 select 只接受十进制数字"""
+        shell.onecmd("select ²")
+        assert "请输入有效的数字" in capsys.readouterr().out
+
+    def test_parse_args(self, shell):
+        """测试参数解析（含引号时使用 shlex）"""
+        assert shell._parse_args("a b --tags x,y --flag") == {
+            "_positional": ["a", "b"], "tags": "x,y", "flag": True,
+        }
+        assert shell._parse_args('"my file.txt" --notes \'hi there\'') == {
+            "_positional": ["my file.txt"], "notes": "hi there",
+        }
+
+
+class TestShellFiles:
+    """Shell 文件操作测试"""
+
+    def test_add_with_tags_persists_links(self, tagged_shell, workspace, temp_dir):
+        """测试 add --tags 写入标签关联，使用次数由关联计算"""
+        store = SQLiteDataStore(workspace / "filemap.db")
+        assert store.get_file_by_path(str(temp_dir / "Report.txt")).tags == ["work"]
+        assert store.get_tag_by_name("work").usage_count == 1
+
+    def test_list_and_search_by_tag(self, tagged_shell):
+        """测试按标签列出和搜索文件"""
+        tagged_shell.onecmd("list --tags work")
+        assert [f.name for f in tagged_shell.current_files] == ["Report.txt"]
+
+        tagged_shell.onecmd("search --tags work,home")
+        assert sorted(f.name for f in tagged_shell.current_files) == ["Report.txt", "memo.txt"]
+
+    def test_search_and_filter_casefold(self, tagged_shell):
+        """测试关键词搜索和过滤忽略大小写"""
+        tagged_shell.onecmd("search REPORT")
+        assert [f.name for f in tagged_shell.current_files] == ["Report.txt"]
+
+        tagged_shell.onecmd("list")
+        tagged_shell.onecmd("filter MEMO")
+        assert [f.name for f in tagged_shell.current_files] == ["memo.txt"]
+
+    def test_show_by_id_prefix(self, tagged_shell, capsys):
+        """测试按文件ID前缀查看文件"""
+        file = tagged_shell.datastore.list_files()[0]
+        tagged_shell.onecmd(f"show {file.file_id[:8]}")
+        assert tagged_shell.selected_file.file_id == file.file_id
+        tagged_shell.onecmd("show zzzz")
+        assert "找不到文件: zzzz" in capsys.readouterr().out
+
+    def test_remove_confirmed(self, tagged_shell, monkeypatch):
+        """测试确认后删除文件（非终端输入时读取一行）"""
+        monkeypatch.setattr("builtins.input", lambda prompt: "y")
+        tagged_shell.onecmd("list")
+        tagged_shell.onecmd("remove 1")
+        assert len(tagged_shell.datastore.list_files()) == 1
+
+
+class TestShellTags:
+    """Shell 标签操作测试"""
+
+    def test_tag_add_and_remove_persist(self, shell, workspace, note):
+        """测试 tag add / tag remove 写入数据库"""
+        shell.datastore.add_tag(Tag(name="work"))
+        shell.onecmd(f"add {note}")
+        shell.onecmd("list")
+        shell.onecmd("select 1")
+
+        shell.onecmd("tag add work")
+        store = SQLiteDataStore(workspace / "filemap.db")
+        assert store.get_file_by_path(str(note)).tags == ["work"]
+        assert shell.selected_file.tags == ["work"]
+
+        shell.onecmd("tag remove work")
+        assert SQLiteDataStore(workspace / "filemap.db").get_file_by_path(str(note)).tags == []
+        assert shell.selected_file.tags == []
+
+    def test_tag_list_and_completion(self, tagged_shell, capsys):
+        """测试标签列表显示类别，补全标签名和子命令"""
+        tagged_shell.onecmd("tag list")
+        out = capsys.readouterr().out
+        assert "work" in out and "home" in out
+
+        tagged_shell.onecmd("tag create homework")
+        assert tagged_shell.complete_tag("ho", "tag add ho", 8, 10) == ["home", "homework"]
+        assert tagged_shell.complete_tag("re", "tag re", 4, 6) == ["remove"]
+
+    def test_graph_reused_until_write(self, tagged_shell, monkeypatch):
+        """测试数据未变化时复用知识图谱，写入后重新生成"""
+        from filemap.graph.knowledge_graph import KnowledgeGraph
+
+        calls = []
+        generate = KnowledgeGraph.generate
+        monkeypatch.setattr(KnowledgeGraph, "generate",
+                            lambda self, mode="tags": calls.append(mode) or generate(self, mode))
+
+        tagged_shell.onecmd("graph hubs")
+        tagged_shell.onecmd("graph tree")
+        assert calls == ["tags"]
+
+        tagged_shell.onecmd("tag create extra")
+        tagged_shell.onecmd("graph show")
+        assert calls == ["tags", "tags"]
+
+    def test_stats(self, tagged_shell, capsys):
+        """测试统计信息"""
+        tagged_shell.onecmd("stats")
+        assert "2" in capsys.readouterr().out
@@ -0,0 +1,47 @@
+"""KnowledgeGraph 测试"""
+import pytest
+from filemap.graph.knowledge_graph import KnowledgeGraph
+
+
+class TestKnowledgeGraph:
+    """KnowledgeGraph 测试类"""
+
+    def test_save_and_load(self, temp_db, temp_dir):
+        """测试保存后加载图谱"""
+        kg = KnowledgeGraph(temp_db)
+        kg.graph.add_node("t1", type="tag", name="Python", usage_count=2)
+        kg.graph.add_node("t2", type="tag", name="机器学习", usage_count=3)
+        kg.graph.add_edge("t1", "t2", weight=2, type="cooccurrence")
+
+        graph_path = temp_dir / "graph.json"
+        kg.save(str(graph_path))
+
+        loaded = KnowledgeGraph(temp_db)
+        loaded.load(str(graph_path))
+        assert loaded.graph.nodes["t2"]["name"] == "机器学习"
+        assert loaded.graph.edges["t1", "t2"]["weight"] == 2
+        assert loaded.get_stats() == kg.get_stats()
+
+    def test_generate_resolves_tag_names(self, temp_db, temp_dir):
+        """测试按标签名存储的文件标签也能建立共现关系"""
+        from filemap.core.models import File, Tag
+
+        python = Tag(name="Python")
+        ml = Tag(name="机器学习")
+        temp_db.add_tag(python)
+        temp_db.add_tag(ml)
+        file_ids = []
+        for i in range(2):
+            path = temp_dir / f"f{i}.txt"
+            path.write_text(str(i))
+            temp_db.add_file(File.from_path(str(path)))
+            file = temp_db.get_file_by_path(str(path))
+            temp_db.add_tag_to_file(file.file_id, python.tag_id)
+            temp_db.add_tag_to_file(file.file_id, ml.tag_id)
+            file_ids.append(file.file_id)
+
+        kg = KnowledgeGraph(temp_db)
+        kg.generate(mode="full")
+        assert kg.graph.edges[python.tag_id, ml.tag_id]["weight"] == 2
+        assert kg.graph.edges[file_ids[0], file_ids[1]]["weight"] == 1.0
+        assert kg.graph.degree(file_ids[0]) == 3
@@ -0,0 +1,30 @@
+"""JSON -> SQLite 迁移测试"""
+from filemap.core.models import Tag
+from filemap.storage.datastore import DataStore
+from filemap.storage.migration import DataMigration
+from filemap.storage.sqlite_datastore import SQLiteDataStore
+
+
+class TestDataMigration:
+    """DataMigration 测试类"""
+
+    def test_migrate_from_json(self, temp_dir, sample_file):
+        """测试迁移文件、标签及其关联，重复迁移时跳过已存在的文件"""
+        json_store = DataStore(temp_dir / "json")
+        topic = json_store.get_category_by_name("topic")
+        tag = Tag(name="迁移", category=topic.category_id)
+        json_store.add_tag(tag)
+        sample_file.tags = [tag.tag_id]
+        json_store.add_file(sample_file)
+
+        db_path = temp_dir / "filemap.db"
+        stats = DataMigration.migrate_from_json(temp_dir / "json", db_path)
+        assert (stats['tags'], stats['files'], stats['errors']) == (1, 1, [])
+
+        store = SQLiteDataStore(db_path)
+        assert store.get_file(sample_file.file_id).tags == ["迁移"]
+        # 同名默认分类沿用数据库中已有的ID
+        assert store.get_tag(tag.tag_id).category == store.get_category_by_name("topic").category_id
+
+        again = DataMigration.migrate_from_json(temp_dir / "json", db_path)
+        assert again['files'] == 0 and len(again['errors']) == 1
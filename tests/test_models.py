@@ -13,6 +13,30 @@ class TestFile:
         assert sample_file.size > 0
         assert sample_file.hash is not None
 
+    def test_from_path_streaming_copy(self, temp_dir, sample_file):
+        """测试复制文件并同时计算哈希"""
+        dst = temp_dir / "copy.txt"
+        copied = File.from_path_streaming_copy(sample_file.path, str(dst))
+        assert dst.read_text() == "Hello, World!"
+        assert copied.hash == sample_file.hash
+        assert copied.name == "test.txt"
+        assert copied.path == str(dst)
+        assert copied.managed is True
+
+    def test_update_from_filesystem_skips_unchanged(self, sample_file, monkeypatch):
+        """测试大小和修改时间未变化时不重新计算哈希"""
+        calls = []
+        original = File._calculate_hash
+        monkeypatch.setattr(File, "_calculate_hash", staticmethod(lambda p: calls.append(p) or original(p)))
+
+        sample_file.update_from_filesystem()
+        assert calls == []
+
+        Path(sample_file.path).write_text("Changed content")
+        sample_file.update_from_filesystem()
+        assert len(calls) == 1
+        assert sample_file.size == len("Changed content")
+
     def test_add_tag(self):
         """测试添加标签"""
         file = File(name="test.txt")
@@ -43,6 +67,11 @@ class TestTag:
         assert len(tag.related_tags) == 1
         assert tag.related_tags[0]["tag_id"] == "tag2"
 
+        # 已存在的关联只更新强度，从字典恢复后同样如此
+        restored = Tag.from_dict(tag.to_dict())
+        restored.add_related_tag("tag2", 0.5)
+        assert restored.related_tags == [{"tag_id": "tag2", "strength": 0.5}]
+
 
 class TestCategory:
     """Category 模型测试"""
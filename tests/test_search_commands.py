@@ -0,0 +1,43 @@
+"""搜索命令辅助函数测试"""
+import pytest
+
+from filemap.cli.search_commands import _name_regex, _parse_size, _size_range
+
+
+class TestSearchHelpers:
+    """搜索条件解析测试"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("100", 100),
+        ("1KB", 1024),
+        ("1MB", 1024 ** 2),
+        ("1.5 mb", int(1.5 * 1024 ** 2)),
+        (" 2GB ", 2 * 1024 ** 3),
+        ("abc", 0),
+        ("MB", 0),
+    ])
+    def test_parse_size(self, text, expected):
+        """测试解析带单位的文件大小"""
+        assert _parse_size(text) == expected
+
+    def test_name_regex_is_glob(self):
+        """测试文件名通配符转为忽略大小写的正则，并复用已编译的结果"""
+        regex = _name_regex("*.pdf")
+        assert regex.match("Paper.PDF")
+        assert not regex.match("paper_pdf")
+        assert _name_regex("*.pdf") is regex
+
+    def test_name_regex_matches_whole_name(self):
+        """测试通配符须匹配完整文件名，子串匹配需要写成 *keyword*"""
+        assert not _name_regex("report").match("my_report.txt")
+        assert _name_regex("*report*").match("my_report.txt")
+
+    @pytest.mark.parametrize("expr, expected", [
+        (">1KB", (1025, None)),
+        ("<1KB", (None, 1023)),
+        ("1KB..2KB", (1024, 2048)),
+        ("100", (100, 100)),
+    ])
+    def test_size_range(self, expr, expected):
+        """测试解析大小范围表达式为闭区间"""
+        assert _size_range(expr) == expected
@@ -1,7 +1,9 @@
 """SQLiteDataStore 测试"""
 import pytest
+from datetime import timedelta
 from filemap.storage.sqlite_datastore import SQLiteDataStore
 from filemap.core.models import File, Tag, Category
+from filemap.core.exceptions import AmbiguousFileIdError
 
 
 class TestSQLiteDataStore:
@@ -13,6 +15,28 @@ class TestSQLiteDataStore:
         stats = temp_db.get_stats()
         assert stats['total_categories'] >= 5  # 默认创建5个分类
 
+    def test_reopen_skips_schema(self, temp_db):
+        """测试 schema 未变化时重新打开数据库不再执行建表脚本"""
+        assert not temp_db._init_db()
+        reopened = SQLiteDataStore(temp_db.db_path)
+        assert reopened.get_stats()['total_categories'] >= 5
+
+    def test_data_version_persists_writes(self, temp_db, sample_file, sample_tag):
+        """测试每次写入都会使数据版本号递增，且重新打开后保持"""
+        version = temp_db.data_version()
+        temp_db.add_file(sample_file)
+        temp_db.add_tag(sample_tag)
+        assert temp_db.data_version() > version
+
+        version = temp_db.data_version()
+        temp_db.get_stats()
+        temp_db.list_files()
+        assert temp_db.data_version() == version
+        assert SQLiteDataStore(temp_db.db_path).data_version() == version
+
+        temp_db.mark_indexed(sample_file.file_id)
+        assert temp_db.data_version() == version
+
     def test_add_and_get_file(self, temp_db, sample_file):
         """测试添加和获取文件"""
         assert temp_db.add_file(sample_file)
@@ -45,6 +69,29 @@ class TestSQLiteDataStore:
         retrieved = temp_db.get_file(sample_file.file_id)
         assert sample_tag.name in retrieved.tags
 
+    def test_list_files_loads_tags_in_batch(self, temp_db, temp_dir, sample_tag):
+        """测试批量列出文件时每个文件的标签正确"""
+        temp_db.add_tag(sample_tag)
+        for i in range(3):
+            path = temp_dir / f"f{i}.txt"
+            path.write_text(str(i))
+            file = File.from_path(str(path))
+            file.tags = [sample_tag.name] if i % 2 == 0 else []
+            temp_db.add_file(file)
+
+        tags = sorted(f.tags for f in temp_db.iter_files())
+        assert tags == [[], [sample_tag.name], [sample_tag.name]]
+
+    def test_remove_tag_removes_associations(self, temp_db, sample_file, sample_tag):
+        """测试删除标签时一并删除文件关联"""
+        temp_db.add_file(sample_file)
+        temp_db.add_tag(sample_tag)
+        temp_db.add_tag_to_file(sample_file.file_id, sample_tag.tag_id)
+
+        assert temp_db.remove_tag(sample_tag.tag_id)
+        assert temp_db.get_file(sample_file.file_id).tags == []
+        assert temp_db.get_tag_file_ids([sample_tag.tag_id]) == {sample_tag.tag_id: set()}
+
     def test_remove_file(self, temp_db, sample_file):
         """测试删除文件（软删除）"""
         temp_db.add_file(sample_file)
@@ -60,3 +107,163 @@ class TestSQLiteDataStore:
         stats = temp_db.get_stats()
         assert stats['total_files'] == 1
         assert stats['total_size'] > 0
+
+    def test_get_stats_tag_counts(self, temp_db, sample_file, sample_tag):
+        """测试统计有/无标签文件数和类别分布"""
+        topic = temp_db.get_category_by_name("topic")
+        sample_tag.category = topic.category_id
+        temp_db.add_file(sample_file)
+        temp_db.add_tag(sample_tag)
+        temp_db.add_tag_to_file(sample_file.file_id, sample_tag.tag_id)
+
+        stats = temp_db.get_stats()
+        assert stats['files_with_tags'] == 1
+        assert stats['files_without_tags'] == 0
+        assert stats['category_distribution'] == {"topic": 1}
+
+    def test_get_stats_cache_invalidated(self, temp_db, sample_file):
+        """测试统计缓存在数据变化后失效（包括其他连接的修改）"""
+        assert temp_db.get_stats()['total_files'] == 0
+        assert temp_db.get_stats()['total_files'] == 0
+
+        other = SQLiteDataStore(temp_db.db_path)
+        other.add_file(sample_file)
+        assert temp_db.get_stats()['total_files'] == 1
+
+        temp_db.remove_file(sample_file.file_id)
+        assert temp_db.get_stats()['total_files'] == 0
+
+    def test_get_tags_by_name(self, temp_db, sample_tag):
+        """测试批量通过名称获取标签"""
+        temp_db.add_tag(sample_tag)
+        tags_map = temp_db.get_tags_by_name([sample_tag.name, "不存在"])
+        assert list(tags_map) == [sample_tag.name]
+        assert tags_map[sample_tag.name].tag_id == sample_tag.tag_id
+
+    def test_bulk_update_tags(self, temp_db, sample_tag):
+        """测试批量更新标签"""
+        temp_db.add_tag(sample_tag)
+        sample_tag.description = "已更新"
+        assert temp_db.bulk_update_tags([sample_tag])
+        assert temp_db.get_tag(sample_tag.tag_id).description == "已更新"
+
+    def test_add_file_with_tag_ids(self, temp_db, sample_file, sample_tag):
+        """测试添加文件时按标签ID关联标签"""
+        temp_db.add_tag(sample_tag)
+        sample_file.add_tag(sample_tag.tag_id)
+        temp_db.add_file(sample_file)
+        retrieved = temp_db.get_file(sample_file.file_id)
+        assert retrieved.tags == [sample_tag.name]
+
+    def test_bulk_add_files_skips_tags_of_existing(self, temp_db, sample_file, sample_tag):
+        """测试批量添加时跳过已存在的文件，也不写入其标签关联"""
+        temp_db.add_tag(sample_tag)
+        assert temp_db.bulk_add_files([sample_file]) == 1
+
+        duplicate = File.from_path(sample_file.path)
+        duplicate.add_tag(sample_tag.tag_id)
+        assert duplicate.file_id != sample_file.file_id
+        assert temp_db.bulk_add_files([duplicate]) == 0
+        assert temp_db.get_tag(sample_tag.tag_id).usage_count == 0
+        assert temp_db.get_file(sample_file.file_id).tags == []
+
+    def test_bulk_add_files_links_tags(self, temp_db, sample_file, sample_tag):
+        """测试批量添加文件时关联标签"""
+        temp_db.add_tag(sample_tag)
+        sample_file.add_tag(sample_tag.name)
+        assert temp_db.bulk_add_files([sample_file]) == 1
+        assert temp_db.get_file(sample_file.file_id).tags == [sample_tag.name]
+        assert temp_db.get_tag(sample_tag.tag_id).usage_count == 1
+
+    def test_get_tags(self, temp_db, sample_tag):
+        """测试批量获取标签（支持ID或名称）"""
+        temp_db.add_tag(sample_tag)
+        tag_map = temp_db.get_tags([sample_tag.tag_id, sample_tag.name, "missing"])
+        assert set(tag_map) == {sample_tag.tag_id, sample_tag.name}
+        assert tag_map[sample_tag.name].tag_id == sample_tag.tag_id
+
+    def test_get_file_by_hash(self, temp_db, sample_file):
+        """测试通过内容哈希获取文件"""
+        sample_file.hash = "abc123"
+        temp_db.add_file(sample_file)
+        assert temp_db.get_file_by_hash("abc123").file_id == sample_file.file_id
+        assert temp_db.get_file_by_hash("missing") is None
+        assert temp_db.get_file_by_hash("") is None
+
+    def test_has_file_with_size(self, temp_db, sample_file):
+        """测试按大小预检文件"""
+        assert not temp_db.has_file_with_size(sample_file.size)
+        temp_db.add_file(sample_file)
+        assert temp_db.has_file_with_size(sample_file.size)
+        assert not temp_db.has_file_with_size(sample_file.size + 1)
+
+    def test_get_file_by_prefix(self, temp_db, sample_file):
+        """测试通过ID前缀获取文件"""
+        sample_file.file_id = "abcd1234"
+        temp_db.add_file(sample_file)
+        other = File(file_id="abce5678", name="other.txt", path="/tmp/other.txt")
+        temp_db.add_file(other)
+
+        assert temp_db.get_file_by_prefix("abcd").file_id == "abcd1234"
+        assert temp_db.get_file_by_prefix("abce5678").file_id == "abce5678"
+        assert temp_db.get_file_by_prefix("abcf") is None
+        with pytest.raises(AmbiguousFileIdError):
+            temp_db.get_file_by_prefix("abc")
+
+    def test_get_categories(self, temp_db):
+        """测试批量获取分类"""
+        topic = temp_db.get_category_by_name("topic")
+        status = temp_db.get_category_by_name("status")
+        result = temp_db.get_categories([topic.category_id, status.category_id, "missing"])
+        assert set(result) == {topic.category_id, status.category_id}
+        assert result[topic.category_id].name == "topic"
+        assert temp_db.get_categories([]) == {}
+
+    def test_count_tags_by_category(self, temp_db):
+        """测试按分类统计标签数"""
+        topic = temp_db.get_category_by_name("topic")
+        temp_db.add_tag(Tag(name="a", category=topic.category_id))
+        temp_db.add_tag(Tag(name="b", category=topic.category_id))
+        counts = temp_db.count_tags_by_category()
+        assert counts[topic.category_id] == 2
+
+    def test_get_tag_file_ids(self, temp_db, sample_file, sample_tag):
+        """测试批量获取标签对应的文件ID集合"""
+        temp_db.add_file(sample_file)
+        temp_db.add_tag(sample_tag)
+        temp_db.add_tag_to_file(sample_file.file_id, sample_tag.tag_id)
+        other = Tag(name="other")
+        temp_db.add_tag(other)
+
+        result = temp_db.get_tag_file_ids([sample_tag.tag_id, other.tag_id])
+        assert result == {sample_tag.tag_id: {sample_file.file_id}, other.tag_id: set()}
+
+    def test_top_tags_by_usage(self, temp_db, sample_file):
+        """测试按使用次数取前 N 个标签"""
+        temp_db.add_file(sample_file)
+        used = Tag(name="used")
+        unused = Tag(name="a-unused")
+        temp_db.add_tag(used)
+        temp_db.add_tag(unused)
+        temp_db.add_tag_to_file(sample_file.file_id, used.tag_id)
+
+        top = temp_db.top_tags_by_usage(1)
+        assert [t.name for t in top] == ["used"]
+        assert top[0].usage_count == 1
+        assert len(temp_db.top_tags_by_usage(10)) == 2
+
+    def test_iter_files(self, temp_db, sample_file):
+        """测试逐个遍历文件"""
+        temp_db.add_file(sample_file)
+        assert [f.file_id for f in temp_db.iter_files()] == [sample_file.file_id]
+
+    def test_iter_files_range_filters(self, temp_db, sample_file):
+        """测试在查询中完成大小和日期范围过滤"""
+        temp_db.add_file(sample_file)
+        size = sample_file.size
+        added = temp_db.get_file(sample_file.file_id).added_at
+
+        assert len(list(temp_db.iter_files({'min_size': size, 'max_size': size}))) == 1
+        assert not list(temp_db.iter_files({'min_size': size + 1}))
+        assert len(list(temp_db.iter_files({'min_added': added, 'max_added': added}))) == 1
+        assert not list(temp_db.iter_files({'max_added': added - timedelta(seconds=1)}))
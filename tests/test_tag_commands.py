@@ -0,0 +1,33 @@
+"""标签命令测试"""
+from click.testing import CliRunner
+
+from filemap.cli.main import cli
+from filemap.storage.sqlite_datastore import SQLiteDataStore
+
+
+class TestTagFileCommands:
+    """tag add / tag remove 命令测试"""
+
+    def test_add_and_remove_round_trip(self, workspace, temp_dir):
+        """测试为文件添加、移除标签后数据库中的关联随之变化"""
+        path = temp_dir / "note.txt"
+        path.write_text("hello")
+
+        runner = CliRunner()
+        assert runner.invoke(cli, ["file", "add", str(path)]).exit_code == 0
+        assert runner.invoke(cli, ["tag", "create", "work"]).exit_code == 0
+        file_id = SQLiteDataStore(workspace / "filemap.db").get_file_by_path(str(path)).file_id
+
+        result = runner.invoke(cli, ["tag", "add", file_id, "work"])
+        assert "已添加 1 个标签" in result.output
+        store = SQLiteDataStore(workspace / "filemap.db")
+        assert store.get_file(file_id).tags == ["work"]
+        assert store.get_tag_by_name("work").usage_count == 1
+
+        assert "文件已有标签" in runner.invoke(cli, ["tag", "add", file_id, "work"]).output
+
+        result = runner.invoke(cli, ["tag", "remove", file_id, "work"])
+        assert "已从文件移除 1 个标签" in result.output
+        assert SQLiteDataStore(workspace / "filemap.db").get_file(file_id).tags == []
+
+        assert "文件没有标签" in runner.invoke(cli, ["tag", "remove", file_id, "work"]).output
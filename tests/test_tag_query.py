@@ -0,0 +1,49 @@
+"""标签查询表达式测试"""
+import pytest
+
+from filemap.search import tag_query
+
+
+INDEX = {
+    "a": {"1", "2"},
+    "b": {"2", "3"},
+    "机器 学习": {"4"},
+}
+UNIVERSE = {"1", "2", "3", "4"}
+
+
+def run(query):
+    """解析并求值查询，返回匹配的文件ID集合"""
+    rpn = tag_query.parse(query)
+    match = tag_query.evaluate(rpn, lambda name: INDEX.get(name, set()))
+    return {file_id for file_id in UNIVERSE if match(file_id)}
+
+
+class TestTagQuery:
+    """标签查询表达式测试类"""
+
+    def test_basic_operators(self):
+        """测试 AND / OR / NOT"""
+        assert run("a") == {"1", "2"}
+        assert run("a AND b") == {"2"}
+        assert run("a OR b") == {"1", "2", "3"}
+        assert run("NOT a") == {"3", "4"}
+
+    def test_precedence_and_parentheses(self):
+        """测试运算符优先级（NOT > AND > OR）和括号"""
+        assert run("a OR b AND NOT a") == {"1", "2", "3"}
+        assert run("(a OR b) AND NOT a") == {"3"}
+        assert run("NOT a AND NOT b") == {"4"}
+        assert run("NOT a OR NOT b") == {"1", "3", "4"}
+        assert run("NOT (a AND b)") == {"1", "3", "4"}
+
+    def test_names_with_spaces(self):
+        """测试包含空格的标签名"""
+        assert tag_query.tag_names(tag_query.parse("机器 学习 OR a")) == ["机器 学习", "a"]
+        assert run("机器 学习 OR a") == {"1", "2", "4"}
+
+    @pytest.mark.parametrize("query", ["(a AND b", "a AND b)", "a AND", "NOT"])
+    def test_invalid_queries(self, query):
+        """测试不合法的查询抛出 ValueError"""
+        with pytest.raises(ValueError):
+            run(query)